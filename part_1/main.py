@@ -1,11 +1,20 @@
 import redis.asyncio as redis
 from fastapi import FastAPI
-from fastapi_limiter import FastAPILimiter
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 
 
 from src.conf.config import settings
-from src.routes import contacts, auth, users
+from src.routes import contacts, auth, users, internal, metrics
+from src.services.avatar_jobs import avatar_jobs
+from src.services.birthday_digest import birthday_digest
+from src.services.cache import contact_cache, user_cache
+from src.services.email import email_outbox
+from src.services.instrumentation import MetricsMiddleware, instrument_redis
+from src.services.mail_templates import template_registry
+from src.services.pagination import NEXT_CURSOR_HEADER
+from src.services.query_profiler import QUERY_COUNT_HEADER, QueryProfilerMiddleware
+from src.services.rate_limit import rate_limiter
 
 app = FastAPI()
 
@@ -18,12 +27,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", QUERY_COUNT_HEADER],
 )
+if settings.query_profiler_enabled:
+    app.add_middleware(QueryProfilerMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 
 app.include_router(auth.router, prefix="/api")
 app.include_router(contacts.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
+app.include_router(internal.router, prefix="/api")
+app.include_router(metrics.router)
+
+if settings.avatar_storage == "local":
+    app.mount(settings.avatar_local_url, StaticFiles(directory=settings.avatar_local_dir, check_dir=False),
+              name="media")
 
 
 @app.on_event("startup")
@@ -32,18 +51,40 @@ async def startup():
     The startup function is called when the application starts up.
     It's a good place to initialize things that are used by the app, such as
     connecting to databases or initializing caches.
+    Clients of external services connect on first use, Redis on its first command and the database
+    on its first session, so a new worker serves requests without waiting on them.
     
     :return: A coroutine, so we need to await it
     """
-    r = await redis.Redis(
+    r = instrument_redis(redis.Redis(
         host=settings.redis_host,
         port=settings.redis_port,
         db=0,
         encoding="utf-8",
         decode_responses=True,
-    )
-    await FastAPILimiter.init(r)
+    ))
+    rate_limiter.init(r)
+    user_cache.init(r)
+    contact_cache.init(r)
+    avatar_jobs.init(r)
+    template_registry.load()
+    email_outbox.init()
+    if settings.birthday_digest_enabled:
+        birthday_digest.init()
+
 
+@app.on_event("shutdown")
+async def shutdown():
+    """
+    The shutdown function is called when the application stops.
+    It pushes the last rate limiter counts to Redis and stops the background tasks.
+    
+    :return: A coroutine, so we need to await it
+    """
+    await rate_limiter.close()
+    await avatar_jobs.close()
+    await email_outbox.close()
+    await birthday_digest.close()
 
 @app.get("/")
 def read_root():
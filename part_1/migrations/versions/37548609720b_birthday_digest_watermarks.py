@@ -0,0 +1,36 @@
+"""birthday digest watermarks
+
+Adds the birthday_digest_watermarks table, the day of the last birthday digest queued for each user.
+
+Revision ID: 37548609720b
+Revises: bebd520c63ea
+Create Date: 2026-10-17 13:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '37548609720b'
+down_revision: Union[str, Sequence[str], None] = 'bebd520c63ea'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'birthday_digest_watermarks',
+        sa.Column('users_id', sa.Integer(), nullable=False),
+        sa.Column('sent_on', sa.Date(), nullable=False),
+        sa.ForeignKeyConstraint(['users_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('users_id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('birthday_digest_watermarks')
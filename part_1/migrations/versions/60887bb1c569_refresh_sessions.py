@@ -0,0 +1,49 @@
+"""refresh sessions
+
+Moves refresh tokens out of the users table into refresh_sessions, one row per device session.
+Tokens stored in users.refresh_token are dropped, so existing sessions have to log in again.
+
+Revision ID: 60887bb1c569
+Revises: 37548609720b
+Create Date: 2026-10-17 14:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '60887bb1c569'
+down_revision: Union[str, Sequence[str], None] = '37548609720b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'refresh_sessions',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('users_id', sa.Integer(), nullable=False),
+        sa.Column('device', sa.String(length=255), nullable=True),
+        sa.Column('token_id', sa.String(length=32), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('last_used_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('revoked_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['users_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_refresh_sessions_users_id_expires_at', 'refresh_sessions', ['users_id', 'expires_at'])
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('refresh_token')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('refresh_token', sa.String(length=255), nullable=True))
+    op.drop_index('ix_refresh_sessions_users_id_expires_at', table_name='refresh_sessions')
+    op.drop_table('refresh_sessions')
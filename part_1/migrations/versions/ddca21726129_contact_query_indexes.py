@@ -0,0 +1,66 @@
+"""contact query indexes
+
+Adds the birthday_md column and the indexes used by the contacts repository:
+composite per-user indexes matching its filters and orderings, and pg_trgm indexes for search on PostgreSQL.
+On PostgreSQL the indexes are built concurrently, so the contacts table stays writable during the upgrade.
+
+Revision ID: ddca21726129
+Revises: 6ecd7a4572c0
+Create Date: 2026-10-17 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ddca21726129'
+down_revision: Union[str, Sequence[str], None] = '6ecd7a4572c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COMPOSITE_INDEXES = {
+    'ix_contacts_users_id_id': ['users_id', 'id'],
+    'ix_contacts_users_id_last_name_first_name': ['users_id', 'last_name', 'first_name'],
+    'ix_contacts_users_id_email': ['users_id', 'email'],
+    'ix_contacts_users_id_birthday_md': ['users_id', 'birthday_md'],
+}
+TRIGRAM_INDEXES = {
+    'ix_contacts_first_name_trgm': 'first_name',
+    'ix_contacts_last_name_trgm': 'last_name',
+    'ix_contacts_email_trgm': 'email',
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.add_column(sa.Column('birthday_md', sa.Integer(), nullable=True))
+    if is_postgresql:
+        op.execute("UPDATE contacts SET birthday_md = EXTRACT(MONTH FROM birthday) * 100 + EXTRACT(DAY FROM birthday)")
+    else:
+        op.execute("UPDATE contacts SET birthday_md = "
+                   "CAST(strftime('%m', birthday) AS INTEGER) * 100 + CAST(strftime('%d', birthday) AS INTEGER)")
+
+    with op.get_context().autocommit_block():
+        for name, columns in COMPOSITE_INDEXES.items():
+            op.create_index(name, 'contacts', columns, postgresql_concurrently=True)
+        if is_postgresql:
+            op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            for name, column in TRIGRAM_INDEXES.items():
+                op.create_index(name, 'contacts', [column], postgresql_using='gin',
+                                postgresql_ops={column: 'gin_trgm_ops'}, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        for name in TRIGRAM_INDEXES:
+            op.drop_index(name, table_name='contacts')
+    for name in COMPOSITE_INDEXES:
+        op.drop_index(name, table_name='contacts')
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.drop_column('birthday_md')
@@ -0,0 +1,75 @@
+"""
+Compare token verification throughput of the JWT backends and algorithms.
+
+    python scripts/benchmark_jwt.py --seconds 1
+
+Every available backend decodes an access token with HS256 and EdDSA (Ed25519) for --seconds seconds;
+combinations a backend does not support are reported as null. The cached row measures Auth.decode_token
+on a token that is already in the token cache. Results are printed as JSON, in decodes per second.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+from src.services.auth import Auth
+from src.services.tokens import BACKENDS
+
+ALGORITHMS = ("HS256", "EdDSA")
+
+
+def keys(algorithm: str) -> dict:
+    if algorithm == "HS256":
+        return {"secret_key": "x" * 64}
+    key = Ed25519PrivateKey.generate()
+    return {
+        "private_key": key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                         serialization.NoEncryption()).decode(),
+        "public_key": key.public_key().public_bytes(serialization.Encoding.PEM,
+                                                    serialization.PublicFormat.SubjectPublicKeyInfo).decode(),
+    }
+
+
+def rate(func, seconds: float) -> float:
+    count, started = 0, time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            func()
+        count += 100
+    return round(count / (time.perf_counter() - started), 1)
+
+
+def main(args) -> None:
+    claims = {"sub": "deadpool@example.com", "iat": int(time.time()), "exp": int(time.time()) + 900,
+              "scope": "access_token"}
+    report = {}
+    for algorithm in ALGORITHMS:
+        algorithm_keys = keys(algorithm)
+        for name, backend_class in BACKENDS.items():
+            try:
+                backend = backend_class(algorithm, **algorithm_keys)
+                token = backend.encode(claims)
+            except ImportError:
+                continue
+            except Exception:
+                report.setdefault(name, {})[algorithm] = None
+                continue
+            report.setdefault(name, {})[algorithm] = rate(lambda: backend.decode(token), args.seconds)
+            auth = Auth()
+            auth.jwt_backend = backend
+            auth.decode_token(token)
+            report.setdefault("cached", {})[algorithm] = rate(lambda: auth.decode_token(token), args.seconds)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=1.0, help="how long to decode with each combination")
+    main(parser.parse_args())
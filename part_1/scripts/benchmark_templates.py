@@ -0,0 +1,63 @@
+"""
+Measure how many emails per second the email worker can render.
+
+    python scripts/benchmark_templates.py --seconds 2 --contacts 20
+
+Every message type of the template registry is rendered in a loop for --seconds seconds, first as the
+bare subject, HTML and text parts, then as the full MIME message built by the email worker.
+The birthday digest lists --contacts contacts. Results are printed as JSON, in renders per second.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database.models import OutboxEmail
+from src.services.email import render_email
+from src.services.mail_templates import TemplateRegistry, template_registry
+
+
+def contexts(contacts: int) -> dict[str, dict]:
+    contact = {"first_name": "Dow", "last_name": "John", "email": "example@test.com",
+               "phone_number": "5551234567", "birthday": "1999-10-05"}
+    return {
+        "confirmation": {"host": "http://localhost:8000/", "username": "deadpool", "token": "x" * 160},
+        "password_reset": {"username": "deadpool", "reset_url": "http://localhost:8000/reset/" + "x" * 160},
+        "birthday_digest": {"username": "deadpool", "days": 7, "contacts": [contact] * contacts},
+    }
+
+
+def rate(render, seconds: float) -> float:
+    count, started = 0, time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            render()
+        count += 100
+    return round(count / (time.perf_counter() - started), 1)
+
+
+def main(args) -> None:
+    started = time.perf_counter()
+    registry = TemplateRegistry()
+    registry.load()
+    report = {"load_ms": round((time.perf_counter() - started) * 1000, 2), "renders_per_second": {}}
+    template_registry.compiled = registry.compiled
+    for name, context in contexts(args.contacts).items():
+        email = OutboxEmail(recipient="deadpool@example.com", subject=registry.subject(name, context), template=name,
+                            context=context)
+        report["renders_per_second"][name] = {
+            "parts": rate(lambda: registry.render(name, context), args.seconds),
+            "mime": rate(lambda: render_email(email).as_bytes(), args.seconds),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=1.0, help="how long to render each message type")
+    parser.add_argument("--contacts", type=int, default=10, help="contacts in the birthday digest")
+    main(parser.parse_args())
@@ -0,0 +1,84 @@
+"""
+Report where the time to import the application goes.
+
+    python scripts/profile_imports.py --top 15
+    python scripts/profile_imports.py --module main --runs 5
+
+The module is imported in fresh interpreters with python -X importtime, --runs times; the fastest run is reported.
+The report lists the total import time, the time spent in the modules of each top-level package and the modules
+with the highest self and cumulative time. Results are printed as JSON, in milliseconds.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def parse_importtime(output: str) -> list[dict]:
+    """
+    The parse_importtime function reads the stderr of python -X importtime.
+
+    :param output: str: The importtime lines
+    :return: One dictionary per imported module with its name, depth, self and cumulative time in milliseconds
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules.append({"module": name.strip(), "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                        "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    return modules
+
+
+def profile(module: str, env: dict) -> list[dict]:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return parse_importtime(result.stderr)
+
+
+def report(modules: list[dict], module: str, top: int) -> dict:
+    """
+    The report function summarizes a parsed import profile.
+
+    :param modules: list[dict]: The result of parse_importtime
+    :param module: str: The profiled module
+    :param top: int: The number of modules listed by self and by cumulative time
+    :return: The report
+    """
+    packages = {}
+    for entry in modules:
+        package = entry["module"].split(".")[0]
+        packages[package] = packages.get(package, 0) + entry["self_ms"]
+    total = sum(packages.values())
+
+    def ranked(key: str) -> list[dict]:
+        return [{"module": entry["module"], key: round(entry[key], 1)}
+                for entry in sorted(modules, key=lambda entry: entry[key], reverse=True)[:top]]
+
+    return {
+        "module": module,
+        "total_ms": round(total, 1),
+        "modules": len(modules),
+        "packages": {name: round(ms, 1) for name, ms in sorted(packages.items(), key=lambda item: -item[1])[:top]},
+        "by_self": ranked("self_ms"),
+        "by_cumulative": ranked("cumulative_ms"),
+    }
+
+
+def main(args) -> None:
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    env.setdefault("SQLALCHEMY_DATABASE_URL", "sqlite://")
+    runs = [report(profile(args.module, env), args.module, args.top) for _ in range(args.runs)]
+    print(json.dumps(min(runs, key=lambda run: run["total_ms"]), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="the module to import")
+    parser.add_argument("--runs", type=int, default=3, help="number of fresh interpreters to import in")
+    parser.add_argument("--top", type=int, default=20, help="number of packages and modules to list")
+    main(parser.parse_args())
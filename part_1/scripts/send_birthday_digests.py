@@ -0,0 +1,28 @@
+"""
+Queue the birthday digests of one day, for running from cron instead of the in-app scheduler.
+
+    python scripts/send_birthday_digests.py --day 2024-12-29
+
+The digests are written to the email outbox and sent by the email worker of the running application.
+Users that already got the digest of that day are skipped, so the script is safe to run more than once.
+"""
+import argparse
+import asyncio
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.birthday_digest import birthday_digest
+
+
+async def main(args) -> None:
+    queued = await birthday_digest.run(args.day)
+    print(f"queued {queued} birthday digests")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--day", type=date.fromisoformat, default=None, help="day of the digest, today by default")
+    asyncio.run(main(parser.parse_args()))
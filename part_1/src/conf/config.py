@@ -9,18 +9,74 @@ class Settings(BaseSettings):
     postgres_password: str = '567234'
     postgres_port: str = '5432'
     sqlalchemy_database_url: str = 'SQLALCHEMY_DATABASE_URL'
+    sqlalchemy_async_database_url: str | None = None
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    query_profiler_enabled: bool = False
+    query_profiler_slow_threshold: float = 0.1
+    query_profiler_n_plus_one_threshold: int = 5
     secret_key: str = 'SECRET_KEY'
     algorithm: str = 'ALGORITHM'
+    jwt_backend: str = 'jose'
+    jwt_private_key: str | None = None
+    jwt_public_key: str | None = None
+    token_cache_size: int = 10000
+    refresh_token_ttl: int = 7 * 24 * 60 * 60
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 4
+    password_hash_queue_size: int = 32
     mail_username: str = 'MAIL_USERNAME'
     mail_password: str = 'MAIL_PASSWORD'
     mail_from: str = 'MAIL_FROM'
     mail_port: int = 465
     mail_server: str = 'MAIL_SERVER'
+    mail_from_name: str = 'John Doe'
+    mail_ssl_tls: bool = True
+    mail_starttls: bool = False
+    mail_use_credentials: bool = True
+    mail_validate_certs: bool = True
+    mail_timeout: float = 30.0
+    mail_pool_size: int = 4
+    mail_batch_size: int = 50
+    mail_max_attempts: int = 5
+    mail_retry_base: float = 30.0
+    mail_retry_max: float = 3600.0
+    mail_lease: int = 300
+    mail_poll_interval: float = 5.0
+    birthday_digest_enabled: bool = True
+    birthday_digest_days: int = 7
+    birthday_digest_hour: int = 8
+    birthday_digest_batch_size: int = 500
     redis_host: str = 'localhost'
     redis_port: str = '6379'
     cloudinary_name: str = 'CLOUDINARY_NAME'
     cloudinary_api_key: str = 'CLOUDINARY_API_KEY'
     cloudinary_api_secret: str = 'CLOUDINARY_API_SECRET'
+    avatar_storage: str = 'cloudinary'
+    avatar_local_dir: str = 'media'
+    avatar_local_url: str = '/media'
+    avatar_max_bytes: int = 5 * 1024 * 1024
+    avatar_workers: int = 2
+    avatar_sizes: list[int] = [64, 128, 250]
+    avatar_format: str = 'webp'
+    avatar_quality: int = 80
+    avatar_max_pixels: int = 24_000_000
+    avatar_process_workers: int = 2
+    rate_limit_enabled: bool = True
+    rate_limit_user_times: int = 10
+    rate_limit_user_seconds: int = 60
+    rate_limit_ip_times: int = 30
+    rate_limit_ip_seconds: int = 60
+    rate_limit_sync_interval: float = 0.5
+    bulk_import_batch_size: int = 1000
+    bulk_import_max_errors: int = 1000
+    user_cache_maxsize: int = 10000
+    user_cache_ttl: int = 30
+    user_cache_redis_ttl: int = 300
+    contact_cache_ttl: int = 300
     
     
 
@@ -0,0 +1,11 @@
+from datetime import datetime, timezone
+
+
+def utcnow() -> datetime:
+    """
+    The utcnow function returns the current UTC time as a naive datetime, the way timestamps are stored.
+        The outbox, the refresh sessions and the tokens that expire with them all read this one clock.
+
+    :return: The current time
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
@@ -1,12 +1,148 @@
+import threading
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from src.conf.config import settings
+from src.database.pool import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool
+from src.services.instrumentation import instrument_engine
+from src.services.query_profiler import profile_engine
+from src.services.readiness import watch_engine
+
+
+def get_engine_options(database_url: str, poolclass: type) -> dict:
+    """
+    The get_engine_options function builds the pool keyword arguments for create_engine from the settings.
+        SQLite databases are local files without network connections, so they keep SQLAlchemy's default pool.
+
+    :param database_url: str: The database url the engine is created for
+    :param poolclass: type: The queue pool class used for server databases
+    :return: A dictionary of keyword arguments for create_engine or create_async_engine
+    """
+    if make_url(database_url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
 
 SQLALCHEMY_DATABASE_URL = settings.sqlalchemy_database_url
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def get_async_database_url(database_url: str) -> str:
+    """
+    The get_async_database_url function turns a synchronous database url into its asyncio counterpart.
+        postgresql+psycopg2://... becomes postgresql+asyncpg://... and sqlite:///... becomes sqlite+aiosqlite:///...
+        Urls that already name an async driver are returned unchanged.
+
+    :param database_url: str: The synchronous SQLAlchemy database url
+    :return: A database url that can be passed to create_async_engine
+    """
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None or url.get_driver_name() == driver:
+        return database_url
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SQLALCHEMY_ASYNC_DATABASE_URL = settings.sqlalchemy_async_database_url or get_async_database_url(SQLALCHEMY_DATABASE_URL)
+
+_engines: dict[str, Engine | AsyncEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def _observe(engine: Engine) -> None:
+    instrument_engine(engine)
+    profile_engine(engine)
+    watch_engine(engine)
+
+
+def get_engine() -> Engine:
+    """
+    The get_engine function returns the synchronous engine, creating it on first use.
+        Creating an engine imports the database driver, so workers that never use the synchronous engine
+        do not pay for it at boot. No connection is opened until the first query.
+
+    :return: The synchronous engine
+    """
+    with _engines_lock:
+        if "sync" not in _engines:
+            engine = create_engine(SQLALCHEMY_DATABASE_URL,
+                                   **get_engine_options(SQLALCHEMY_DATABASE_URL, InstrumentedQueuePool))
+            _observe(engine)
+            _engines["sync"] = engine
+        return _engines["sync"]
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    The get_async_engine function returns the asyncio engine, creating it on first use.
+
+    :return: The asyncio engine
+    """
+    with _engines_lock:
+        if "async" not in _engines:
+            engine = create_async_engine(
+                SQLALCHEMY_ASYNC_DATABASE_URL,
+                **get_engine_options(SQLALCHEMY_ASYNC_DATABASE_URL, InstrumentedAsyncAdaptedQueuePool),
+            )
+            _observe(engine.sync_engine)
+            _engines["async"] = engine
+        return _engines["async"]
+
+
+def get_created_engines() -> dict[str, Engine | AsyncEngine]:
+    """
+    The get_created_engines function returns the engines that were already created, keyed by "sync" and "async".
+        Use it to report on the engines without creating the ones this worker never needed.
+
+    :return: A dictionary of engines
+    """
+    with _engines_lock:
+        return dict(_engines)
+
+
+def __getattr__(name: str):
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class LazySessionMaker(sessionmaker):
+    """
+    A sessionmaker that binds its sessions to the synchronous engine when no bind was configured.
+    """
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None and "bind" not in local_kw:
+            local_kw["bind"] = get_engine()
+        return super().__call__(**local_kw)
+
+
+class LazyAsyncSessionMaker(async_sessionmaker):
+    """
+    An async_sessionmaker that binds its sessions to the asyncio engine when no bind was configured,
+    so the engine is created when the first session is opened instead of at import.
+    """
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None and "bind" not in local_kw:
+            local_kw["bind"] = get_async_engine()
+        return super().__call__(**local_kw)
+
+
+SessionLocal = LazySessionMaker(autocommit=False, autoflush=False)
+AsyncSessionLocal = LazyAsyncSessionMaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 
 def get_db():
@@ -20,4 +156,16 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    """
+    The get_async_db function opens a new asyncio database session for the current request.
+        The session is backed by the async engine, so queries awaited through it never block the event loop.
+        It is the dependency used by every route and repository.
+
+    :return: An AsyncSession object
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Date, Boolean
+from sqlalchemy import Column, Integer, String, Date, Boolean, DDL, Index, JSON, event
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql.schema import ForeignKey
 from sqlalchemy.sql.sqltypes import Date, DateTime
 
@@ -17,9 +17,55 @@ class Contact(Base):
     phone_number = Column(String, nullable=False)
     birthday = Column(Date, nullable=False)
     additional_data = Column(String, nullable=True)
+    birthday_md = Column(Integer, nullable=True)
     user_id = Column('users_id', ForeignKey('users.id', ondelete='CASCADE'), default=None)
     user = relationship('User', backref='contacts')
 
+    __table_args__ = (
+        Index('ix_contacts_first_name_trgm', 'first_name', postgresql_using='gin',
+              postgresql_ops={'first_name': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        Index('ix_contacts_last_name_trgm', 'last_name', postgresql_using='gin',
+              postgresql_ops={'last_name': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        Index('ix_contacts_email_trgm', 'email', postgresql_using='gin',
+              postgresql_ops={'email': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        Index('ix_contacts_users_id_id', 'users_id', 'id'),
+        Index('ix_contacts_users_id_last_name_first_name', 'users_id', 'last_name', 'first_name'),
+        Index('ix_contacts_users_id_email', 'users_id', 'email'),
+        Index('ix_contacts_users_id_birthday_md', 'users_id', 'birthday_md'),
+    )
+
+    @validates('birthday')
+    def validate_birthday(self, key, birthday):
+        """
+        The validate_birthday function keeps birthday_md in sync with birthday.
+            birthday_md stores the birthday as month * 100 + day, so upcoming birthdays can be found
+            with an index range scan regardless of the birth year.
+
+        :param self: Represent the instance of the class
+        :param key: The name of the validated attribute
+        :param birthday: The new birthday
+        :return: The birthday, unchanged
+        """
+        self.birthday_md = birthday_month_day(birthday) if birthday is not None else None
+        return birthday
+
+
+def birthday_month_day(birthday) -> int:
+    """
+    The birthday_month_day function encodes the month and day of a date as one sortable integer.
+
+    :param birthday: date: The date to encode
+    :return: month * 100 + day, e.g. 1005 for October 5th
+    """
+    return birthday.month * 100 + birthday.day
+
+
+event.listen(
+    Contact.__table__,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'),
+)
+
 
 class User(Base):
     __tablename__ = "users"
@@ -29,5 +75,48 @@ class User(Base):
     email = Column(String(250), nullable=False, unique=True)
     password = Column(String(255), nullable=False)
     avatar = Column(String(255), nullable=True)
-    refresh_token = Column(String(255), nullable=True)
-    confirmed = Column(Boolean, default=False)
\ No newline at end of file
+    confirmed = Column(Boolean, default=False)
+
+
+class OutboxEmail(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True)
+    recipient = Column(String(250), nullable=False)
+    subject = Column(String(255), nullable=False)
+    template = Column(String(100), nullable=False)
+    context = Column(JSON, nullable=False)
+    status = Column(String(20), nullable=False, default='pending')
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False)
+    last_error = Column(String(1000), nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_email_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+
+class BirthdayDigestWatermark(Base):
+    __tablename__ = "birthday_digest_watermarks"
+
+    user_id = Column('users_id', ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    sent_on = Column(Date, nullable=False)
+
+
+class RefreshSession(Base):
+    __tablename__ = "refresh_sessions"
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column('users_id', ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    device = Column(String(255), nullable=True)
+    token_id = Column(String(32), nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    last_used_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_refresh_sessions_users_id_expires_at', 'users_id', 'expires_at'),
+    )
@@ -0,0 +1,78 @@
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from src.services.metrics import Histogram
+
+
+class PoolMetrics:
+    """
+    Counters collected by an instrumented connection pool.
+    """
+
+    def __init__(self):
+        self.wait_time = Histogram()
+        self.checkouts = 0
+        self.timeouts = 0
+
+
+class _InstrumentedPoolMixin:
+    """
+    Times every checkout so the wait for a free connection is visible from outside the pool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.wait_time.observe(time.perf_counter() - start)
+        self.metrics.checkouts += 1
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def get_pool_stats(pool: Pool) -> dict:
+    """
+    The get_pool_stats function describes the current state of a connection pool.
+        Queue based pools report their size, checked in and checked out connections and overflow.
+        Instrumented pools also report checkout totals, timeouts and the checkout wait time histogram.
+
+    :param pool: Pool: The pool of an engine
+    :return: A dictionary with the pool statistics
+    """
+    stats = {"pool": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+            "recycle": pool._recycle,
+            "pre_ping": pool._pre_ping,
+        })
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update({
+            "checkouts": metrics.checkouts,
+            "timeouts": metrics.timeouts,
+            "wait_time_seconds": metrics.wait_time.snapshot(),
+        })
+    return stats
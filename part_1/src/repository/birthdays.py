@@ -0,0 +1,81 @@
+from datetime import date
+from typing import Sequence
+
+from sqlalchemy import Row, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import BirthdayDigestWatermark, Contact, User
+from src.repository import outbox as repository_outbox
+from src.repository.contacts import birthday_window
+
+DIGEST_COLUMNS = (Contact.first_name, Contact.last_name, Contact.email, Contact.phone_number, Contact.birthday)
+
+
+async def get_digest_users(day: date, days: int, after_id: int, limit: int, db: AsyncSession) -> list[int]:
+    """
+    The get_digest_users function returns the next confirmed users that have contacts with a birthday in the
+    next days days and were not sent a digest on day yet.
+        Users are returned in id order after after_id, so callers can walk all users in chunks.
+
+    :param day: date: The day of the digest
+    :param days: int: The number of days to look ahead
+    :param after_id: int: Return only users with a larger id
+    :param limit: int: The largest number of users to return
+    :param db: AsyncSession: Pass the database session to the function
+    :return: The user ids
+    """
+    window, _ = birthday_window(day, days)
+    stmt = select(Contact.user_id).distinct()\
+        .join(User, User.id == Contact.user_id)\
+        .outerjoin(BirthdayDigestWatermark, BirthdayDigestWatermark.user_id == Contact.user_id)\
+        .filter(window, Contact.user_id > after_id, User.confirmed.is_(True))\
+        .filter((BirthdayDigestWatermark.sent_on.is_(None)) | (BirthdayDigestWatermark.sent_on < day))\
+        .order_by(Contact.user_id).limit(limit)
+    return list((await db.execute(stmt)).scalars())
+
+
+async def get_digest_rows(user_ids: list[int], day: date, days: int, db: AsyncSession) -> Sequence[Row]:
+    """
+    The get_digest_rows function returns the upcoming birthdays of several users in one query.
+
+    :param user_ids: list[int]: The users to read
+    :param day: date: The day of the digest
+    :param days: int: The number of days to look ahead
+    :param db: AsyncSession: Pass the database session to the function
+    :return: Rows of users_id, username, user email and the DIGEST_COLUMNS, grouped by user, nearest birthday first
+    """
+    window, order = birthday_window(day, days)
+    stmt = select(Contact.user_id, User.username, User.email.label('user_email'), *DIGEST_COLUMNS)\
+        .join(User, User.id == Contact.user_id)\
+        .filter(Contact.user_id.in_(user_ids), window)\
+        .order_by(Contact.user_id, *order, Contact.id)
+    return (await db.execute(stmt)).all()
+
+
+async def record_digests(day: date, messages: dict[int, dict], db: AsyncSession) -> int:
+    """
+    The record_digests function moves the watermark of each user to day and queues their digest in the outbox,
+    in one transaction.
+        The watermark only moves forward, and a digest is queued only for the users whose watermark this call
+        moved, so concurrent or repeated runs for the same day never send a second digest.
+
+    :param day: date: The day of the digest
+    :param messages: dict[int, dict]: The outbox message of each user, by user id
+    :param db: AsyncSession: Pass the database session to the function
+    :return: The number of queued digests
+    """
+    if not messages:
+        return 0
+    insert = postgresql_insert if db.get_bind().dialect.name == 'postgresql' else sqlite_insert
+    stmt = insert(BirthdayDigestWatermark).values([{'users_id': user_id, 'sent_on': day} for user_id in messages])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BirthdayDigestWatermark.user_id],
+        set_={'sent_on': stmt.excluded.sent_on},
+        where=BirthdayDigestWatermark.sent_on < stmt.excluded.sent_on,
+    ).returning(BirthdayDigestWatermark.user_id)
+    claimed = (await db.execute(stmt)).scalars().all()
+    await repository_outbox.add_emails([messages[user_id] for user_id in claimed], db)
+    await db.commit()
+    return len(claimed)
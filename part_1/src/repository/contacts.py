@@ -1,50 +1,86 @@
-from typing import List
-from datetime import datetime, timedelta
-from sqlalchemy import and_
+from typing import AsyncIterator, List, Sequence
+from datetime import date, timedelta
+from sqlalchemy import Row, and_, case, func, insert, or_, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from sqlalchemy.orm import Session
-
-from src.database.models import Contact, User
+from src.database.models import Contact, User, birthday_month_day
 from src.schemas import ContactBase
+from src.services.cache import contact_cache
 
 
-async def get_contacts(skip: int, limit: int, user: User, db: Session) -> List[Contact]:
+async def get_contacts(skip: int, limit: int, user: User, db: AsyncSession, after_id: int | None = None) -> List[Contact]:
     """
-    The get_contacts function returns a list of contacts for the user.
+    The get_contacts function returns a list of contacts for the user, ordered by id.
+        When after_id is given the page starts right after that contact (keyset pagination) and skip is ignored,
+        so deep pages cost the same as the first one and don't shift when contacts are inserted.
     
     :param skip: int: Skip a number of contacts in the database
     :param limit: int: Limit the number of contacts returned
     :param user: User: Get the user's id from the database
-    :param db: Session: Pass the database session to the function
+    :param db: AsyncSession: Pass the database session to the function
+    :param after_id: int | None: The id of the last contact of the previous page
     :return: A list of contacts
     """
-    return db.query(Contact).filter(Contact.user_id == user.id).offset(skip).limit(limit).all()
+    stmt = select(Contact).filter(Contact.user_id == user.id).order_by(Contact.id).limit(limit)
+    if after_id is not None:
+        stmt = stmt.filter(Contact.id > after_id)
+    else:
+        stmt = stmt.offset(skip)
+    contacts = await db.execute(stmt)
+    return contacts.scalars().all()
+
+
+EXPORT_COLUMNS = (Contact.id, Contact.first_name, Contact.last_name, Contact.email, Contact.phone_number,
+                  Contact.birthday, Contact.additional_data)
+
+
+async def stream_contacts(user: User, db: AsyncSession, batch_size: int = 1000) -> AsyncIterator[Sequence[Row]]:
+    """
+    The stream_contacts function reads all contacts of the user through a server-side cursor.
+        Rows are fetched batch_size at a time as plain tuples of EXPORT_COLUMNS, without ORM objects,
+        so memory use doesn't depend on the size of the address book.
+    
+    :param user: User: The owner of the contacts
+    :param db: AsyncSession: Access the database
+    :param batch_size: int: The number of rows fetched per round trip
+    :return: An async iterator of row batches
+    """
+    stmt = (
+        select(*EXPORT_COLUMNS)
+        .filter(Contact.user_id == user.id)
+        .order_by(Contact.id)
+        .execution_options(yield_per=batch_size)
+    )
+    result = await db.stream(stmt)
+    async for rows in result.partitions():
+        yield rows
 
 
-async def get_contact(contact_id: int, user: User, db: Session) -> Contact:
+async def get_contact(contact_id: int, user: User, db: AsyncSession) -> Contact:
     """
     The get_contact function returns a contact from the database.
         Args:
             contact_id (int): The id of the contact to retrieve.
             user (User): The user who owns the requested Contact.
-            db (Session): A database session object for querying and updating data in our database.
+            db (AsyncSession): A database session object for querying and updating data in our database.
     
     :param contact_id: int: Specify the id of the contact we want to get
     :param user: User: Get the user_id from the database
-    :param db: Session: Pass the database session to the function
+    :param db: AsyncSession: Pass the database session to the function
     :return: A contact object
     """
-    return db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    contact = await db.execute(select(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)))
+    return contact.scalar_one_or_none()
 
 
-async def create_contact(body: ContactBase, user: User, db: Session) -> Contact:
+async def create_contact(body: ContactBase, user: User, db: AsyncSession) -> Contact:
     """
     The create_contact function creates a new contact in the database.
         
     
     :param body: ContactBase: Pass the data from the request body to the function
     :param user: User: Get the user_id from the user object and  representing the owner of the contact
-    :param db: Session: Access the database
+    :param db: AsyncSession: Access the database
     :return: A newly created contact object
     """
     contact = Contact(
@@ -57,103 +93,155 @@ async def create_contact(body: ContactBase, user: User, db: Session) -> Contact:
     user_id=user.id
     )
     db.add(contact)
-    db.commit()
-    db.refresh(contact)
+    await db.commit()
+    await db.refresh(contact)
+    await contact_cache.bump(user.id)
     return contact
 
 
-async def update_contact(contact_id: int, body: ContactBase, user: User, db: Session) -> Contact| None:
+async def create_contacts(bodies: List[ContactBase], user: User, db: AsyncSession) -> int:
+    """
+    The create_contacts function inserts many contacts with a single executemany statement and commits them.
+        The rows bypass the ORM unit of work, so birthday_md is computed here.
+    
+    :param bodies: List[ContactBase]: The validated contacts to insert
+    :param user: User: The owner of the new contacts
+    :param db: AsyncSession: Access the database
+    :return: The number of inserted contacts
+    """
+    rows = [
+        {**body.model_dump(), 'birthday_md': birthday_month_day(body.birthday), 'users_id': user.id}
+        for body in bodies
+    ]
+    if rows:
+        await db.execute(insert(Contact.__table__), rows)
+        await db.commit()
+        await contact_cache.bump(user.id)
+    return len(rows)
+
+
+async def update_contact(contact_id: int, body: ContactBase, user: User, db: AsyncSession) -> Contact| None:
     """
     The update_contact function updates a contact in the database.
         Args:
             contact_id (int): The id of the contact to update.
             body (ContactBase): The updated information for the specified user's contact.
             user (User): The current logged-in user, used to verify that they are updating their own data and not someone else's data.
-            db (Session): A connection to our database, used for querying and committing changes.
+            db (AsyncSession): A connection to our database, used for querying and committing changes.
     
     :param contact_id: int: Specify which contact to update
     :param body: ContactBase: Get the data from the request body
     :param user: User: Ensure that the user is only able to update contacts that they have created
-    :param db: Session: Access the database
+    :param db: AsyncSession: Access the database
     :return: A contact object if the contact is updated, else None;
     """
-    contact = db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    contact = await get_contact(contact_id, user, db)
     if contact:
-        contact.first_name=body.first_name, 
-        contact.last_name=body.last_name, 
-        contact.email=body.email, 
-        contact.phone_number=body.phone_number, 
-        contact.birthday=body.birthday, 
-        contact.additional_data=body.additional_data
-        contact.user_id=user.id
-        db.commit()
+        contact.first_name = body.first_name
+        contact.last_name = body.last_name
+        contact.email = body.email
+        contact.phone_number = body.phone_number
+        contact.birthday = body.birthday
+        contact.additional_data = body.additional_data
+        contact.user_id = user.id
+        await db.commit()
+        await contact_cache.bump(user.id)
     return contact
 
 
-async def remove_contact(contact_id: int, user: User, db: Session)  -> Contact | None:
+async def remove_contact(contact_id: int, user: User, db: AsyncSession)  -> Contact | None:
     """
     The remove_contact function removes a contact from the database.
         Args:
             contact_id (int): The id of the contact to be removed.
             user (User): The user who owns the contacts being removed.
-            db (Session): A connection to our database, used for querying and deleting data.
+            db (AsyncSession): A connection to our database, used for querying and deleting data.
     
     :param contact_id: int: Identify the contact to be deleted
     :param user: User: Get the user_id from the database
-    :param db: Session: Access the database
+    :param db: AsyncSession: Access the database
     :return: A contact object, so the return type should be contact
     """
-    contact = db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    contact = await get_contact(contact_id, user, db)
     if contact:
-        db.delete(contact)
-        db.commit()
+        await db.delete(contact)
+        await db.commit()
+        await contact_cache.bump(user.id)
     return contact
 
 
-async def search_contacts(query: str, user: User, db: Session) -> List[Contact]:
+async def search_contacts(query: str, user: User, db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Contact]:
     """
     The search_contacts function searches for contacts by first name, last name, and email.
-        It returns a list of all the contacts that match the query.
+        It runs one query over the three columns, so every contact is returned once.
+        On PostgreSQL the match is served by the pg_trgm GIN indexes and ranked by trigram similarity,
+        other databases rank prefix matches first.
     
     :param query: str: Search the database for a contact
     :param user: User: Get the user id to filter out contacts that don't belong to the current user
-    :param db: Session: Pass the database session to the function
+    :param db: AsyncSession: Pass the database session to the function
+    :param skip: int: Skip a number of matching contacts
+    :param limit: int: Limit the number of contacts returned
     :return: A list of contacts
     """
-    response = []
-    search_by_first_name = db.query(Contact).filter(and_(Contact.first_name.like(f'%{query}%'), Contact.user_id == user.id)).all()
-    if search_by_first_name:
-        for i in search_by_first_name:
-            response.append(i)
-    search_by_last_name = db.query(Contact).filter(and_(Contact.last_name.like(f'%{query}%'), Contact.user_id == user.id)).all()
-    if search_by_last_name:
-        for i in search_by_last_name:
-            response.append(i)
-    search_by_email = db.query(Contact).filter(and_(Contact.email.like(f'%{query}%'), Contact.user_id == user.id)).all()
-    if search_by_email:
-        for i in search_by_email:
-            response.append(i)
-            
-    return response
-
-
-async def get_birthday_per_week(days: int, user: User, db: Session) -> Contact:
+    columns = (Contact.first_name, Contact.last_name, Contact.email)
+    pattern = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    if db.get_bind().dialect.name == 'postgresql':
+        rank = func.greatest(*(func.similarity(column, query) for column in columns)).desc()
+    else:
+        rank = case((or_(*(column.ilike(f'{pattern}%', escape='\\') for column in columns)), 0), else_=1)
+    stmt = (
+        select(Contact)
+        .filter(Contact.user_id == user.id)
+        .filter(or_(*(column.ilike(f'%{pattern}%', escape='\\') for column in columns)))
+        .order_by(rank, Contact.last_name, Contact.first_name, Contact.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    contacts = await db.execute(stmt)
+    return contacts.scalars().all()
+
+
+async def get_birthday_per_week(days: int, user: User, db: AsyncSession, today: date | None = None) -> List[Contact]:
     """
     The get_birthday_per_week function returns a list of contacts whose birthday is within the next 7 days.
+        The match runs in SQL on the indexed birthday_md column, so only matching rows are loaded.
+        Ranges that cross the new year are split in two, and February 29th birthdays are matched
+        whenever the range covers the end of February.
         Args:
             days (int): The number of days to look ahead for birthdays. Default is 7.
             user (User): The User object that owns the contact list being queried.
-            db (Session): A database session object used to query the database for contacts belonging to a specific user.
+            db (AsyncSession): A database session object used to query the database for contacts belonging to a specific user.
     
     :param days: int: Specify the number of days in which we want to get all contacts with birthdays
     :param user: User: The User object that owns the contacts
-    :param db: Session: Access the database
-    :return: A list of contacts, but the return type is contact
+    :param db: AsyncSession: Access the database
+    :param today: date | None: The first day of the range, today by default
+    :return: A list of contacts, the nearest birthday first
     """
-    response = []
-    all_contacts = db.query(Contact).filter(Contact.user_id == user.id).all()
-    for contact in all_contacts:
-        if timedelta(0) <= ((contact.birthday.replace(year=int((datetime.now()).year))) - datetime.now().date()) <= timedelta(days):
-            response.append(contact)
+    if days < 0:
+        return []
+    window, order = birthday_window(today or date.today(), days)
+    stmt = select(Contact).filter(Contact.user_id == user.id, window).order_by(*order, Contact.id)
+    contacts = await db.execute(stmt)
+    return contacts.scalars().all()
+
 
-    return response
\ No newline at end of file
+def birthday_window(today: date, days: int) -> tuple:
+    """
+    The birthday_window function builds the filter and ordering for birthdays in the next days days.
+        Ranges that cross the new year are split in two; a range of a year or more matches every contact.
+
+    :param today: date: The first day of the range
+    :param days: int: The number of days to look ahead
+    :return: The filter and the order_by clauses, nearest birthday first
+    """
+    start = birthday_month_day(today)
+    end = birthday_month_day(today + timedelta(days))
+    if days >= 365:
+        window = true()
+    elif start <= end:
+        window = Contact.birthday_md.between(start, end)
+    else:
+        window = or_(Contact.birthday_md >= start, Contact.birthday_md <= end)
+    return window, (Contact.birthday_md < start, Contact.birthday_md)
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.clock import utcnow
+from src.database.models import OutboxEmail
+
+
+async def enqueue_email(recipient: str, subject: str, template: str, context: dict, db: AsyncSession) -> OutboxEmail:
+    """
+    The enqueue_email function stores a message in the outbox; the email worker sends it.
+
+    :param recipient: str: The email address of the recipient
+    :param subject: str: The subject of the message
+    :param template: str: The name of the template used to render the message
+    :param context: dict: The template variables, stored as JSON
+    :param db: AsyncSession: Pass the database session to the function
+    :return: The queued message
+    """
+    now = utcnow()
+    email = OutboxEmail(recipient=recipient, subject=subject, template=template, context=context,
+                        status='pending', attempts=0, next_attempt_at=now, created_at=now)
+    db.add(email)
+    await db.commit()
+    return email
+
+
+async def add_emails(messages: list[dict], db: AsyncSession) -> None:
+    """
+    The add_emails function adds many messages to the outbox with one batched insert, without committing,
+    so callers can queue emails in the same transaction as their own changes.
+
+    :param messages: list[dict]: The recipient, subject, template and context of each message
+    :param db: AsyncSession: Pass the database session to the function
+    :return: None
+    """
+    if not messages:
+        return
+    now = utcnow()
+    await db.execute(insert(OutboxEmail), [
+        {**message, 'status': 'pending', 'attempts': 0, 'next_attempt_at': now, 'created_at': now}
+        for message in messages
+    ])
+
+
+async def claim_emails(limit: int, lease: int, db: AsyncSession) -> list[OutboxEmail]:
+    """
+    The claim_emails function takes the next due messages and leases them to the caller.
+        Claimed rows get their next attempt moved lease seconds ahead, so concurrent workers skip them,
+        and a worker that dies mid-send leaves them to be retried once the lease expires.
+        On PostgreSQL the rows are locked with SKIP LOCKED while they are claimed.
+
+    :param limit: int: The largest number of messages to claim
+    :param lease: int: How long the caller may take to send them, in seconds
+    :param db: AsyncSession: Pass the database session to the function
+    :return: The claimed messages
+    """
+    now = utcnow()
+    stmt = select(OutboxEmail).where(OutboxEmail.status == 'pending', OutboxEmail.next_attempt_at <= now)\
+        .order_by(OutboxEmail.next_attempt_at, OutboxEmail.id).limit(limit).with_for_update(skip_locked=True)
+    emails = (await db.execute(stmt)).scalars().all()
+    for email in emails:
+        email.attempts += 1
+        email.next_attempt_at = now + timedelta(seconds=lease)
+    await db.commit()
+    return emails
+
+
+async def mark_sent(ids: list[int], db: AsyncSession) -> None:
+    """
+    The mark_sent function records that messages were delivered.
+
+    :param ids: list[int]: The ids of the sent messages
+    :param db: AsyncSession: Pass the database session to the function
+    :return: None
+    """
+    if not ids:
+        return
+    await db.execute(update(OutboxEmail).where(OutboxEmail.id.in_(ids))
+                     .values(status='sent', sent_at=utcnow(), last_error=None))
+    await db.commit()
+
+
+async def mark_failed(email_id: int, error: str, retry_at: datetime | None, db: AsyncSession) -> None:
+    """
+    The mark_failed function records a failed delivery.
+
+    :param email_id: int: The id of the message
+    :param error: str: What went wrong
+    :param retry_at: datetime | None: When to try again, None gives up on the message
+    :param db: AsyncSession: Pass the database session to the function
+    :return: None
+    """
+    values = {'last_error': error[:1000]}
+    if retry_at is None:
+        values['status'] = 'failed'
+    else:
+        values['next_attempt_at'] = retry_at
+    await db.execute(update(OutboxEmail).where(OutboxEmail.id == email_id).values(**values))
+    await db.commit()
@@ -0,0 +1,88 @@
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.clock import utcnow
+from src.database.models import RefreshSession, User
+
+
+async def create_session(session_id: str, user: User, device: str | None, token_id: str, expires_at: datetime,
+                         db: AsyncSession) -> RefreshSession:
+    """
+    The create_session function starts a refresh token family for one device of a user.
+        Expired sessions of the user are deleted at the same time, so the table only grows with active devices.
+
+    :param session_id: str: The id of the session, stored in the sid claim of its refresh tokens
+    :param user: User: The owner of the session
+    :param device: str | None: A description of the client, e.g. its User-Agent
+    :param token_id: str: The jti of the first refresh token
+    :param expires_at: datetime: When the session ends unless it is refreshed
+    :param db: AsyncSession: Pass the database session to the function
+    :return: The new session
+    """
+    now = utcnow()
+    await db.execute(delete(RefreshSession).where(RefreshSession.user_id == user.id, RefreshSession.expires_at <= now))
+    session = RefreshSession(id=session_id, user_id=user.id, device=device, token_id=token_id, created_at=now,
+                             last_used_at=now, expires_at=expires_at)
+    db.add(session)
+    await db.commit()
+    return session
+
+
+async def rotate_session(session_id: str, token_id: str, new_token_id: str, expires_at: datetime,
+                         db: AsyncSession) -> bool:
+    """
+    The rotate_session function replaces the current refresh token of a session with a new one.
+        The check and the update are one statement, so a refresh token can be exchanged only once
+        even when two requests race with it.
+
+    :param session_id: str: The sid claim of the presented token
+    :param token_id: str: The jti claim of the presented token
+    :param new_token_id: str: The jti of the replacement token
+    :param expires_at: datetime: The new end of the session
+    :param db: AsyncSession: Pass the database session to the function
+    :return: True if the presented token was the current token of an active session
+    """
+    now = utcnow()
+    result = await db.execute(
+        update(RefreshSession)
+        .where(RefreshSession.id == session_id, RefreshSession.token_id == token_id,
+               RefreshSession.revoked_at.is_(None), RefreshSession.expires_at > now)
+        .values(token_id=new_token_id, last_used_at=now, expires_at=expires_at)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def revoke_session(session_id: str, db: AsyncSession, user: User | None = None) -> bool:
+    """
+    The revoke_session function ends a session; refresh tokens of a revoked session are rejected.
+
+    :param session_id: str: The id of the session
+    :param db: AsyncSession: Pass the database session to the function
+    :param user: User | None: Revoke the session only if it belongs to this user
+    :return: True if an active session was revoked
+    """
+    stmt = update(RefreshSession).where(RefreshSession.id == session_id, RefreshSession.revoked_at.is_(None))
+    if user is not None:
+        stmt = stmt.where(RefreshSession.user_id == user.id)
+    result = await db.execute(stmt.values(revoked_at=utcnow()))
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def get_sessions(user: User, db: AsyncSession) -> List[RefreshSession]:
+    """
+    The get_sessions function returns the active sessions of a user, the most recently used first.
+
+    :param user: User: The owner of the sessions
+    :param db: AsyncSession: Pass the database session to the function
+    :return: A list of sessions
+    """
+    stmt = select(RefreshSession).where(RefreshSession.user_id == user.id, RefreshSession.revoked_at.is_(None),
+                                        RefreshSession.expires_at > utcnow())\
+        .order_by(RefreshSession.last_used_at.desc())
+    sessions = await db.execute(stmt)
+    return sessions.scalars().all()
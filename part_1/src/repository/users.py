@@ -1,91 +1,93 @@
-from libgravatar import Gravatar
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import User
 from src.schemas import UserModel
+from src.services.cache import user_cache
 
 
-async def get_user_by_email(email: str, db: Session) -> User:
+async def get_user_by_email(email: str, db: AsyncSession) -> User:
     """
     The get_user_by_email function takes in an email and a database session,
     and returns the user associated with that email. If no such user exists,
     it returns None.
     
     :param email: str: Pass in the email of the user that we want to get
-    :param db: Session: Pass the database session to the function
+    :param db: AsyncSession: Pass the database session to the function
     :return: The first user found with the email specified
     """
-    return db.query(User).filter(User.email == email).first()
+    user = await db.execute(select(User).filter(User.email == email))
+    return user.scalar_one_or_none()
 
 
-async def create_user(body: UserModel, db: Session) -> User:
+async def create_user(body: UserModel, db: AsyncSession) -> User:
     """
     The create_user function creates a new user in the database.
         Args:
             body (UserModel): The UserModel object containing the information to be added to the database.
-            db (Session): The SQLAlchemy Session object used for querying and updating data in the database.
+            db (AsyncSession): The SQLAlchemy AsyncSession object used for querying and updating data in the database.
         Returns:
             User: A User object representing a newly created user.
     
     :param body: UserModel: Get the data from the request body
-    :param db: Session: Pass the database session into the function
+    :param db: AsyncSession: Pass the database session into the function
     :return: A user object
     """
-    avatar = None
-    try:
-        g = Gravatar(body.email)
-        avatar = g.get_image()
-    except Exception as e:
-        print(e)
-    new_user = User(**body.dict(), avatar=avatar)
+    new_user = User(**body.dict())
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 
-async def update_token(user: User, token: str | None, db: Session) -> None:
-    """
-    The update_token function updates the refresh token for a user.
-    
-    :param user: User: Identify the user that is being updated
-    :param token: str | None: Pass in the token value
-    :param db: Session: Create a connection to the database
-    :return: None
-    :doc-author: Trelent
-    """
-    user.refresh_token = token
-    db.commit()
-
-
-async def confirmed_email(email: str, db: Session) -> None:
+async def confirmed_email(email: str, db: AsyncSession) -> None:
     """
     The confirmed_email function sets the confirmed field of a user to True.
     
     :param email: str: Get the email of the user
-    :param db: Session: Pass in the database session
+    :param db: AsyncSession: Pass in the database session
     :return: None, but the return type is set to none
     """
     user = await get_user_by_email(email, db)
     user.confirmed = True
-    db.commit()
+    await db.commit()
+    await user_cache.invalidate(email)
 
 
-async def update_avatar(email, url: str, db: Session) -> User:
+async def update_avatar(email, url: str, db: AsyncSession) -> User:
     """
     The update_avatar function updates the avatar of a user.
     
     Args:
         email (str): The email address of the user to update.
         url (str): The URL for the new avatar image.
-        db (Session, optional): A database session object to use instead of creating one locally. Defaults to None.
+        db (AsyncSession, optional): A database session object to use instead of creating one locally. Defaults to None.
     
     :param email: Find the user in the database
     :param url: str: Specify the type of data that is being passed to the function
-    :param db: Session: Pass the database session to the function
+    :param db: AsyncSession: Pass the database session to the function
     :return: A user object, so we can use it to update the avatar in the database
     """
     user = await get_user_by_email(email, db)
     user.avatar = url
-    db.commit()
-    return user
\ No newline at end of file
+    await db.commit()
+    await user_cache.invalidate(email)
+    return user
+
+
+async def set_default_avatar(email: str, url: str, db: AsyncSession) -> bool:
+    """
+    The set_default_avatar function sets the avatar of a user that has none yet.
+        The check and the update are a single statement, so an avatar uploaded in the meantime is kept.
+
+    :param email: str: Find the user in the database
+    :param url: str: The url of the default avatar
+    :param db: AsyncSession: Pass the database session to the function
+    :return: True if the avatar was set
+    """
+    result = await db.execute(update(User).where(User.email == email, User.avatar.is_(None)).values(avatar=url))
+    await db.commit()
+    if not result.rowcount:
+        return False
+    await user_cache.invalidate(email)
+    return True
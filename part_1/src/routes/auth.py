@@ -1,49 +1,65 @@
+import uuid
+from datetime import datetime, timedelta
 from typing import List
 
 from fastapi import APIRouter, HTTPException, Depends, status, Security, BackgroundTasks, Request
 
 from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.db import get_db
-from src.schemas import UserModel, UserResponse, TokenModel, RequestEmail
+from src.database.clock import utcnow
+from src.database.db import get_async_db
+from src.database.models import User
+from src.schemas import UserModel, UserResponse, TokenModel, RequestEmail, SessionResponse
+from src.repository import sessions as repository_sessions
 from src.repository import users as repository_users
+from src.conf.config import settings
 from src.services.auth import auth_service
 from src.services.email import send_email
+from src.services.gravatar import enrich_avatar
 
 router = APIRouter(prefix='/auth', tags=["auth"])
 security = HTTPBearer()
 
 
+def refresh_expires_at() -> datetime:
+    return utcnow() + timedelta(seconds=settings.refresh_token_ttl)
+
+
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def signup(body: UserModel, background_tasks: BackgroundTasks, request: Request, db: Session = Depends(get_db)):
+async def signup(body: UserModel, background_tasks: BackgroundTasks, request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     The signup function creates a new user in the database.
-        It also sends an email to the user's email address for confirmation.
+        It also sends an email to the user's email address for confirmation and looks up a Gravatar avatar
+        once the response has been sent.
         The function returns a JSON object containing the newly created user and a message.
     
     :param body: UserModel: Get the data from the request body
     :param background_tasks: BackgroundTasks: Add a task to the background tasks queue
     :param request: Request: Get the base url of the application
-    :param db: Session: Access the database
+    :param db: AsyncSession: Access the database
     :return: A dictionary with the user and a detail message
     """
     exist_user = await repository_users.get_user_by_email(body.email, db)
     if exist_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Account already exists")
-    body.password = auth_service.get_password_hash(body.password)
+    body.password = await auth_service.get_password_hash(body.password)
     new_user = await repository_users.create_user(body, db)
-    background_tasks.add_task(send_email, new_user.email, new_user.username, request.base_url)
+    await send_email(new_user.email, new_user.username, str(request.base_url), db)
+    background_tasks.add_task(enrich_avatar, new_user.email)
     return {"user": new_user, "detail": "User successfully created. Check your email for confirmation."}
 
 
 @router.post("/login", response_model=TokenModel)
-async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(request: Request, body: OAuth2PasswordRequestForm = Depends(),
+                db: AsyncSession = Depends(get_async_db)):
     """
     The login function is used to authenticate a user.
+    Every login starts a new refresh session, so each device of a user keeps its own refresh token.
     
+    :param request: Request: Get the User-Agent that names the session
     :param body: OAuth2PasswordRequestForm: Validate the request body
-    :param db: Session: Access the database
+    :param db: AsyncSession: Access the database
     :return: A dictionary with the access_token, refresh_token and token_type
     """
     user = await repository_users.get_user_by_email(body.username, db)
@@ -51,40 +67,74 @@ async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depen
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email")
     if not user.confirmed:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email not confirmed")
-    if not auth_service.verify_password(body.password, user.password):
+    if not await auth_service.verify_password(body.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
+    session_id, token_id = uuid.uuid4().hex, uuid.uuid4().hex
     access_token = await auth_service.create_access_token(data={"sub": user.email})
-    refresh_token = await auth_service.create_refresh_token(data={"sub": user.email})
-    await repository_users.update_token(user, refresh_token, db)
+    refresh_token = await auth_service.create_refresh_token(data={"sub": user.email, "sid": session_id, "jti": token_id})
+    device = (request.headers.get("user-agent") or "")[:255] or None
+    await repository_sessions.create_session(session_id, user, device, token_id, refresh_expires_at(), db)
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
+
 @router.get('/refresh_token', response_model=TokenModel)
-async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security), db: Session = Depends(get_db)):
+async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security), db: AsyncSession = Depends(get_async_db)):
     """
     The refresh_token function is used to refresh the access token.
     It takes in a refresh token and returns an access_token, a new refresh_token, and the type of token (bearer).
-    
+    Only the current refresh token of a session can be exchanged; presenting an older one revokes the session,
+    since it means the token was stolen or replayed. The users table is not read or written.
     
     :param credentials: HTTPAuthorizationCredentials: Get the credentials from the http request
-    :param db: Session: Access the database
+    :param db: AsyncSession: Access the database
     :return: A dict with the new access_token, refresh_token and token_type
     """
-    token = credentials.credentials
-    email = await auth_service.decode_refresh_token(token)
-    user = await repository_users.get_user_by_email(email, db)
-    if user.refresh_token != token:
-        await repository_users.update_token(user, None, db)
+    claims = await auth_service.decode_refresh_claims(credentials.credentials)
+    email, session_id, token_id = claims["sub"], claims.get("sid"), claims.get("jti")
+    if session_id is None or token_id is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    new_token_id = uuid.uuid4().hex
+    if not await repository_sessions.rotate_session(session_id, token_id, new_token_id, refresh_expires_at(), db):
+        await repository_sessions.revoke_session(session_id, db)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
 
     access_token = await auth_service.create_access_token(data={"sub": email})
-    refresh_token = await auth_service.create_refresh_token(data={"sub": email})
-    await repository_users.update_token(user, refresh_token, db)
+    refresh_token = await auth_service.create_refresh_token(data={"sub": email, "sid": session_id, "jti": new_token_id})
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
+@router.get('/sessions', response_model=List[SessionResponse])
+async def read_sessions(current_user: User = Depends(auth_service.get_current_user),
+                        db: AsyncSession = Depends(get_async_db)):
+    """
+    The read_sessions function lists the active refresh sessions of the current user, one per logged in device.
+    
+    :param current_user: User: Get the current user
+    :param db: AsyncSession: Access the database
+    :return: A list of sessions
+    """
+    return await repository_sessions.get_sessions(current_user, db)
+
+
+@router.delete('/sessions/{session_id}', status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_session(session_id: str, current_user: User = Depends(auth_service.get_current_user),
+                         db: AsyncSession = Depends(get_async_db)):
+    """
+    The revoke_session function logs a device out: its refresh token stops working.
+        Access tokens already issued stay valid until they expire.
+    
+    :param session_id: str: The id of the session
+    :param current_user: User: Get the current user
+    :param db: AsyncSession: Access the database
+    :return: None
+    """
+    if not await repository_sessions.revoke_session(session_id, db, user=current_user):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
+
+
 @router.get('/confirmed_email/{token}')
-async def confirmed_email(token: str, db: Session = Depends(get_db)):
+async def confirmed_email(token: str, db: AsyncSession = Depends(get_async_db)):
     """
     The confirmed_email function is used to confirm a user's email address.
         It takes the token from the URL and uses it to get the user's email address.
@@ -94,7 +144,7 @@ async def confirmed_email(token: str, db: Session = Depends(get_db)):
         their account will be marked as confirmed.
     
     :param token: str: Get the token from the url
-    :param db: Session: Access the database
+    :param db: AsyncSession: Access the database
     :return: A dictionary with a message 'Verification error' or 'Your email is already confirmed' or 'Email confirmed'
     :doc-author: Trelent
     """
@@ -109,20 +159,17 @@ async def confirmed_email(token: str, db: Session = Depends(get_db)):
 
 
 @router.post('/request_email')
-async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, request: Request,
-                        db: Session = Depends(get_db)):
+async def request_email(body: RequestEmail, request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     The request_email function is used to send an email to the user with a link that will allow them
     to confirm their email address. The function takes in a RequestEmail object, which contains the
     email of the user who wants to confirm their account. It then checks if there is already a confirmed
-    user with that email address, and if so returns an error message. If not, it sends 
-    an asynchronous task (using FastAPI's BackgroundTasks) to send_email(), which sends out an actual 
-    confirmation email.
+    user with that email address, and if so returns an error message. If not, it queues
+    a confirmation email in the outbox with send_email(), which the email worker sends out.
     
     :param body: RequestEmail: Get the email from the request body
-    :param background_tasks: BackgroundTasks: Add a task to the background tasks queue
     :param request: Request: Get the base url of the application
-    :param db: Session: Access the database
+    :param db: AsyncSession: Access the database
     :return: A dict with a message key
     """
     user = await repository_users.get_user_by_email(body.email, db)
@@ -130,5 +177,5 @@ async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, r
     if user.confirmed:
         return {"message": "Your email is already confirmed"}
     if user:
-        background_tasks.add_task(send_email, user.email, user.username, request.base_url)
+        await send_email(user.email, user.username, str(request.base_url), db)
     return {"message": "Check your email for confirmation."}
\ No newline at end of file
@@ -1,22 +1,32 @@
+from datetime import date
 from typing import List
 
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
-from fastapi_limiter.depends import RateLimiter
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.db import get_db
-from src.schemas import ContactBase, ContactResponse
+from src.database.db import get_async_db
+from src.schemas import BulkImportResponse, ContactBase, ContactResponse
 from src.database.models import Contact, User
 from src.repository import contacts as repository_contacts
 from src.services.auth import auth_service
+from src.services.bulk_import import import_contacts, iter_rows
+from src.services.cache import contact_cache, dump_json
+from src.services.export import MEDIA_TYPES, ExportFormat, export_contacts
+from src.services.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from src.services.rate_limit import limit_requests
 
 
 router = APIRouter(prefix="/contacts", tags=["contacts"])
 
+contact_adapter = TypeAdapter(ContactResponse)
+contacts_adapter = TypeAdapter(List[ContactResponse])
+
 
 @router.post("/", response_model=ContactResponse, status_code=status.HTTP_201_CREATED, description='No more than 10 requests per minute',
-            dependencies=[Depends(RateLimiter(times=10, seconds=60))])
-async def create_new_contact(body: ContactBase, db: Session = Depends(get_db),
+            dependencies=[Depends(limit_requests)])
+async def create_new_contact(body: ContactBase, db: AsyncSession = Depends(get_async_db),
                              current_user: User = Depends(auth_service.get_current_user)):
     """
     The create_new_contact function creates a new contact in the database.
@@ -24,7 +34,7 @@ async def create_new_contact(body: ContactBase, db: Session = Depends(get_db),
         The current_user variable is used to determine who created this contact.
     
     :param body: ContactBase: Get the data from the request body
-    :param db: Session: Pass the database session to the repository
+    :param db: AsyncSession: Pass the database session to the repository
     :param current_user: User: Get the user who is making the request
     :return: A contactbase object
     :doc-author: Trelent
@@ -32,63 +42,121 @@ async def create_new_contact(body: ContactBase, db: Session = Depends(get_db),
     return await repository_contacts.create_contact(body, current_user, db)
 
 
+@router.post("/bulk", response_model=BulkImportResponse, description='No more than 10 requests per minute',
+             dependencies=[Depends(limit_requests)])
+async def create_contacts_bulk(request: Request, db: AsyncSession = Depends(get_async_db),
+                               current_user: User = Depends(auth_service.get_current_user)):
+    """
+    The create_contacts_bulk function imports many contacts in one request.
+        The body is a JSON array (application/json), one JSON object per line (application/x-ndjson)
+        or a CSV file with a header row (text/csv). NDJSON and CSV bodies are processed while they are received.
+        Every row is validated like a single contact; valid rows are inserted in batches and invalid ones are
+        reported with their row number.
+    
+    :param request: Request: Read the streamed request body
+    :param db: AsyncSession: Pass the database session to the repository
+    :param current_user: User: Get the user who is making the request
+    :return: A report with the number of created and failed rows and the row errors
+    """
+    return await import_contacts(iter_rows(request), current_user, db)
+
+
 @router.get("/all", response_model=List[ContactResponse], description='No more than 10 requests per minute',
-            dependencies=[Depends(RateLimiter(times=10, seconds=60))])
-async def read_all_contacts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db),
+            dependencies=[Depends(limit_requests)])
+async def read_all_contacts(request: Request, skip: int = 0, limit: int = 100, cursor: str | None = None,
+                            db: AsyncSession = Depends(get_async_db),
                             current_user: User = Depends(auth_service.get_current_user)):
     """
     The read_all_contacts function returns a list of contacts.
         The function takes in an optional skip and limit parameter to paginate the results.
+        Every full page carries an opaque cursor in the X-Next-Cursor header; passing it back as the cursor
+        parameter returns the next page with keyset pagination. skip is kept for legacy clients.
+        Responses are cached per user and carry an ETag; a matching If-None-Match returns 304.
         
     
+    :param request: Request: Identify the cached response and read If-None-Match
     :param skip: int: Skip the first n contacts in the database
     :param limit: int: Limit the number of contacts returned
-    :param db: Session: Pass the database session to the repository layer
+    :param cursor: str | None: The X-Next-Cursor value of the previous page
+    :param db: AsyncSession: Pass the database session to the repository layer
     :param current_user: User: Get the current user
     :return: A list of contacts
     :doc-author: Trelent
     """
-    contacts = await repository_contacts.get_contacts(skip, limit, current_user, db)
-    return contacts
+    after_id = decode_cursor(cursor) if cursor else None
+
+    async def load():
+        contacts = await repository_contacts.get_contacts(skip, limit, current_user, db, after_id)
+        headers = {}
+        if contacts and len(contacts) == limit:
+            headers[NEXT_CURSOR_HEADER] = encode_cursor(contacts[-1].id)
+        return dump_json(contacts_adapter, contacts), headers
+
+    return await contact_cache.respond(request, current_user, load)
+
+
+@router.get("/export", response_class=StreamingResponse, description='No more than 10 requests per minute',
+            dependencies=[Depends(limit_requests)])
+async def export_all_contacts(export_format: ExportFormat = Query("ndjson", alias="format"),
+                              current_user: User = Depends(auth_service.get_current_user)):
+    """
+    The export_all_contacts function streams every contact of the current user as NDJSON or CSV.
+        Rows are read through a server-side cursor and sent batch by batch, so the first bytes arrive
+        before the query finishes and memory stays flat for any address book size.
+    
+    :param export_format: ExportFormat: The format query parameter, ndjson or csv
+    :param current_user: User: Get the current user
+    :return: A streaming response with the contacts
+    """
+    return StreamingResponse(
+        export_contacts(current_user, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="contacts.{export_format}"'},
+    )
 
 
 @router.get("/{contact_id}", response_model=ContactResponse, description='No more than 10 requests per minute',
-            dependencies=[Depends(RateLimiter(times=10, seconds=60))])
-async def read_contact_by_id(contact_id: int, db: Session = Depends(get_db),
+            dependencies=[Depends(limit_requests)])
+async def read_contact_by_id(contact_id: int, request: Request, db: AsyncSession = Depends(get_async_db),
                              current_user: User = Depends(auth_service.get_current_user)):
     """
     The read_contact_by_id function returns a contact by its id.
         If the user is not logged in, an HTTP 401 Unauthorized error is returned.
         If the user does not have access to this contact, an HTTP 403 Forbidden error is returned.
         If no such contact exists with that id, an HTTP 404 Not Found error is returned.
+        Responses are cached per user and carry an ETag; a matching If-None-Match returns 304.
     
     :param contact_id: int: Specify the contact id to be retrieved from the database
-    :param db: Session: Pass the database session to the function
+    :param request: Request: Identify the cached response and read If-None-Match
+    :param db: AsyncSession: Pass the database session to the function
     :param current_user: User: Get the current user from the database
     :return: A contact object, which is a pydantic model
     :doc-author: Trelent
     """
-    contact = await repository_contacts.get_contact(contact_id, current_user, db)
-    if contact is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
-    return contact
+    async def load():
+        contact = await repository_contacts.get_contact(contact_id, current_user, db)
+        if contact is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
+        return dump_json(contact_adapter, contact), {}
+
+    return await contact_cache.respond(request, current_user, load)
 
 
 @router.put("/{contact_id}", response_model=ContactResponse, description='No more than 10 requests per minute',
-            dependencies=[Depends(RateLimiter(times=10, seconds=60))])
-async def update_contact(body: ContactBase, contact_id: int, db: Session = Depends(get_db),
+            dependencies=[Depends(limit_requests)])
+async def update_contact(body: ContactBase, contact_id: int, db: AsyncSession = Depends(get_async_db),
                          current_user: User = Depends(auth_service.get_current_user)):
     """
     The update_contact function updates a contact in the database.
         The function takes three arguments:
             - body: A ContactBase object containing the new values for the contact.
             - contact_id: An integer representing the id of an existing contact to be updated.
-            - db (optional): A Session object used to connect to and query a database, defaults to None if not provided. 
-                If no session is provided, one will be created using get_db().
+            - db (optional): An AsyncSession object used to connect to and query a database, defaults to None if not provided. 
+                If no session is provided, one will be created using get_async_db().
     
     :param body: ContactBase: Pass the data that will be used to update the contact
     :param contact_id: int: Identify the contact
-    :param db: Session: Pass the database session to the repository
+    :param db: AsyncSession: Pass the database session to the repository
     :param current_user: User: Get the current user information
     :return: The updated contact
     :doc-author: Trelent
@@ -100,18 +168,18 @@ async def update_contact(body: ContactBase, contact_id: int, db: Session = Depen
 
 
 @router.delete("/remove/{contact_id}", response_model=ContactResponse, description='No more than 10 requests per minute',
-            dependencies=[Depends(RateLimiter(times=10, seconds=60))])
-async def remove_user(contact_id: int, db: Session = Depends(get_db),
+            dependencies=[Depends(limit_requests)])
+async def remove_user(contact_id: int, db: AsyncSession = Depends(get_async_db),
                       current_user: User = Depends(auth_service.get_current_user)):
     """
     The remove_user function removes a user from the database.
         Args:
             contact_id (int): The id of the user to be removed.
-            db (Session, optional): A database session object for interacting with the database. Defaults to Depends(get_db).
+            db (AsyncSession, optional): A database session object for interacting with the database. Defaults to Depends(get_async_db).
             current_user (User, optional): The currently logged in user object. Defaults to Depends(auth_service.get_current_user).
     
     :param contact_id: int: Specify the contact id of the user we want to remove
-    :param db: Session: Pass the database session to the repository layer
+    :param db: AsyncSession: Pass the database session to the repository layer
     :param current_user: User: Get the current user from the database
     :return: The contact object
     :doc-author: Trelent
@@ -123,42 +191,59 @@ async def remove_user(contact_id: int, db: Session = Depends(get_db),
 
 
 @router.get("/find/{query}", response_model=List[ContactResponse], description='No more than 10 requests per minute',
-            dependencies=[Depends(RateLimiter(times=10, seconds=60))])
-async def find_contacts(query: str, db: Session = Depends(get_db),
+            dependencies=[Depends(limit_requests)])
+async def find_contacts(query: str, request: Request, skip: int = 0, limit: int = 100,
+                        db: AsyncSession = Depends(get_async_db),
                         current_user: User = Depends(auth_service.get_current_user)):
     """
     The find_contacts function searches for contacts in the database.
-        The function takes a query string and returns a list of contacts that match the query.
+        The function takes a query string and returns a list of contacts that match the query,
+        best matches first. The optional skip and limit parameters paginate the results.
         If no contact is found, an HTTP 404 error is returned.
+        Responses are cached per user and carry an ETag; a matching If-None-Match returns 304.
     
     :param query: str: Search for contacts that match the query string
-    :param db: Session: Get the database connection
+    :param request: Request: Identify the cached response and read If-None-Match
+    :param skip: int: Skip the first n matching contacts
+    :param limit: int: Limit the number of contacts returned
+    :param db: AsyncSession: Get the database connection
     :param current_user: User: Get the current user from the database
     :return: A list of contacts
     :doc-author: Trelent
     """
-    contacts = await repository_contacts.search_contacts(query, current_user, db)
-    if contacts is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contacts not found")
-    return contacts
+    async def load():
+        contacts = await repository_contacts.search_contacts(query, current_user, db, skip, limit)
+        if contacts is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contacts not found")
+        return dump_json(contacts_adapter, contacts), {}
+
+    return await contact_cache.respond(request, current_user, load)
 
 
 @router.get("/birthday/{days}", response_model=List[ContactResponse], description='No more than 10 requests per minute',
-            dependencies=[Depends(RateLimiter(times=10, seconds=60))])
-async def contacts_birthday(days: int, db: Session = Depends(get_db),
+            dependencies=[Depends(limit_requests)])
+async def contacts_birthday(days: int, request: Request, db: AsyncSession = Depends(get_async_db),
                             current_user: User = Depends(auth_service.get_current_user)):
     """
     The contacts_birthday function returns a list of contacts that have birthdays within the next 7 days.
         The function takes in an integer value for the number of days to search for and returns a list of contacts
         with birthdays within that range.
+        Responses are cached per user and per day and carry an ETag; a matching If-None-Match returns 304
+        until the contacts change or the date does.
     
     :param days: int: Specify the number of days to look for contacts with birthdays
-    :param db: Session: Pass the database session to the function
+    :param request: Request: Identify the cached response and read If-None-Match
+    :param db: AsyncSession: Pass the database session to the function
     :param current_user: User: Get the current user who is logged in
     :return: A list of contacts
     :doc-author: Trelent
     """
-    contacts = await repository_contacts.get_birthday_per_week(days, current_user, db)
-    if contacts is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contacts not found")
-    return contacts
\ No newline at end of file
+    today = date.today()
+
+    async def load():
+        contacts = await repository_contacts.get_birthday_per_week(days, current_user, db, today)
+        if contacts is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contacts not found")
+        return dump_json(contacts_adapter, contacts), {}
+
+    return await contact_cache.respond(request, current_user, load, vary=today.isoformat())
\ No newline at end of file
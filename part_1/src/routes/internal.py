@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Response, status
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.database.db import get_async_engine, get_created_engines
+from src.database.pool import get_pool_stats
+from src.services.readiness import readiness
+
+router = APIRouter(prefix="/_internal", tags=["internal"], include_in_schema=False)
+
+
+@router.get("/db-pool")
+async def read_db_pool():
+    """
+    The read_db_pool function returns live statistics of the database connection pools of this worker.
+        It reports checked out connections, overflow and the histogram of the time requests waited for a connection,
+        so the pool can be sized per worker from real data. Engines that were not created yet are left out.
+
+    :return: A dictionary with the statistics of the async and the sync pool
+    """
+    return {name: get_pool_stats(engine.pool) for name, engine in sorted(get_created_engines().items())}
+
+
+@router.get("/ready")
+async def read_readiness(response: Response, probe: bool = False):
+    """
+    The read_readiness function reports whether this worker can serve requests and the state of its dependencies.
+        Clients connect on first use, so a dependency stays idle until a request needs it; pass probe=true to
+        connect to the database now, for example from the readiness probe of a new worker.
+        The status code is 503 while a required dependency is failing.
+
+    :param response: Response: The response, to set the status code
+    :param probe: bool: Connect to the database before reporting
+    :return: A dictionary with the overall readiness and the status of each dependency
+    """
+    if probe:
+        try:
+            async with get_async_engine().connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        except (SQLAlchemyError, OSError) as err:
+            readiness["db"].failed(err)
+    report = readiness.status()
+    if not report["ready"]:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return report
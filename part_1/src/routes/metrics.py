@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.database.db import get_created_engines
+from src.services.instrumentation import render_metrics
+
+router = APIRouter(tags=["internal"], include_in_schema=False)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics():
+    """
+    The read_metrics function exposes the request, dependency and connection pool metrics of this worker
+    in the Prometheus text format. Every worker process keeps its own metrics, so each one has to be scraped.
+    Pools are only reported once their engine has been created by a request.
+
+    :return: The metrics as text
+    """
+    pools = {name: e.pool.metrics for name, e in sorted(get_created_engines().items()) if hasattr(e.pool, "metrics")}
+    return PlainTextResponse(render_metrics(pools), media_type=CONTENT_TYPE)
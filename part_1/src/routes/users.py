@@ -1,14 +1,10 @@
-from fastapi import APIRouter, Depends, status, UploadFile, File
-from sqlalchemy.orm import Session
-import cloudinary
-import cloudinary.uploader
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 
-from src.database.db import get_db
 from src.database.models import User
-from src.repository import users as repository_users
 from src.services.auth import auth_service
-from src.conf.config import settings
-from src.schemas import UserDb
+from src.services.avatar_jobs import avatar_jobs
+from src.services.uploads import open_upload
+from src.schemas import AvatarJobResponse, UserDb
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -32,31 +28,47 @@ async def read_users_me(current_user: User = Depends(auth_service.get_current_us
     return current_user
 
 
-@router.patch('/avatar', response_model=UserDb)
-async def update_avatar_user(file: UploadFile = File(), current_user: User = Depends(auth_service.get_current_user),
-                             db: Session = Depends(get_db)):
+AVATAR_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"],
+        }}},
+    },
+}
+
+
+@router.patch('/avatar', response_model=AvatarJobResponse, status_code=status.HTTP_202_ACCEPTED,
+              openapi_extra=AVATAR_UPLOAD_BODY)
+async def update_avatar_user(request: Request, current_user: User = Depends(auth_service.get_current_user)):
     """
-    The update_avatar_user function updates the avatar of a user.
-        Args:
-            file (UploadFile): The image to be uploaded.
-            current_user (User): The currently logged in user.
-            db (Session): A database session object for interacting with the database.
-    
-    :param file: UploadFile: Get the file from the request body
+    The update_avatar_user function queues a new avatar for the current user.
+        The upload is stored in the background; poll /users/avatar/jobs/{job_id} for the resulting url.
+        The file field is parsed from the request stream rather than declared as an UploadFile, so the size
+        and pixel limits stop an oversized upload while it is being received.
+
+    :param request: Request: The multipart/form-data request with the image in its file field
     :param current_user: User: Get the current user from the database
-    :param db: Session: Connect to the database
-    :return: A user object, which is the same as the user_schema
-    :doc-author: Trelent
+    :return: The queued job
+    """
+    file = await open_upload(request, "file", avatar_jobs.max_bytes)
+    job = await avatar_jobs.submit(current_user, file)
+    return AvatarJobResponse(job_id=job.job_id, status=job.status)
+
+
+@router.get('/avatar/jobs/{job_id}', response_model=AvatarJobResponse)
+async def read_avatar_job(job_id: str, current_user: User = Depends(auth_service.get_current_user)):
+    """
+    The read_avatar_job function returns the state of an avatar upload started by the current user.
+
+    :param job_id: str: The id returned by update_avatar_user
+    :param current_user: User: Get the current user from the database
+    :return: The job state and, once done, the avatar url
     """
-    cloudinary.config(
-        cloud_name=settings.cloudinary_name,
-        api_key=settings.cloudinary_api_key,
-        api_secret=settings.cloudinary_api_secret,
-        secure=True
-    )
-
-    r = cloudinary.uploader.upload(file.file, public_id=f'NotesApp/{current_user.username}', overwrite=True)
-    src_url = cloudinary.CloudinaryImage(f'NotesApp/{current_user.username}')\
-                        .build_url(width=250, height=250, crop='fill', version=r.get('version'))
-    user = await repository_users.update_avatar(current_user.email, src_url, db)
-    return user
\ No newline at end of file
+    job = await avatar_jobs.get(job_id)
+    if job is None or job.email != current_user.email:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return AvatarJobResponse(job_id=job.job_id, status=job.status, avatar=job.avatar, variants=job.variants,
+                             detail=job.detail)
@@ -1,4 +1,6 @@
 from datetime import datetime, date
+from typing import List, Optional
+
 from pydantic import BaseModel, EmailStr, Field
 
 
@@ -8,7 +10,7 @@ class ContactBase(BaseModel):
     email: str
     phone_number: str
     birthday: date
-    additional_data: str = None
+    additional_data: Optional[str] = None
 
 
 class ContactResponse(ContactBase):
@@ -18,12 +20,23 @@ class ContactResponse(ContactBase):
     email: str = "example@test.com"
     phone_number: str = "5551234567"
     birthday: date = date(year=1999, month=10, day=5)
-    additional_data: str = "Created first contact for test"
+    additional_data: Optional[str] = "Created first contact for test"
 
     class Config:
         from_attribute = True
 
 
+class BulkImportError(BaseModel):
+    row: int
+    detail: str
+
+
+class BulkImportResponse(BaseModel):
+    created: int = 0
+    failed: int = 0
+    errors: List[BulkImportError] = []
+
+
 class UserModel(BaseModel):
     username: str = Field(min_length=5, max_length=16)
     email: str
@@ -34,12 +47,20 @@ class UserDb(BaseModel):
     id: int
     username: str
     email: str
-    avatar: str
+    avatar: Optional[str] = None
 
     class Config:
         from_attribute = True
 
 
+class AvatarJobResponse(BaseModel):
+    job_id: str
+    status: str
+    avatar: Optional[str] = None
+    variants: Optional[dict[str, str]] = None
+    detail: Optional[str] = None
+
+
 class UserResponse(BaseModel):
     user: UserDb
     detail: str = "User successfully created"
@@ -51,5 +72,16 @@ class TokenModel(BaseModel):
     token_type: str = "bearer"
 
 
+class SessionResponse(BaseModel):
+    id: str
+    device: Optional[str] = None
+    created_at: datetime
+    last_used_at: datetime
+    expires_at: datetime
+
+    class Config:
+        from_attribute = True
+
+
 class RequestEmail(BaseModel):
     email: EmailStr
\ No newline at end of file
@@ -1,24 +1,99 @@
-from typing import Optional
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from typing import TYPE_CHECKING, Optional
 
-from jose import JWTError, jwt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.conf.config import settings
 
-from src.database.db import get_db
+from src.database.db import get_async_db
 from src.repository import users as repository_users
+from src.services.cache import user_cache
+from src.services.instrumentation import track
+from src.services.tokens import TokenCache, TokenError, get_jwt_backend
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
 
 
 class Auth:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    pwd_max_pending = settings.password_hash_workers + settings.password_hash_queue_size
     SECRET_KEY = settings.secret_key
     ALGORITHM = settings.algorithm
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-    def verify_password(self, plain_password, hashed_password):
+    def __init__(self):
+        self.pwd_pending = 0
+        self.jwt_backend = get_jwt_backend()
+        self.token_cache = TokenCache()
+
+    @cached_property
+    def pwd_context(self) -> "CryptContext":
+        """
+        The pwd_context property creates the bcrypt context on first use.
+            passlib and its bcrypt backend take a noticeable part of the import time of the application,
+            so they are imported when the first password is hashed or verified, not when a worker boots.
+
+        :param self: Represent the instance of the class
+        :return: The password hashing context
+        """
+        from passlib.context import CryptContext
+
+        return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+
+    @cached_property
+    def pwd_executor(self) -> ThreadPoolExecutor:
+        """
+        The pwd_executor property creates the thread pool that hashes and verifies passwords on first use,
+            so importing the application does not set it up.
+
+        :param self: Represent the instance of the class
+        :return: The password hashing thread pool
+        """
+        return ThreadPoolExecutor(max_workers=settings.password_hash_workers, thread_name_prefix="bcrypt")
+
+    def decode_token(self, token: str) -> dict:
+        """
+        The decode_token function verifies a token and returns its claims.
+            Verified tokens are kept in the token cache until they expire, so the signature and claims
+            of a token are checked once, not on every request that uses it.
+        
+        :param self: Represent the instance of the class
+        :param token: str: The encoded token
+        :return: The claims of the token
+        """
+        claims = self.token_cache.get(token)
+        if claims is None:
+            claims = self.jwt_backend.decode(token)
+            self.token_cache.set(token, claims)
+        return claims
+
+    async def run_password_job(self, func, *args):
+        """
+        The run_password_job function runs a bcrypt operation on the bounded password worker pool,
+            so hashing never blocks the event loop. When the workers and their queue are full,
+            it fails fast with HTTP 503 instead of letting a login storm pile up behind the pool.
+        
+        :param self: Represent the instance of the class
+        :param func: The blocking function to run
+        :param *args: The arguments passed to func
+        :return: The result of func
+        """
+        if self.pwd_pending >= self.pwd_max_pending:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Too many authentication requests, try again later",
+                                headers={"Retry-After": "1"})
+        self.pwd_pending += 1
+        try:
+            with track("bcrypt"):
+                return await asyncio.get_running_loop().run_in_executor(self.pwd_executor, func, *args)
+        finally:
+            self.pwd_pending -= 1
+
+    async def verify_password(self, plain_password, hashed_password):
         """
         The verify_password function takes a plain-text password and the hashed version of that password,
             and returns True if they match, False otherwise. This is used to verify that the user's login
@@ -30,9 +105,9 @@ class Auth:
         :return: A boolean value of true or false
         :doc-author: Trelent
         """
-        return self.pwd_context.verify(plain_password, hashed_password)
+        return await self.run_password_job(self.pwd_context.verify, plain_password, hashed_password)
 
-    def get_password_hash(self, password: str):
+    async def get_password_hash(self, password: str):
         """
         The get_password_hash function takes a password as input and returns the hash of that password.
             The function uses the pwd_context object to generate a hash from the given password.
@@ -42,7 +117,7 @@ class Auth:
         :return: The password hash
         :doc-author: Trelent
         """
-        return self.pwd_context.hash(password)
+        return await self.run_password_job(self.pwd_context.hash, password)
 
     async def create_access_token(self, data: dict, expires_delta: Optional[float] = None, ):
         """
@@ -62,7 +137,7 @@ class Auth:
         else:
             expire = datetime.utcnow() + timedelta(minutes=15)
         to_encode.update({"iat": datetime.utcnow(), "exp": expire, "scope": "access_token"})
-        encoded_access_token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
+        encoded_access_token = self.jwt_backend.encode(to_encode)
         return encoded_access_token
 
     async def create_refresh_token(self, data: dict, expires_delta: Optional[float] = None):
@@ -70,7 +145,7 @@ class Auth:
         The create_refresh_token function creates a new refresh token for the user.
             Args:
                 data (dict): A dictionary containing the user's id and username.
-                expires_delta (Optional[float]): The number of seconds until the refresh token expires. Defaults to None, which sets it to 7 days from now.
+                expires_delta (Optional[float]): The number of seconds until the refresh token expires. Defaults to None, which uses the refresh_token_ttl setting (7 days).
         
         :param self: Represent the instance of the class
         :param data: dict: Pass in the user's information
@@ -82,9 +157,9 @@ class Auth:
         if expires_delta:
             expire = datetime.utcnow() + timedelta(seconds=expires_delta)
         else:
-            expire = datetime.utcnow() + timedelta(days=7)
+            expire = datetime.utcnow() + timedelta(seconds=settings.refresh_token_ttl)
         to_encode.update({"iat": datetime.utcnow(), "exp": expire, "scope": "refresh_token"})
-        encoded_refresh_token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
+        encoded_refresh_token = self.jwt_backend.encode(to_encode)
         return encoded_refresh_token
 
     async def decode_refresh_token(self, refresh_token: str):
@@ -99,23 +174,35 @@ class Auth:
         :return: The email of the user who is trying to get a new access token
         :doc-author: Trelent
         """
+        payload = await self.decode_refresh_claims(refresh_token)
+        return payload['sub']
+
+    async def decode_refresh_claims(self, refresh_token: str) -> dict:
+        """
+        The decode_refresh_claims function verifies a refresh token and returns all of its claims,
+            including the sid (session) and jti (token id) claims used by the refresh session store.
+        
+        :param self: Represent the instance of the class
+        :param refresh_token: str: Pass the refresh_token to the function
+        :return: The claims of the token
+        """
         try:
-            payload = jwt.decode(refresh_token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            if payload['scope'] == 'refresh_token':
-                email = payload['sub']
-                return email
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid scope for token')
-        except JWTError:
+            payload = self.decode_token(refresh_token)
+        except TokenError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials')
+        if payload.get('scope') != 'refresh_token':
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid scope for token')
+        return payload
 
-    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
         """
         The get_current_user function is a dependency that will be used in the UserResource class.
         It takes an access token as input and returns the user object associated with it.
+        Users are served from the user cache when possible, so most requests don't query the users table.
         
         :param self: Represent the instance of the class
         :param token: str: Get the token from the authorization header
-        :param db: Session: Pass the database session to the get_current_user function
+        :param db: AsyncSession: Pass the database session to the get_current_user function
         :return: The user object
         :doc-author: Trelent
         """
@@ -127,25 +214,28 @@ class Auth:
 
         try:
             # Decode JWT
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            payload = self.decode_token(token)
             if payload['scope'] == 'access_token':
                 email = payload["sub"]
                 if email is None:
                     raise credentials_exception
             else:
                 raise credentials_exception
-        except JWTError as e:
+        except TokenError as e:
             raise credentials_exception
 
-        user = await repository_users.get_user_by_email(email, db)
+        user = await user_cache.get(email)
         if user is None:
-            raise credentials_exception
+            user = await repository_users.get_user_by_email(email, db)
+            if user is None:
+                raise credentials_exception
+            await user_cache.set(user)
         return user
 
     def create_email_token(self, data: dict):
         """
         The create_email_token function takes a dictionary of data and returns a JWT token.
-            The token is encoded with the SECRET_KEY and ALGORITHM defined in the class.
+            The token is encoded by the configured JWT backend with the ALGORITHM defined in the class.
             The iat (issued at) claim is set to datetime.utcnow() and exp (expiration time) 
             claim is set to 7 days from now.
         
@@ -157,13 +247,13 @@ class Auth:
         to_encode = data.copy()
         expire = datetime.utcnow() + timedelta(days=7)
         to_encode.update({"iat": datetime.utcnow(), "exp": expire})
-        token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
+        token = self.jwt_backend.encode(to_encode)
         return token
 
     async def get_email_from_token(self, token: str):
         """
         The get_email_from_token function takes a token as an argument and returns the email address associated with that token.
-        The function first decodes the token using jwt.decode, which is part of PyJWT, a Python library for encoding and decoding JSON Web Tokens (JWTs). 
+        The function first decodes the token with the configured JWT backend. 
         If successful, it will return the email address associated with that JWT.
         
         :param self: Represent the instance of the class
@@ -172,10 +262,10 @@ class Auth:
         :doc-author: Trelent
         """
         try:
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            payload = self.decode_token(token)
             email = payload["sub"]
             return email
-        except JWTError as e:
+        except TokenError as e:
             print(e)
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                                 detail="Invalid token for email verification")
@@ -0,0 +1,220 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import uuid
+from collections import OrderedDict
+from contextlib import suppress
+from dataclasses import asdict, dataclass
+from fastapi import HTTPException, UploadFile, status
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.conf.config import settings
+from src.database.db import AsyncSessionLocal
+from src.database.models import User
+from src.repository import users as repository_users
+from src.services.images import HeaderProbe, process_avatar, shutdown_image_executor
+from src.services.uploads import MultipartFile
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+JOB_TTL = 24 * 60 * 60
+
+
+@dataclass
+class AvatarJob:
+    job_id: str
+    email: str
+    user_id: int
+    path: str
+    content_type: str
+    status: str = "queued"
+    avatar: str | None = None
+    variants: dict[str, str] | None = None
+    detail: str | None = None
+
+
+def avatar_key(job: AvatarJob) -> str:
+    """
+    The avatar_key function returns the storage key prefix of the avatar rendered by a job.
+        The key is built from the user id, never from the username: usernames are chosen by the user and
+        not unique, so they could reach outside the storage root or overwrite another account's avatar.
+        Every upload of a user overwrites the same keys, so replaced avatars do not pile up in storage.
+
+    :param job: AvatarJob: The job
+    :return: The storage key prefix
+    """
+    return f"avatars/{job.user_id}"
+
+
+def versioned(url: str, version: str) -> str:
+    """
+    The versioned function adds the job id to the url of a variant, so caches and browsers fetch
+    the new image after its key was overwritten.
+
+    :param url: str: The url returned by the storage backend
+    :param version: str: The id of the job that stored the file
+    :return: The url with a v query parameter
+    """
+    return f"{url}{'&' if '?' in url else '?'}v={version}"
+
+
+class AvatarJobQueue:
+    """
+    Uploads avatars in the background.
+        The request only spools the upload to a temporary file and enqueues a job; worker tasks render the
+        resized variants, store them through the configured storage backend and then save the url of the
+        largest one with repository_users.update_avatar.
+        Job states are kept in Redis when it is available, so any worker can answer a status request.
+    """
+
+    def __init__(self, workers: int = settings.avatar_workers, max_bytes: int = settings.avatar_max_bytes,
+                 max_jobs: int = 10000):
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.max_jobs = max_jobs
+        self.redis: Redis | None = None
+        self.jobs: OrderedDict[str, AvatarJob] = OrderedDict()
+        self.queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    def init(self, redis: Redis | None) -> None:
+        """
+        The init function attaches the Redis client and starts the worker tasks.
+
+        :param self: Represent the instance of the class
+        :param redis: Redis | None: The client created at startup, None keeps job states in this worker
+        :return: None
+        """
+        self.redis = redis
+        self.queue = asyncio.Queue()
+        self._tasks = [asyncio.get_running_loop().create_task(self._work()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        shutdown_image_executor()
+
+    async def submit(self, user: User, file: UploadFile | MultipartFile) -> AvatarJob:
+        """
+        The submit function copies an upload to a temporary file in chunks and queues it for processing.
+            Uploads larger than max_bytes or with more than avatar_max_pixels pixels are rejected with HTTP 413
+            as soon as the limit is crossed, and at most max_bytes are written to the temporary file.
+            With a MultipartFile the rest of the request body is then never received; an UploadFile has
+            already been spooled by Starlette, so only the copy and the decoding are avoided.
+
+        :param self: Represent the instance of the class
+        :param user: User: The owner of the avatar
+        :param file: UploadFile | MultipartFile: The uploaded image
+        :return: The queued job
+        """
+        if not (file.content_type or "").startswith("image/"):
+            raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Avatar must be an image")
+        fd, path = tempfile.mkstemp(prefix="avatar-")
+        try:
+            size = 0
+            probe = HeaderProbe()
+            with os.fdopen(fd, "wb") as out:
+                while chunk := await file.read(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                            detail="Avatar is too large")
+                    probe.feed(chunk)
+                    out.write(chunk)
+            probe.close()
+        except BaseException:
+            os.unlink(path)
+            raise
+        job = AvatarJob(job_id=uuid.uuid4().hex, email=user.email, user_id=user.id, path=path,
+                        content_type=file.content_type)
+        await self._save(job)
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        await self.queue.put(job)
+        return job
+
+    async def get(self, job_id: str) -> AvatarJob | None:
+        """
+        The get function returns the state of a job, from this worker or from Redis.
+
+        :param self: Represent the instance of the class
+        :param job_id: str: The id returned by submit
+        :return: The job or None
+        """
+        job = self.jobs.get(job_id)
+        if job is not None or self.redis is None:
+            return job
+        try:
+            data = await self.redis.hgetall(f"avatar_job:{job_id}")
+        except RedisError as err:
+            logger.warning("avatar job read failed: %s", err)
+            return None
+        if not data:
+            return None
+        job = AvatarJob(**{key: value or None for key, value in data.items()})
+        job.user_id = int(job.user_id)
+        job.variants = json.loads(job.variants) if job.variants else None
+        return job
+
+    async def process(self, job: AvatarJob) -> None:
+        """
+        The process function renders and stores the avatar variants and updates the user, recording the outcome
+        on the job.
+
+        :param self: Represent the instance of the class
+        :param job: AvatarJob: The queued job
+        :return: None
+        """
+        try:
+            job.status = "processing"
+            await self._save(job)
+            variants = await process_avatar(job.path, avatar_key(job))
+            job.variants = {size: versioned(url, job.job_id) for size, url in variants.items()}
+            job.avatar = job.variants[max(job.variants, key=int)]
+            async with AsyncSessionLocal() as db:
+                await repository_users.update_avatar(job.email, job.avatar, db)
+            job.status = "done"
+        except Exception as err:
+            logger.exception("avatar job %s failed", job.job_id)
+            job.status = "failed"
+            job.detail = str(err)
+        finally:
+            with suppress(FileNotFoundError):
+                os.unlink(job.path)
+        await self._save(job)
+
+    async def _work(self) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                await self.process(job)
+            except Exception as err:
+                logger.exception("avatar job %s could not be recorded", job.job_id)
+                job.status = "failed"
+                job.detail = job.detail or str(err)
+            finally:
+                self.queue.task_done()
+
+    async def _save(self, job: AvatarJob) -> None:
+        self.jobs[job.job_id] = job
+        self.jobs.move_to_end(job.job_id)
+        while len(self.jobs) > self.max_jobs:
+            self.jobs.popitem(last=False)
+        if self.redis is None:
+            return
+        key = f"avatar_job:{job.job_id}"
+        try:
+            mapping = asdict(job)
+            mapping["variants"] = json.dumps(job.variants) if job.variants else None
+            await self.redis.hset(key, mapping={k: "" if v is None else v for k, v in mapping.items()})
+            await self.redis.expire(key, JOB_TTL)
+        except RedisError as err:
+            logger.warning("avatar job write failed: %s", err)
+
+
+avatar_jobs = AvatarJobQueue()
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta
+from itertools import groupby
+
+from src.conf.config import settings
+from src.database.db import AsyncSessionLocal
+from src.repository import birthdays as repository_birthdays
+from src.services.email import email_outbox
+from src.services.mail_templates import template_registry
+
+logger = logging.getLogger(__name__)
+
+
+class BirthdayDigest:
+    """
+    Sends every user a daily email listing their contacts with a birthday in the next days days.
+        Users are processed in chunks of batch_size: one query finds the next users with upcoming birthdays,
+        one query reads all of their matching contacts, and the digests are queued in the email outbox
+        together with the per-user watermark. Memory use depends on the chunk, not on the number of contacts.
+    """
+
+    def __init__(self, days: int = settings.birthday_digest_days, batch_size: int = settings.birthday_digest_batch_size,
+                 hour: int = settings.birthday_digest_hour):
+        self.days = days
+        self.batch_size = batch_size
+        self.hour = hour
+        self._task: asyncio.Task | None = None
+
+    def init(self) -> None:
+        """
+        The init function starts the task that runs the digest every day at hour o'clock.
+
+        :param self: Represent the instance of the class
+        :return: None
+        """
+        self._task = asyncio.get_running_loop().create_task(self._schedule())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def run(self, day: date | None = None) -> int:
+        """
+        The run function queues the digests of one day.
+            Users that already got the digest of that day are skipped, so a run can be repeated or resumed
+            after a crash.
+
+        :param self: Represent the instance of the class
+        :param day: date | None: The day of the digest, today by default
+        :return: The number of queued digests
+        """
+        day = day or date.today()
+        queued, after_id = 0, 0
+        async with AsyncSessionLocal() as db:
+            while user_ids := await repository_birthdays.get_digest_users(day, self.days, after_id,
+                                                                         self.batch_size, db):
+                rows = await repository_birthdays.get_digest_rows(user_ids, day, self.days, db)
+                messages = {user_id: self.message(list(user_rows))
+                            for user_id, user_rows in groupby(rows, key=lambda row: row.user_id)}
+                queued += await repository_birthdays.record_digests(day, messages, db)
+                after_id = user_ids[-1]
+        if queued:
+            email_outbox.notify()
+        logger.info("queued %s birthday digests for %s", queued, day)
+        return queued
+
+    def message(self, rows: list) -> dict:
+        """
+        The message function builds the outbox message of one user from their digest rows.
+
+        :param self: Represent the instance of the class
+        :param rows: list: The rows of one user returned by get_digest_rows
+        :return: The recipient, subject, template and context of the digest
+        """
+        context = {
+            "username": rows[0].username,
+            "days": self.days,
+            "contacts": [{"first_name": row.first_name, "last_name": row.last_name, "email": row.email,
+                          "phone_number": row.phone_number, "birthday": row.birthday.isoformat()} for row in rows],
+        }
+        return {"recipient": rows[0].user_email, "subject": template_registry.subject("birthday_digest", context),
+                "template": "birthday_digest", "context": context}
+
+    async def _schedule(self) -> None:
+        while True:
+            now = datetime.now()
+            run_at = datetime.combine(now.date(), time(self.hour))
+            if now >= run_at:
+                try:
+                    await self.run(now.date())
+                except Exception:
+                    logger.exception("birthday digest failed")
+                run_at += timedelta(days=1)
+            await asyncio.sleep((run_at - datetime.now()).total_seconds())
+
+
+birthday_digest = BirthdayDigest()
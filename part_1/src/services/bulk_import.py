@@ -0,0 +1,160 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, List, Tuple
+
+from fastapi import HTTPException, Request, status
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.database.models import User
+from src.repository import contacts as repository_contacts
+from src.schemas import BulkImportError, BulkImportResponse, ContactBase
+
+JSON_TYPES = ("application/json",)
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_TYPES = ("text/csv", "application/csv")
+
+Row = Tuple[int, dict | None, str | None]
+
+
+async def iter_lines(request: Request) -> AsyncIterator[str]:
+    """
+    The iter_lines function decodes the request body as UTF-8 and yields it line by line while it is received.
+        Lines end at "\n" only, with an optional "\r" before it: str.splitlines also breaks on characters
+        such as U+2028 that are valid inside JSON strings and CSV fields.
+
+    :param request: Request: The incoming request
+    :return: An async iterator of lines, without their line endings
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.removesuffix("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.removesuffix("\r")
+
+
+async def iter_json_rows(request: Request) -> AsyncIterator[Row]:
+    try:
+        data = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body is not valid JSON")
+    if not isinstance(data, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array of contacts")
+    for number, item in enumerate(data, start=1):
+        yield number, item, None
+
+
+async def iter_ndjson_rows(request: Request) -> AsyncIterator[Row]:
+    number = 0
+    async for line in iter_lines(request):
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            yield number, json.loads(line), None
+        except ValueError as err:
+            yield number, None, f"Invalid JSON: {err}"
+
+
+async def iter_csv_rows(request: Request) -> AsyncIterator[Row]:
+    header = None
+    record = ""
+    number = 0
+    async for line in iter_lines(request):
+        record += line + "\n"
+        if record.count('"') % 2:
+            continue
+        values = next(csv.reader([record]), [])
+        record = ""
+        if not values:
+            continue
+        if header is None:
+            header = [value.strip() for value in values]
+            continue
+        number += 1
+        if len(values) != len(header):
+            yield number, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield number, {key: value for key, value in zip(header, values) if value != ""}, None
+    if record.strip():
+        yield number + 1, None, "Unterminated quoted field"
+
+
+def iter_rows(request: Request) -> AsyncIterator[Row]:
+    """
+    The iter_rows function picks the row parser from the Content-Type of the request.
+        JSON arrays are parsed at once, NDJSON and CSV are parsed while the body is streamed.
+
+    :param request: Request: The incoming request
+    :return: An async iterator of (row number, row data, parse error) tuples
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in JSON_TYPES:
+        return iter_json_rows(request)
+    if content_type in NDJSON_TYPES:
+        return iter_ndjson_rows(request)
+    if content_type in CSV_TYPES:
+        return iter_csv_rows(request)
+    raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                        detail="Use application/json, application/x-ndjson or text/csv")
+
+
+def validation_message(err: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in err.errors())
+
+
+async def import_contacts(rows: AsyncIterator[Row], user: User, db: AsyncSession,
+                          batch_size: int = settings.bulk_import_batch_size,
+                          max_errors: int = settings.bulk_import_max_errors) -> BulkImportResponse:
+    """
+    The import_contacts function validates rows with ContactBase and inserts them in batches.
+        Every batch is committed in its own transaction, so a failing batch doesn't undo the ones before it.
+        Invalid rows are skipped and reported; at most max_errors errors are listed, all of them are counted.
+
+    :param rows: AsyncIterator[Row]: The parsed rows, as returned by iter_rows
+    :param user: User: The owner of the new contacts
+    :param db: AsyncSession: Access the database
+    :param batch_size: int: The number of contacts inserted per transaction
+    :param max_errors: int: The maximum number of errors listed in the report
+    :return: A report with the number of created and failed rows and the row errors
+    """
+    report = BulkImportResponse()
+
+    def fail(number: int, detail: str) -> None:
+        report.failed += 1
+        if len(report.errors) < max_errors:
+            report.errors.append(BulkImportError(row=number, detail=detail))
+
+    async def flush(batch: List[Tuple[int, ContactBase]]) -> None:
+        try:
+            report.created += await repository_contacts.create_contacts([body for _, body in batch], user, db)
+        except SQLAlchemyError as err:
+            await db.rollback()
+            for number, _ in batch:
+                fail(number, f"Database error: {err.__class__.__name__}")
+
+    batch = []
+    async for number, data, error in rows:
+        if error is None and not isinstance(data, dict):
+            error = "Row must be an object"
+        if error is None:
+            try:
+                batch.append((number, ContactBase(**data)))
+            except ValidationError as err:
+                error = validation_message(err)
+        if error is not None:
+            fail(number, error)
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+    return report
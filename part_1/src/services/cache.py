@@ -0,0 +1,251 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Tuple
+
+from fastapi import Request, Response, status
+from pydantic import TypeAdapter
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.conf.config import settings
+from src.database.models import User
+
+logger = logging.getLogger(__name__)
+
+
+class UserCache:
+    """
+    A two tier cache of authenticated users keyed by email.
+        The first tier is an in-process LRU with a short TTL, the optional second tier is Redis and is shared by
+        all workers. Only the fields needed to identify the user are cached, never the password.
+    """
+    fields = ("id", "username", "email", "avatar", "confirmed")
+
+    def __init__(self, maxsize: int = settings.user_cache_maxsize, ttl: int = settings.user_cache_ttl,
+                 redis_ttl: int = settings.user_cache_redis_ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.redis_ttl = redis_ttl
+        self.redis: Redis | None = None
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    def init(self, redis: Redis | None) -> None:
+        """
+        The init function attaches the Redis client used as the shared second tier.
+
+        :param self: Represent the instance of the class
+        :param redis: Redis | None: The client created at application startup, None keeps the cache in-process only
+        :return: None
+        """
+        self.redis = redis
+
+    @staticmethod
+    def key(email: str) -> str:
+        return f"user:{email}"
+
+    async def get(self, email: str) -> User | None:
+        """
+        The get function returns the cached user for an email, or None on a miss.
+            The returned User is a new transient object, so requests never share state.
+
+        :param self: Represent the instance of the class
+        :param email: str: The email of the user
+        :return: A user object or None
+        """
+        entry = self._entries.get(email)
+        if entry is not None:
+            expires, data = entry
+            if expires > time.monotonic():
+                self._entries.move_to_end(email)
+                return User(**data)
+            self._entries.pop(email, None)
+        if self.redis is None:
+            return None
+        try:
+            cached = await self.redis.get(self.key(email))
+        except RedisError as err:
+            logger.warning("user cache read failed: %s", err)
+            return None
+        if cached is None:
+            return None
+        data = json.loads(cached)
+        self._store(email, data)
+        return User(**data)
+
+    async def set(self, user: User) -> None:
+        """
+        The set function caches the identifying fields of a user in both tiers.
+
+        :param self: Represent the instance of the class
+        :param user: User: The user loaded from the database
+        :return: None
+        """
+        data = {field: getattr(user, field) for field in self.fields}
+        self._store(user.email, data)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(self.key(user.email), json.dumps(data), ex=self.redis_ttl)
+        except RedisError as err:
+            logger.warning("user cache write failed: %s", err)
+
+    async def invalidate(self, email: str | None) -> None:
+        """
+        The invalidate function drops the cached user for an email from both tiers.
+            It is called by every repository function that changes a user.
+
+        :param self: Represent the instance of the class
+        :param email: str | None: The email of the changed user
+        :return: None
+        """
+        if email is None:
+            return
+        self._entries.pop(email, None)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.delete(self.key(email))
+        except RedisError as err:
+            logger.warning("user cache invalidation failed: %s", err)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _store(self, email: str, data: dict) -> None:
+        self._entries[email] = (time.monotonic() + self.ttl, data)
+        self._entries.move_to_end(email)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class ContactCache:
+    """
+    A per-user, read-through cache of contact responses in Redis.
+        Every entry key contains the user's contacts version, which the repository increments after each write,
+        so a write makes all cached reads of that user unreachable at once. The same version is the base of
+        the ETag, so a matching If-None-Match is answered with 304 after a single Redis read.
+    """
+
+    def __init__(self, ttl: int = settings.contact_cache_ttl):
+        self.ttl = ttl
+        self.redis: Redis | None = None
+
+    def init(self, redis: Redis | None) -> None:
+        """
+        The init function attaches the Redis client created at application startup.
+
+        :param self: Represent the instance of the class
+        :param redis: Redis | None: The client, None disables the cache
+        :return: None
+        """
+        self.redis = redis
+
+    @staticmethod
+    def version_key(user_id: int) -> str:
+        return f"contacts:{user_id}:version"
+
+    @staticmethod
+    def request_key(request: Request, vary: str = "") -> str:
+        query = "&".join(sorted(f"{key}={value}" for key, value in request.query_params.multi_items()))
+        return hashlib.sha1(f"{request.url.path}?{query}#{vary}".encode()).hexdigest()
+
+    @staticmethod
+    def etag(user_id: int, version: int, key: str) -> str:
+        return '"' + hashlib.sha1(f"{user_id}:{version}:{key}".encode()).hexdigest()[:20] + '"'
+
+    async def version(self, user_id: int) -> int | None:
+        """
+        The version function returns the current contacts version of a user, or None when the cache is unavailable.
+
+        :param self: Represent the instance of the class
+        :param user_id: int: The id of the user
+        :return: The version number or None
+        """
+        if self.redis is None:
+            return None
+        try:
+            return int(await self.redis.get(self.version_key(user_id)) or 0)
+        except RedisError as err:
+            logger.warning("contact cache read failed: %s", err)
+            return None
+
+    async def bump(self, user_id: int) -> None:
+        """
+        The bump function atomically increments the contacts version of a user after a write.
+
+        :param self: Represent the instance of the class
+        :param user_id: int: The id of the user whose contacts changed
+        :return: None
+        """
+        if self.redis is None:
+            return
+        try:
+            await self.redis.incr(self.version_key(user_id))
+        except RedisError as err:
+            logger.warning("contact cache invalidation failed: %s", err)
+
+    async def respond(self, request: Request, user: User,
+                      load: Callable[[], Awaitable[Tuple[bytes, dict]]], vary: str = "") -> Response:
+        """
+        The respond function serves a contact read from the cache, or loads and caches it.
+            load is only awaited on a cache miss and returns the JSON body and the extra response headers.
+            Reads whose result depends on more than the user's contacts and the request, such as the current
+            date, pass that value as vary; it is part of both the entry key and the ETag.
+
+        :param self: Represent the instance of the class
+        :param request: Request: The incoming request, its path and query identify the entry
+        :param user: User: The current user
+        :param load: Callable: Produce the response body and headers from the database
+        :param vary: str: Any other input the response depends on
+        :return: A JSON response with an ETag, or an empty 304 response
+        """
+        version = await self.version(user.id)
+        if version is None:
+            body, headers = await load()
+            return Response(content=body, media_type="application/json", headers=headers)
+
+        key = self.request_key(request, vary)
+        etag = self.etag(user.id, version, key)
+        if etag in parse_if_none_match(request.headers.get("if-none-match")):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        entry_key = f"contacts:{user.id}:{version}:{key}"
+        try:
+            cached = await self.redis.get(entry_key)
+        except RedisError as err:
+            logger.warning("contact cache read failed: %s", err)
+            cached = None
+        if cached is not None:
+            entry = json.loads(cached)
+            body, headers = entry["body"].encode(), entry["headers"]
+        else:
+            body, headers = await load()
+            try:
+                await self.redis.set(entry_key, json.dumps({"body": body.decode(), "headers": headers}), ex=self.ttl)
+            except RedisError as err:
+                logger.warning("contact cache write failed: %s", err)
+        return Response(content=body, media_type="application/json", headers={**headers, "ETag": etag})
+
+
+def parse_if_none_match(header: str | None) -> set:
+    if not header:
+        return set()
+    return {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def dump_json(adapter: TypeAdapter, value: Any) -> bytes:
+    """
+    The dump_json function serializes ORM objects with a pydantic TypeAdapter, like a route's response_model would.
+
+    :param adapter: TypeAdapter: The adapter of the response model
+    :param value: Any: The objects to serialize
+    :return: The JSON body
+    """
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+user_cache = UserCache()
+contact_cache = ContactCache()
@@ -1,54 +1,260 @@
-from pathlib import Path
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from email.header import Header
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import formataddr
+from typing import TYPE_CHECKING, AsyncIterator
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
 from pydantic import EmailStr
-from src.conf.config import settings
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.conf.config import settings
+from src.database.clock import utcnow
+from src.database.db import AsyncSessionLocal
+from src.database.models import OutboxEmail
+from src.repository import outbox as repository_outbox
 from src.services.auth import auth_service
+from src.services.instrumentation import track
+from src.services.mail_templates import template_registry
+from src.services.readiness import readiness
+
+if TYPE_CHECKING:
+    import aiosmtplib
+
+logger = logging.getLogger(__name__)
+
+
+def render_email(email: OutboxEmail) -> MIMEMultipart:
+    """
+    The render_email function builds the MIME message of an outbox entry, with a plain-text part and an HTML
+    alternative rendered from the precompiled templates.
+        It uses the compat32 email.mime classes, which build and serialize several times faster than EmailMessage.
+
+    :param email: OutboxEmail: The queued message
+    :return: The message, ready to send
+    """
+    rendered = template_registry.render(email.template, email.context)
+    message = MIMEMultipart('alternative')
+    message['Subject'] = email.subject if email.subject.isascii() else Header(email.subject, 'utf-8')
+    message['From'] = formataddr((settings.mail_from_name, settings.mail_from), charset='utf-8')
+    message['To'] = email.recipient
+    message.attach(MIMEText(rendered.text, 'plain', 'utf-8'))
+    message.attach(MIMEText(rendered.html, 'html', 'utf-8'))
+    return message
+
+
+class SMTPPool:
+    """
+    Keeps up to size SMTP connections open and hands them out one at a time.
+        Connections are opened on first use and reused for later messages, so a burst of emails
+        costs a few TLS handshakes instead of one per message. aiosmtplib is imported with the first connection.
+    """
+
+    def __init__(self, size: int = settings.mail_pool_size):
+        self.size = size
+        self._idle: asyncio.Queue["aiosmtplib.SMTP"] = asyncio.Queue()
+        self._created = 0
+
+    def _client(self) -> "aiosmtplib.SMTP":
+        import aiosmtplib
+        credentials = {'username': settings.mail_username, 'password': settings.mail_password} \
+            if settings.mail_use_credentials else {}
+        return aiosmtplib.SMTP(hostname=settings.mail_server, port=settings.mail_port, use_tls=settings.mail_ssl_tls,
+                               start_tls=settings.mail_starttls, validate_certs=settings.mail_validate_certs,
+                               timeout=settings.mail_timeout, **credentials)
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator["aiosmtplib.SMTP"]:
+        """
+        The connection function lends a connected client, opening a new one while the pool is below size.
+            A client that fails is closed, so the next borrower reconnects.
+
+        :param self: Represent the instance of the class
+        :return: A connected aiosmtplib.SMTP client
+        """
+        if not self._idle.empty() or self._created >= self.size:
+            client = await self._idle.get()
+        else:
+            self._created += 1
+            client = self._client()
+        try:
+            if not client.is_connected:
+                try:
+                    await client.connect()
+                except Exception as err:
+                    readiness["mail"].failed(err)
+                    raise
+                readiness["mail"].ready()
+            yield client
+        except BaseException:
+            client.close()
+            raise
+        finally:
+            self._idle.put_nowait(client)
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.mail_username,
-    MAIL_PASSWORD=settings.mail_password,
-    MAIL_FROM=settings.mail_from, 
-    MAIL_PORT=settings.mail_port,
-    MAIL_SERVER=settings.mail_server,
-    MAIL_FROM_NAME="John Doe",
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
-)
+    async def close(self) -> None:
+        while not self._idle.empty():
+            client = self._idle.get_nowait()
+            if client.is_connected:
+                from aiosmtplib import SMTPException
+                try:
+                    await client.quit()
+                except SMTPException:
+                    client.close()
+        self._created = 0
 
 
-async def send_email(email: EmailStr, username: str, host: str):
+class EmailOutbox:
     """
-    The send_email function sends an email to the user with a link to confirm their email address.
+    Sends the messages queued in the email_outbox table.
+        A worker task claims due messages in batches, spreads each batch over the pooled SMTP connections
+        and retries failures with exponential backoff until mail_max_attempts is reached.
+        Messages survive restarts because they are only marked sent after the server accepted them.
+    """
+
+    def __init__(self, pool: SMTPPool | None = None, batch_size: int = settings.mail_batch_size,
+                 max_attempts: int = settings.mail_max_attempts, retry_base: float = settings.mail_retry_base,
+                 retry_max: float = settings.mail_retry_max, lease: int = settings.mail_lease,
+                 poll_interval: float = settings.mail_poll_interval):
+        self.pool = pool or SMTPPool()
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    def init(self) -> None:
+        """
+        The init function starts the worker task.
+            The first poll waits for poll_interval or the first queued message, so booting a worker
+            opens no database or SMTP connection.
+
+        :param self: Represent the instance of the class
+        :return: None
+        """
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.pool.close()
+
+    def notify(self) -> None:
+        """
+        The notify function wakes the worker after a message was queued, instead of waiting for the next poll.
+
+        :param self: Represent the instance of the class
+        :return: None
+        """
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def backoff(self, attempts: int) -> float:
+        """
+        The backoff function returns how long to wait before the next attempt.
+
+        :param self: Represent the instance of the class
+        :param attempts: int: The number of attempts made so far
+        :return: The delay in seconds
+        """
+        return min(self.retry_base * 2 ** (attempts - 1), self.retry_max)
+
+    async def deliver(self) -> int:
+        """
+        The deliver function sends one batch of due messages and records the results.
+
+        :param self: Represent the instance of the class
+        :return: The number of claimed messages
+        """
+        async with AsyncSessionLocal() as db:
+            emails = await repository_outbox.claim_emails(self.batch_size, self.lease, db)
+            if not emails:
+                return 0
+            chunks = [emails[i::self.pool.size] for i in range(min(self.pool.size, len(emails)))]
+            results = await asyncio.gather(*(self._send(chunk) for chunk in chunks))
+            sent = []
+            for email, error in (result for chunk in results for result in chunk):
+                if error is None:
+                    sent.append(email.id)
+                    continue
+                logger.warning("email %s to %s failed: %s", email.id, email.recipient, error)
+                retry_at = None if email.attempts >= self.max_attempts else \
+                    utcnow() + timedelta(seconds=self.backoff(email.attempts))
+                await repository_outbox.mark_failed(email.id, error, retry_at, db)
+            await repository_outbox.mark_sent(sent, db)
+        return len(emails)
+
+    async def _send(self, emails: list[OutboxEmail]) -> list[tuple[OutboxEmail, str | None]]:
+        results = []
+        for email in emails:
+            try:
+                with track("email"):
+                    async with self.pool.connection() as client:
+                        await client.send_message(render_email(email))
+                results.append((email, None))
+            except Exception as err:
+                results.append((email, str(err) or type(err).__name__))
+        return results
+
+    async def _run(self) -> None:
+        claimed = 0
+        while True:
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+            try:
+                claimed = await self.deliver()
+            except Exception:
+                logger.exception("email outbox delivery failed")
+                claimed = 0
+
+
+email_outbox = EmailOutbox()
+
+
+async def queue_email(kind: str, recipient: str, context: dict, db: AsyncSession) -> OutboxEmail:
+    """
+    The queue_email function stores a message of one of the registered types in the outbox and wakes the worker.
+
+    :param kind: str: The message type, a key of MESSAGE_TYPES
+    :param recipient: str: The email address of the recipient
+    :param context: dict: The template variables, they must be JSON serializable
+    :param db: AsyncSession: Pass the database session to the function
+    :return: The queued message
+    """
+    subject = template_registry.subject(kind, context)
+    email = await repository_outbox.enqueue_email(recipient, subject, kind, context, db)
+    email_outbox.notify()
+    return email
+
+
+async def send_email(email: EmailStr, username: str, host: str, db: AsyncSession):
+    """
+    The send_email function queues an email to the user with a link to confirm their email address.
         The function takes in three arguments:
             -email: the user's email address, which is used as a unique identifier for them.
-            -username: the username of the user who is registering. This will be displayed in 
+            -username: the username of the user who is registering. This will be displayed in
                 their confirmation message so they know it was sent to them and not someone else.
-            -host: this is where we are hosting our application, which will be used as part of 
+            -host: this is where we are hosting our application, which will be used as part of
                 our confirmation link.
-    
+        The message is stored in the outbox and sent by the email worker.
+
     :param email: EmailStr: Validate the email address
     :param username: str: Pass the username to the template
     :param host: str: Pass the hostname of the server to the template
+    :param db: AsyncSession: Pass the database session to the function
     :return: An awaitable object
-    :doc-author: Trelent
-    """
-    try:
-        token_verification = auth_service.create_email_token({"sub": email})
-        message = MessageSchema(
-            subject="Confirm your email ",
-            recipients=[email],
-            template_body={"host": host, "username": username, "token": token_verification},
-            subtype=MessageType.html
-        )
-
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="email_template.html")
-    except ConnectionErrors as err:
-        print(err)
-
+    """
+    token_verification = auth_service.create_email_token({"sub": email})
+    await queue_email("confirmation", email, {"host": str(host), "username": username, "token": token_verification}, db)
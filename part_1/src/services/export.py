@@ -0,0 +1,42 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, Literal
+
+from src.database.db import AsyncSessionLocal
+from src.database.models import User
+from src.repository import contacts as repository_contacts
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_FIELDS = [column.key for column in repository_contacts.EXPORT_COLUMNS]
+
+
+def format_ndjson(rows) -> str:
+    return "".join(json.dumps(dict(zip(EXPORT_FIELDS, row)), default=str) + "\n" for row in rows)
+
+
+def format_csv(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+async def export_contacts(user: User, export_format: ExportFormat, batch_size: int = 1000) -> AsyncIterator[str]:
+    """
+    The export_contacts function yields the address book of a user as NDJSON or CSV, one chunk per batch of rows.
+        It opens its own database session, because the body of a streaming response is sent
+        after the request dependencies are closed.
+
+    :param user: User: The owner of the contacts
+    :param export_format: ExportFormat: Either ndjson or csv
+    :param batch_size: int: The number of contacts per chunk
+    :return: An async iterator of text chunks
+    """
+    if export_format == "csv":
+        yield format_csv([EXPORT_FIELDS])
+    formatter = format_csv if export_format == "csv" else format_ndjson
+    async with AsyncSessionLocal() as db:
+        async for rows in repository_contacts.stream_contacts(user, db, batch_size):
+            yield formatter(rows)
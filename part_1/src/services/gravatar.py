@@ -0,0 +1,40 @@
+import logging
+from functools import lru_cache
+
+from libgravatar import Gravatar
+
+from src.conf.config import settings
+from src.database.db import AsyncSessionLocal
+from src.repository import users as repository_users
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=settings.user_cache_maxsize)
+def gravatar_url(email: str) -> str:
+    """
+    The gravatar_url function returns the Gravatar image url of an email address.
+        Results are cached; failures are not, so the next signup retries.
+
+    :param email: str: The email address of the user
+    :return: The image url
+    """
+    return Gravatar(email).get_image()
+
+
+async def enrich_avatar(email: str) -> None:
+    """
+    The enrich_avatar function gives a newly created user a Gravatar avatar.
+        It runs as a background task after signup has committed the user, so the signup response does not
+        wait for the avatar provider; a failed lookup leaves the avatar empty.
+
+    :param email: str: The email address of the new user
+    :return: None
+    """
+    try:
+        url = gravatar_url(email)
+    except Exception as err:
+        logger.warning("gravatar lookup for %s failed: %s", email, err)
+        return
+    async with AsyncSessionLocal() as db:
+        await repository_users.set_default_avatar(email, url, db)
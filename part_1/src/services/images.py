@@ -0,0 +1,139 @@
+import asyncio
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from fastapi import HTTPException, status
+from PIL import Image, ImageOps
+
+from src.conf.config import settings
+from src.services.storage import get_storage
+
+PROBE_BYTES = 1024 * 1024
+FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+
+_executor: ProcessPoolExecutor | None = None
+
+
+class HeaderProbe:
+    """
+    Reads the dimensions of an image from the first chunks of an upload.
+        Oversized images are rejected from the header, before the pixel data is copied or decoded; only the
+        first PROBE_BYTES are kept in memory while looking for the header.
+    """
+
+    def __init__(self, max_pixels: int | None = None):
+        self.max_pixels = max_pixels or settings.avatar_max_pixels
+        self.head = b""
+        self.size: tuple[int, int] | None = None
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        The feed function collects chunks until the image header can be read.
+
+        :param self: Represent the instance of the class
+        :param chunk: bytes: The next part of the upload
+        :return: None
+        """
+        if self.size is not None:
+            return
+        self.head += chunk
+        try:
+            with Image.open(io.BytesIO(self.head)) as im:
+                self.size = im.size
+        except Image.DecompressionBombError:
+            self.size = (self.max_pixels, self.max_pixels)
+        except (OSError, SyntaxError):
+            if len(self.head) >= PROBE_BYTES:
+                raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Unsupported image")
+            return
+        self.head = b""
+        if self.size[0] * self.size[1] > self.max_pixels:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                detail="Avatar has too many pixels")
+
+    def close(self) -> None:
+        """
+        The close function checks that the whole upload was read without finding an image header.
+
+        :param self: Represent the instance of the class
+        :return: None
+        """
+        if self.size is None:
+            raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Unsupported image")
+
+
+def render_variants(path: str, sizes: tuple[int, ...], fmt: str, quality: int,
+                    max_pixels: int) -> list[tuple[int, str]]:
+    """
+    The render_variants function crops an image to a centered square and encodes it at each size.
+        It runs in a worker process, so it takes and returns only picklable values; variants are written
+        next to the source file.
+
+    :param path: str: The uploaded image
+    :param sizes: tuple[int, ...]: The side lengths of the variants, in pixels
+    :param fmt: str: The output format, a key of FORMATS
+    :param quality: int: The encoder quality
+    :param max_pixels: int: The largest accepted width * height
+    :return: The size and path of each variant
+    """
+    pil_format, _ = FORMATS[fmt]
+    largest = max(sizes)
+    with Image.open(path) as im:
+        if im.width * im.height > max_pixels:
+            raise ValueError("Avatar has too many pixels")
+        im.draft("RGB", (largest, largest))
+        im = ImageOps.exif_transpose(im)
+        im = im.convert("RGBA" if fmt == "webp" and "A" in im.getbands() else "RGB")
+    square = ImageOps.fit(im, (largest, largest), Image.Resampling.LANCZOS)
+    variants = []
+    for size in sorted(sizes, reverse=True):
+        variant = square if size == largest else square.resize((size, size), Image.Resampling.LANCZOS)
+        target = f"{path}-{size}.{fmt}"
+        variant.save(target, format=pil_format, quality=quality)
+        variants.append((size, target))
+    return variants
+
+
+def get_image_executor() -> ProcessPoolExecutor:
+    """
+    The get_image_executor function returns the process pool that renders avatars, creating it on first use.
+
+    :return: The shared ProcessPoolExecutor
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.avatar_process_workers)
+    return _executor
+
+
+def shutdown_image_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def process_avatar(path: str, key: str) -> dict[str, str]:
+    """
+    The process_avatar function renders the avatar variants in the process pool and stores them.
+        Each variant is saved under key/size through the configured storage backend, so upload time and
+        egress depend on the output sizes, not on the original photo.
+
+    :param path: str: The uploaded image
+    :param key: str: The storage key prefix of the user's avatar
+    :return: The url of each variant by size
+    """
+    _, content_type = FORMATS[settings.avatar_format]
+    loop = asyncio.get_running_loop()
+    variants = await loop.run_in_executor(get_image_executor(), render_variants, path, tuple(settings.avatar_sizes),
+                                          settings.avatar_format, settings.avatar_quality,
+                                          settings.avatar_max_pixels)
+    try:
+        storage = get_storage()
+        return {str(size): await storage.save(f"{key}/{size}", Path(variant), content_type)
+                for size, variant in variants}
+    finally:
+        for _, variant in variants:
+            os.unlink(variant)
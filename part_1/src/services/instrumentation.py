@@ -0,0 +1,203 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from redis.exceptions import ConnectionError, TimeoutError
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import BaseRoute, Mount
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.services.metrics import Gauge, HistogramFamily, render_histogram
+from src.services.readiness import readiness
+
+DEPENDENCIES = ("db", "redis", "bcrypt", "email", "cloudinary")
+UNMATCHED_ROUTE = "<unmatched>"
+
+request_duration = HistogramFamily("http_request_duration_seconds", "Time to respond to HTTP requests.",
+                                   ("method", "route", "status"))
+request_dependency_duration = HistogramFamily(
+    "http_request_dependency_seconds", "Time an HTTP request spent waiting on each dependency.",
+    ("method", "route", "dependency"))
+requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served.")
+dependency_duration = HistogramFamily("dependency_call_duration_seconds",
+                                      "Time of single calls to the database, Redis, bcrypt, the SMTP server and Cloudinary.",
+                                      ("dependency",))
+
+_request_timings: ContextVar[dict[str, float] | None] = ContextVar("request_timings", default=None)
+
+
+def observe_dependency(dependency: str, seconds: float) -> None:
+    """
+    The observe_dependency function records one call to a dependency.
+        The time is also added to the request being served, if any, so it can be attributed to the route.
+
+    :param dependency: str: One of DEPENDENCIES
+    :param seconds: float: The duration of the call
+    :return: None
+    """
+    dependency_duration.labels(dependency).observe(seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[dependency] = timings.get(dependency, 0.0) + seconds
+
+
+@contextmanager
+def track(dependency: str) -> Iterator[None]:
+    """
+    The track function times the block it wraps as a call to dependency, whether it succeeds or raises.
+
+    :param dependency: str: One of DEPENDENCIES
+    :return: A context manager
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_dependency(dependency, time.perf_counter() - started)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    The instrument_engine function times every statement executed by a synchronous engine.
+        For an AsyncEngine pass its sync_engine; the events then run inside the awaiting task,
+        so the time is attributed to the request that issued the query.
+
+    :param engine: Engine: The engine to instrument
+    :return: None
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        observe_dependency("db", time.perf_counter() - conn.info["query_started"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            observe_dependency("db", time.perf_counter() - started.pop())
+
+
+def instrument_redis(client):
+    """
+    The instrument_redis function times the commands and pipelines sent through an asyncio Redis client
+    and tracks the readiness of Redis from the outcome of the commands.
+        redis-py has no hooks, so execute_command and the execute method of new pipelines are wrapped
+        on the instance; every service sharing the client is covered.
+
+    :param client: redis.asyncio.Redis: The client to instrument
+    :return: The same client
+    """
+    execute_command = client.execute_command
+    pipeline = client.pipeline
+
+    async def timed_execute_command(*args, **options):
+        try:
+            with track("redis"):
+                result = await execute_command(*args, **options)
+        except (ConnectionError, TimeoutError) as err:
+            readiness["redis"].failed(err)
+            raise
+        readiness["redis"].ready()
+        return result
+
+    def timed_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        async def timed_execute(*execute_args, **execute_kwargs):
+            with track("redis"):
+                return await execute(*execute_args, **execute_kwargs)
+
+        pipe.execute = timed_execute
+        return pipe
+
+    client.execute_command = timed_execute_command
+    client.pipeline = timed_pipeline
+    return client
+
+
+def route_templates(routes: list[BaseRoute], prefix: str = "") -> dict:
+    """
+    The route_templates function maps the endpoint of every route to its path template, such as /api/contacts/{contact_id}.
+        Routes are labelled by template so the metrics stay bounded no matter which ids are requested.
+
+    :param routes: list[BaseRoute]: The routes of the application
+    :param prefix: str: The path of the enclosing mount
+    :return: A dictionary of endpoints and path templates
+    """
+    templates = {}
+    for route in routes:
+        if isinstance(route, Mount) and route.routes:
+            templates.update(route_templates(route.routes, prefix + route.path))
+        elif isinstance(route, Mount):
+            templates[route.app] = prefix + route.path
+        elif hasattr(route, "endpoint"):
+            templates.setdefault(route.endpoint, prefix + route.path)
+    return templates
+
+
+class MetricsMiddleware:
+    """
+    Records the latency, status and dependency time of every HTTP request.
+        It is a plain ASGI middleware, so it runs in the task of the request and the dependency time recorded
+        by track reaches it through a context variable.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.templates: dict | None = None
+
+    def route(self, scope: Scope) -> str:
+        if self.templates is None:
+            self.templates = route_templates(scope["app"].routes)
+        return self.templates.get(scope.get("endpoint"), UNMATCHED_ROUTE)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+        timings: dict[str, float] = {}
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        token = _request_timings.set(timings)
+        requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            requests_in_flight.dec()
+            _request_timings.reset(token)
+            method, route = scope["method"], self.route(scope)
+            request_duration.labels(method, route, str(status_code)).observe(elapsed)
+            for dependency, seconds in timings.items():
+                request_dependency_duration.labels(method, route, dependency).observe(seconds)
+
+
+def render_metrics(pools: dict | None = None) -> str:
+    """
+    The render_metrics function renders all metrics of this worker in the Prometheus text format.
+
+    :param pools: dict | None: Connection pool metrics to include, keyed by pool name
+    :return: The exposition text
+    """
+    lines = []
+    for metric in (request_duration, request_dependency_duration, requests_in_flight, dependency_duration):
+        lines.extend(metric.render())
+    if pools:
+        lines.append("# HELP db_pool_wait_seconds Time spent waiting for a free database connection.")
+        lines.append("# TYPE db_pool_wait_seconds histogram")
+        for name, metrics in pools.items():
+            lines.extend(render_histogram("db_pool_wait_seconds", {"pool": name}, metrics.wait_time.snapshot()))
+    return "\n".join(lines) + "\n"
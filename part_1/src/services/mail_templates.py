@@ -0,0 +1,88 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, Template
+
+TEMPLATE_FOLDER = Path(__file__).parent / 'templates'
+
+
+@dataclass(frozen=True)
+class MessageType:
+    subject: str
+    html: str
+    text: str
+
+
+@dataclass(frozen=True)
+class RenderedEmail:
+    subject: str
+    html: str
+    text: str
+
+
+MESSAGE_TYPES = {
+    "confirmation": MessageType("Confirm your email", "confirmation.html", "confirmation.txt"),
+    "password_reset": MessageType("Reset your password", "password_reset.html", "password_reset.txt"),
+    "birthday_digest": MessageType("Upcoming birthdays", "birthday_digest.html", "birthday_digest.txt"),
+}
+
+
+class TemplateRegistry:
+    """
+    Compiles the email templates once and renders messages from them.
+        Every message type has a subject and an HTML and a plain-text template; the HTML templates are
+        autoescaped, the text templates are not. Templates are read from disk only in load, so rendering
+        never touches the file system.
+    """
+
+    def __init__(self, folder: Path = TEMPLATE_FOLDER, types: dict[str, MessageType] | None = None):
+        loader = FileSystemLoader(folder)
+        self.html_env = Environment(loader=loader, autoescape=True, undefined=StrictUndefined, auto_reload=False)
+        self.text_env = Environment(loader=loader, autoescape=False, undefined=StrictUndefined, auto_reload=False,
+                                    keep_trailing_newline=True)
+        self.types = MESSAGE_TYPES if types is None else types
+        self.compiled: dict[str, tuple[Template, Template, Template]] = {}
+
+    def load(self) -> None:
+        """
+        The load function compiles the templates of every message type.
+            It is called at startup, so a broken template fails the deploy instead of the first send.
+
+        :param self: Represent the instance of the class
+        :return: None
+        """
+        self.compiled = {
+            name: (self.text_env.from_string(kind.subject), self.html_env.get_template(kind.html),
+                   self.text_env.get_template(kind.text))
+            for name, kind in self.types.items()
+        }
+
+    def subject(self, name: str, context: dict) -> str:
+        """
+        The subject function renders only the subject of a message.
+
+        :param self: Represent the instance of the class
+        :param name: str: The message type, a key of MESSAGE_TYPES
+        :param context: dict: The template variables
+        :return: The subject line
+        """
+        if not self.compiled:
+            self.load()
+        return self.compiled[name][0].render(context)
+
+    def render(self, name: str, context: dict) -> RenderedEmail:
+        """
+        The render function renders the subject and both bodies of a message.
+
+        :param self: Represent the instance of the class
+        :param name: str: The message type, a key of MESSAGE_TYPES
+        :param context: dict: The template variables
+        :return: The rendered message
+        """
+        if not self.compiled:
+            self.load()
+        subject, html, text = self.compiled[name]
+        return RenderedEmail(subject=subject.render(context), html=html.render(context), text=text.render(context))
+
+
+template_registry = TemplateRegistry()
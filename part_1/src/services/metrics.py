@@ -0,0 +1,142 @@
+import threading
+from bisect import bisect_left
+from typing import Sequence
+
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    A thread-safe histogram with fixed, cumulative buckets in the Prometheus style.
+    Observations are in seconds.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """
+        The observe function records a single measurement in the matching bucket.
+
+        :param self: Represent the instance of the class
+        :param value: float: The measured value, in seconds
+        :return: None
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> dict:
+        """
+        The snapshot function returns the current state of the histogram.
+            Bucket counts are cumulative, so every bucket includes the observations of the smaller ones.
+
+        :param self: Represent the instance of the class
+        :return: A dictionary with the cumulative buckets, the observation count and their sum
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = {}
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            cumulative["+Inf" if bound == float("inf") else str(bound)] = running
+        return {"buckets": cumulative, "count": running, "sum": total}
+
+
+class HistogramFamily:
+    """
+    One histogram per combination of label values, created on first use.
+        Label values must come from a small, fixed set such as route templates, never from raw paths or ids.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+        self.children: dict[tuple[str, ...], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str) -> Histogram:
+        """
+        The labels function returns the histogram of one combination of label values.
+
+        :param self: Represent the instance of the class
+        :param *values: str: The label values, in the order of labelnames
+        :return: The histogram of these label values
+        """
+        child = self.children.get(values)
+        if child is None:
+            with self._lock:
+                child = self.children.setdefault(values, Histogram(self.buckets))
+        return child
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for values, child in sorted(self.children.items()):
+            lines.extend(render_histogram(self.name, dict(zip(self.labelnames, values)), child.snapshot()))
+        return lines
+
+
+class Gauge:
+    """
+    A thread-safe value that goes up and down, such as the number of requests in progress.
+    """
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge", f"{self.name} {self.value}"]
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: dict[str, str]) -> str:
+    """
+    The format_labels function formats labels for the Prometheus text format, escaping the values.
+
+    :param labels: dict[str, str]: The label names and values
+    :return: The labels in braces, or an empty string if there are none
+    """
+    if not labels:
+        return ""
+    pairs = (f'{name}="{escape_label(value)}"' for name, value in labels.items())
+    return "{" + ",".join(pairs) + "}"
+
+
+def render_histogram(name: str, labels: dict[str, str], snapshot: dict) -> list[str]:
+    """
+    The render_histogram function turns a histogram snapshot into the sample lines of the Prometheus text format.
+
+    :param name: str: The metric name
+    :param labels: dict[str, str]: The labels of the histogram
+    :param snapshot: dict: The result of Histogram.snapshot
+    :return: The bucket, sum and count lines
+    """
+    lines = [f"{name}_bucket{format_labels({**labels, 'le': bound})} {count}"
+             for bound, count in snapshot["buckets"].items()]
+    lines.append(f"{name}_sum{format_labels(labels)} {snapshot['sum']}")
+    lines.append(f"{name}_count{format_labels(labels)} {snapshot['count']}")
+    return lines
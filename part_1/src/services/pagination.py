@@ -0,0 +1,35 @@
+import base64
+import binascii
+
+from fastapi import HTTPException, status
+
+CURSOR_VERSION = "v1"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int) -> str:
+    """
+    The encode_cursor function turns the id of the last contact on a page into an opaque cursor.
+
+    :param last_id: int: The id of the last contact returned
+    :return: A url safe cursor string
+    """
+    return base64.urlsafe_b64encode(f"{CURSOR_VERSION}:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    The decode_cursor function reads the contact id back from a cursor made by encode_cursor.
+        Malformed cursors are rejected with HTTP 400.
+
+    :param cursor: str: The cursor sent by the client
+    :return: The id of the last contact of the previous page
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        version, last_id = raw.split(":", 1)
+        if version != CURSOR_VERSION:
+            raise ValueError(version)
+        return int(last_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
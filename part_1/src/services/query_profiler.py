@@ -0,0 +1,184 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.conf.config import settings
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_HEADER = "X-Query-Count"
+SAVEPOINT_STATEMENTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Raised by assert_max_queries when a block runs more statements than allowed.
+    """
+
+
+@dataclass
+class QueryProfile:
+    """
+    The statements executed while a profile is active.
+        Statements are grouped by their SQL text; SQLAlchemy sends parameters separately,
+        so the same query run for different rows has the same text.
+        SAVEPOINT statements are not recorded: the application never issues them, only the test sessions
+        that join an outer transaction do, and counting them would make budgets depend on the harness.
+    """
+    slow_threshold: float = settings.query_profiler_slow_threshold
+    n_plus_one_threshold: int = settings.query_profiler_n_plus_one_threshold
+    count: int = 0
+    duration: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+    slow: list[tuple[str, float, object]] = field(default_factory=list)
+
+    def record(self, statement: str, parameters, seconds: float, executemany: bool) -> None:
+        """
+        The record function adds one executed statement to the profile and logs it if it was slow.
+
+        :param self: Represent the instance of the class
+        :param statement: str: The SQL text
+        :param parameters: The bound parameters
+        :param seconds: float: The execution time
+        :param executemany: bool: Whether the parameters are a list of parameter sets
+        :return: None
+        """
+        if statement.lstrip().upper().startswith(SAVEPOINT_STATEMENTS):
+            return
+        self.count += 1
+        self.duration += seconds
+        self.statements[statement] += 1
+        if seconds >= self.slow_threshold:
+            shape = parameter_shape(parameters, executemany)
+            self.slow.append((statement, seconds, shape))
+            logger.warning("slow query (%.1f ms) %s parameters=%s", seconds * 1000, statement, shape)
+
+    def n_plus_one(self) -> list[tuple[str, int]]:
+        """
+        The n_plus_one function returns the SELECT statements run at least n_plus_one_threshold times,
+        the signature of related rows loaded one query per parent row.
+
+        :param self: Represent the instance of the class
+        :return: The repeated statements with their counts, most repeated first
+        """
+        return [(statement, count) for statement, count in self.statements.most_common()
+                if count >= self.n_plus_one_threshold and statement.lstrip()[:6].upper() == "SELECT"]
+
+
+_current_profile: ContextVar[QueryProfile | None] = ContextVar("query_profile", default=None)
+
+
+def parameter_shape(parameters, executemany: bool = False):
+    """
+    The parameter_shape function describes bound parameters by their types, so slow queries can be logged
+    without leaking the values.
+
+    :param parameters: The bound parameters, a sequence or a mapping, or a list of them for executemany
+    :param executemany: bool: Whether the parameters are a list of parameter sets
+    :return: The shape, such as ('int', 'str') or {'email': 'str'}, and the number of rows for executemany
+    """
+    if executemany and parameters:
+        return {"rows": len(parameters), "shape": parameter_shape(parameters[0])}
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return tuple(type(value).__name__ for value in parameters)
+    return type(parameters).__name__
+
+
+def profile_engine(engine: Engine) -> None:
+    """
+    The profile_engine function feeds the statements of an engine to the active profile.
+        Outside a profile the listeners only read a context variable. For an AsyncEngine pass its sync_engine.
+
+    :param engine: Engine: The engine to profile
+    :return: None
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_profile.get() is not None:
+            conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = _current_profile.get()
+        started = conn.info.get("profile_started")
+        if profile is not None and started:
+            profile.record(statement, parameters, time.perf_counter() - started.pop(), executemany)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        started = context.connection.info.get("profile_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+@contextmanager
+def profile_queries(**options) -> Iterator[QueryProfile]:
+    """
+    The profile_queries function records the statements run inside the with block,
+    including those of tasks started from it.
+
+    :param **options: Override the QueryProfile thresholds
+    :return: A context manager yielding the QueryProfile
+    """
+    profile = QueryProfile(**options)
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+@contextmanager
+def assert_max_queries(budget: int) -> Iterator[QueryProfile]:
+    """
+    The assert_max_queries function fails the test when the with block runs more than budget statements.
+        The error lists the statements, so the extra query is easy to find.
+
+    :param budget: int: The maximum number of statements
+    :return: A context manager yielding the QueryProfile
+    """
+    with profile_queries() as profile:
+        yield profile
+    if profile.count > budget:
+        listing = "\n".join(f"{count}x {statement}" for statement, count in profile.statements.items())
+        raise QueryBudgetExceeded(f"{profile.count} queries run, budget is {budget}:\n{listing}")
+
+
+class QueryProfilerMiddleware:
+    """
+    Profiles the statements of every HTTP request when query_profiler_enabled is set.
+        It logs the number of statements and the time spent in them, warns about N+1 patterns
+        and reports the count in the X-Query-Count response header.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with profile_queries() as profile:
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    MutableHeaders(scope=message).append(QUERY_COUNT_HEADER, str(profile.count))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                request = f"{scope['method']} {scope['path']}"
+                logger.info("%s ran %d queries in %.1f ms", request, profile.count, profile.duration * 1000)
+                for statement, count in profile.n_plus_one():
+                    logger.warning("possible N+1 in %s: %d executions of %s", request, count, statement)
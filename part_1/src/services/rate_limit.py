@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass
+
+from fastapi import Depends, HTTPException, Request, status
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.conf.config import settings
+from src.database.models import User
+from src.services.auth import auth_service
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    scope: str
+    times: int
+    seconds: int
+
+
+USER_POLICY = RateLimitPolicy("user", settings.rate_limit_user_times, settings.rate_limit_user_seconds)
+IP_POLICY = RateLimitPolicy("ip", settings.rate_limit_ip_times, settings.rate_limit_ip_seconds)
+
+
+class WindowCounter:
+    """
+    Request counts of one rate limit key for the current and the previous fixed window.
+        current and previous are the totals of all workers as last seen in Redis,
+        unsynced holds the hits of this worker that were not pushed to Redis yet.
+    """
+    __slots__ = ("seconds", "window", "current", "previous", "unsynced")
+
+    def __init__(self, seconds: int, window: int):
+        self.seconds = seconds
+        self.window = window
+        self.current = 0
+        self.previous = 0
+        self.unsynced = 0
+
+    def roll(self, window: int) -> None:
+        if window == self.window:
+            return
+        if window == self.window + 1:
+            self.previous = self.current + self.unsynced
+        else:
+            self.previous = 0
+        self.current = 0
+        self.unsynced = 0
+        self.window = window
+
+
+class SlidingWindowLimiter:
+    """
+    A sliding window rate limiter that decides locally and shares counts through Redis in batches.
+        Every worker answers from its own counters, so a check costs no network round trip. A background task pushes
+        the local hits to Redis every sync_interval seconds in one pipeline and reads back the totals of all workers.
+        When Redis is unreachable the limiter keeps working on local counts only (degraded mode).
+    """
+
+    def __init__(self, sync_interval: float = settings.rate_limit_sync_interval):
+        self.sync_interval = sync_interval
+        self.redis: Redis | None = None
+        self.degraded = False
+        self.counters: dict[str, WindowCounter] = {}
+        self._task: asyncio.Task | None = None
+
+    def init(self, redis: Redis | None) -> None:
+        """
+        The init function attaches the shared Redis client and starts the background sync task.
+
+        :param self: Represent the instance of the class
+        :param redis: Redis | None: The client created at startup, None limits every worker on its own
+        :return: None
+        """
+        self.redis = redis
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._sync_forever())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.sync()
+
+    def hit(self, key: str, times: int, seconds: int, now: float | None = None) -> float:
+        """
+        The hit function counts one request for key and checks it against the limit.
+            The count is a sliding window estimate: the previous window weighted by the part of it that
+            still overlaps the last `seconds` seconds, plus the current window.
+
+        :param self: Represent the instance of the class
+        :param key: str: The rate limit key, e.g. the policy scope, the caller and the route
+        :param times: int: The number of requests allowed per window
+        :param seconds: int: The window length
+        :param now: float | None: The current time, for tests
+        :return: 0 if the request is allowed, otherwise the number of seconds to wait
+        """
+        now = time.time() if now is None else now
+        window, offset = divmod(now, seconds)
+        counter = self.counters.get(key)
+        if counter is None:
+            counter = self.counters[key] = WindowCounter(seconds, int(window))
+        counter.roll(int(window))
+        weight = 1 - offset / seconds
+        estimated = counter.previous * weight + counter.current + counter.unsynced
+        if estimated + 1 > times:
+            return max(seconds - offset, 0.001)
+        counter.unsynced += 1
+        return 0
+
+    async def sync(self, now: float | None = None) -> None:
+        """
+        The sync function pushes the unsynced hits of every key to Redis in a single pipeline
+            and refreshes the totals of all workers. Without Redis the hits are folded into the local totals.
+            Hits are pushed against the window they were counted in, before the counters roll over to the
+            current window, so hits from just before a window boundary reach the other workers too.
+
+        :param self: Represent the instance of the class
+        :param now: float | None: The current time, for tests
+        :return: None
+        """
+        now = time.time() if now is None else now
+        batch = []
+        for key, counter in list(self.counters.items()):
+            if counter.unsynced:
+                batch.append((key, counter, counter.window, counter.unsynced))
+                counter.current += counter.unsynced
+                counter.unsynced = 0
+            counter.roll(int(now // counter.seconds))
+            if counter.current == 0 and counter.previous == 0:
+                del self.counters[key]
+        if not batch or self.redis is None:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, counter, window, delta in batch:
+                    pipe.incrby(f"rl:{key}:{window}", delta)
+                    pipe.expire(f"rl:{key}:{window}", counter.seconds * 2)
+                    pipe.get(f"rl:{key}:{window - 1}")
+                results = await pipe.execute()
+        except RedisError as err:
+            if not self.degraded:
+                logger.warning("rate limiter switched to local-only mode: %s", err)
+            self.degraded = True
+            return
+        if self.degraded:
+            logger.info("rate limiter reconnected to Redis")
+        self.degraded = False
+        for index, (key, counter, window, delta) in enumerate(batch):
+            if counter.window == window:
+                counter.current = int(results[index * 3])
+                counter.previous = int(results[index * 3 + 2] or 0)
+            elif counter.window == window + 1:
+                counter.previous = int(results[index * 3])
+
+    async def _sync_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception as err:
+                logger.exception("rate limiter sync failed: %s", err)
+
+
+rate_limiter = SlidingWindowLimiter()
+
+
+def check(policy: RateLimitPolicy, identity: str, route: str) -> None:
+    if policy.times <= 0:
+        return
+    retry_after = rate_limiter.hit(f"{policy.scope}:{identity}:{route}", policy.times, policy.seconds)
+    if retry_after:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too Many Requests",
+                            headers={"Retry-After": str(math.ceil(retry_after))})
+
+
+async def limit_requests(request: Request, current_user: User = Depends(auth_service.get_current_user)):
+    """
+    The limit_requests dependency applies the per-IP and the per-user rate limit policies to a route.
+        Each route is counted separately for every caller, like the fastapi_limiter RateLimiter it replaces.
+
+    :param request: Request: Get the client address and the route
+    :param current_user: User: Get the current user
+    :return: None, or raises HTTP 429 with a Retry-After header
+    """
+    if not settings.rate_limit_enabled:
+        return
+    route = getattr(request.scope.get("route"), "path", request.url.path)
+    check(IP_POLICY, request.client.host if request.client else "unknown", route)
+    check(USER_POLICY, str(current_user.id), route)
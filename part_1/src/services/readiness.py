@@ -0,0 +1,99 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class Dependency:
+    """
+    The readiness of one external client.
+        Clients are created on first use, so a dependency starts idle and becomes ready or failed with
+        the outcome of its latest connection attempt. Only required dependencies make the worker unready;
+        the others have a fallback, such as the local rate limiter without Redis.
+    """
+
+    def __init__(self, name: str, required: bool = False):
+        self.name = name
+        self.required = required
+        self.state = "idle"
+        self.error: str | None = None
+        self.changed_at: float | None = None
+        self._lock = threading.Lock()
+
+    def ready(self) -> None:
+        """
+        The ready function records a successful connection or call.
+
+        :param self: Represent the instance of the class
+        :return: None
+        """
+        if self.state != "ready":
+            self._set("ready", None)
+
+    def failed(self, error: BaseException | str) -> None:
+        """
+        The failed function records that the dependency could not be reached.
+
+        :param self: Represent the instance of the class
+        :param error: BaseException | str: The error of the failed attempt
+        :return: None
+        """
+        self._set("failed", str(error) or type(error).__name__)
+
+    def _set(self, state: str, error: str | None) -> None:
+        with self._lock:
+            self.state, self.error, self.changed_at = state, error, time.time()
+
+    def status(self) -> dict:
+        return {"state": self.state, "required": self.required, "error": self.error, "changed_at": self.changed_at}
+
+
+class Readiness:
+    """
+    The dependencies of this worker and their readiness.
+    """
+
+    def __init__(self, dependencies: list[Dependency]):
+        self.dependencies = {dependency.name: dependency for dependency in dependencies}
+
+    def __getitem__(self, name: str) -> Dependency:
+        return self.dependencies[name]
+
+    @property
+    def ready(self) -> bool:
+        return not any(dependency.required and dependency.state == "failed"
+                       for dependency in self.dependencies.values())
+
+    def status(self) -> dict:
+        """
+        The status function reports whether the worker can serve requests and the state of every dependency.
+
+        :param self: Represent the instance of the class
+        :return: A dictionary with the overall readiness and the status of each dependency
+        """
+        return {"ready": self.ready, "dependencies": {name: dependency.status()
+                                                      for name, dependency in self.dependencies.items()}}
+
+
+readiness = Readiness([Dependency("db", required=True), Dependency("redis"), Dependency("mail"),
+                       Dependency("cloudinary")])
+
+
+def watch_engine(engine: Engine) -> None:
+    """
+    The watch_engine function tracks the readiness of the database through the events of an engine.
+        A new connection marks it ready, a failed connect or a disconnect error marks it failed.
+        For an AsyncEngine pass its sync_engine.
+
+    :param engine: Engine: The engine to watch
+    :return: None
+    """
+    @event.listens_for(engine, "connect")
+    def connect(dbapi_connection, connection_record):
+        readiness["db"].ready()
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        if context.is_disconnect or context.connection is None:
+            readiness["db"].failed(context.original_exception)
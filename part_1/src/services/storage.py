@@ -0,0 +1,97 @@
+import asyncio
+import mimetypes
+import shutil
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from src.conf.config import settings
+from src.services.instrumentation import track
+from src.services.readiness import readiness
+
+
+class StorageBackend(ABC):
+    """
+    Stores uploaded files and returns their public url.
+    """
+
+    @abstractmethod
+    async def save(self, key: str, path: Path, content_type: str) -> str:
+        """
+        The save function stores the file at path under key.
+
+        :param self: Represent the instance of the class
+        :param key: str: The name of the stored file, without extension
+        :param path: Path: A local file with the content to store
+        :param content_type: str: The media type of the content
+        :return: The public url of the stored file
+        """
+
+
+class LocalStorage(StorageBackend):
+    """
+    Keeps files in a local directory that the application serves under base_url. Used in development and tests.
+        The extension of content_type is appended to the key so the files are served with the right media type.
+        Keys that resolve to a path outside of root are rejected with ValueError.
+    """
+
+    def __init__(self, root: str = settings.avatar_local_dir, base_url: str = settings.avatar_local_url):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+
+    async def save(self, key: str, path: Path, content_type: str) -> str:
+        key += mimetypes.guess_extension(content_type) or ""
+        target = (self.root / key).resolve()
+        if not target.is_relative_to(self.root.resolve()):
+            raise ValueError(f"Storage key {key!r} is outside of the storage root")
+        await asyncio.to_thread(self._copy, path, target)
+        return f"{self.base_url}/{key}"
+
+    @staticmethod
+    def _copy(source: Path, target: Path) -> None:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(source, target)
+
+
+class CloudinaryStorage(StorageBackend):
+    """
+    Uploads files to Cloudinary. The blocking SDK call runs in a worker thread.
+        Files are stored as they are; resizing happens before upload, so no transformation is added to the url.
+        The SDK is imported when the backend is created by the first upload.
+    """
+
+    def __init__(self):
+        import cloudinary
+        import cloudinary.uploader
+        self.uploader = cloudinary.uploader
+        cloudinary.config(
+            cloud_name=settings.cloudinary_name,
+            api_key=settings.cloudinary_api_key,
+            api_secret=settings.cloudinary_api_secret,
+            secure=True
+        )
+
+    async def save(self, key: str, path: Path, content_type: str) -> str:
+        try:
+            with track("cloudinary"):
+                r = await asyncio.to_thread(self.uploader.upload, str(path), public_id=key, overwrite=True)
+        except Exception as err:
+            readiness["cloudinary"].failed(err)
+            raise
+        readiness["cloudinary"].ready()
+        return r['secure_url']
+
+
+BACKENDS = {"local": LocalStorage, "cloudinary": CloudinaryStorage}
+_storage: StorageBackend | None = None
+
+
+def get_storage() -> StorageBackend:
+    """
+    The get_storage function returns the storage backend selected by the avatar_storage setting.
+
+    :return: The shared StorageBackend instance
+    """
+    global _storage
+    if _storage is None:
+        _storage = BACKENDS[settings.avatar_storage]()
+    return _storage
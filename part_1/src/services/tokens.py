@@ -0,0 +1,171 @@
+import hashlib
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+
+from jose import JWTError
+from jose import jwt as jose_jwt
+
+from src.conf.config import settings
+
+ASYMMETRIC_PREFIXES = ("RS", "PS", "ES", "EdDSA")
+
+
+class TokenError(Exception):
+    """
+    Raised by the JWT backends for tokens that are malformed, expired or have a bad signature.
+    """
+
+
+class JWTBackend(ABC):
+    """
+    Signs and verifies JWTs with one algorithm.
+        HMAC algorithms use the secret key for both; asymmetric ones sign with the private key and verify
+        with the public key, so services that only verify tokens never need the signing key.
+    """
+
+    def __init__(self, algorithm: str, secret_key: str | None = None, private_key: str | None = None,
+                 public_key: str | None = None):
+        self.algorithm = algorithm
+        if algorithm.startswith(ASYMMETRIC_PREFIXES):
+            self.signing_key, self.verifying_key = private_key, public_key
+        else:
+            self.signing_key = self.verifying_key = secret_key
+
+    @abstractmethod
+    def encode(self, claims: dict) -> str:
+        """
+        The encode function signs claims into a token.
+
+        :param self: Represent the instance of the class
+        :param claims: dict: The claims of the token
+        :return: The encoded token
+        """
+
+    @abstractmethod
+    def decode(self, token: str) -> dict:
+        """
+        The decode function verifies the signature and expiry of a token and returns its claims.
+
+        :param self: Represent the instance of the class
+        :param token: str: The encoded token
+        :return: The claims of the token
+        """
+
+
+class JoseBackend(JWTBackend):
+    """
+    Uses python-jose, which supports the HMAC, RSA and ECDSA algorithms but not EdDSA.
+    """
+
+    def encode(self, claims: dict) -> str:
+        return jose_jwt.encode(claims, self.signing_key, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        try:
+            return jose_jwt.decode(token, self.verifying_key, algorithms=[self.algorithm])
+        except JWTError as err:
+            raise TokenError(str(err)) from err
+
+
+class PyJWTBackend(JWTBackend):
+    """
+    Uses PyJWT, which also supports EdDSA. PyJWT is an optional dependency, imported when the backend is created.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        import jwt
+        self.jwt = jwt
+
+    def encode(self, claims: dict) -> str:
+        return self.jwt.encode(claims, self.signing_key, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        try:
+            return self.jwt.decode(token, self.verifying_key, algorithms=[self.algorithm])
+        except self.jwt.InvalidTokenError as err:
+            raise TokenError(str(err)) from err
+
+
+BACKENDS = {"jose": JoseBackend, "pyjwt": PyJWTBackend}
+
+
+def read_key(value: str | None) -> str | None:
+    """
+    The read_key function accepts a PEM key or the path of a file containing one.
+
+    :param value: str | None: The setting value
+    :return: The PEM key
+    """
+    if value and not value.lstrip().startswith("-----BEGIN"):
+        return Path(value).read_text()
+    return value
+
+
+def get_jwt_backend() -> JWTBackend:
+    """
+    The get_jwt_backend function creates the backend selected by the jwt_backend and algorithm settings.
+
+    :return: The JWT backend
+    """
+    return BACKENDS[settings.jwt_backend](settings.algorithm, secret_key=settings.secret_key,
+                                          private_key=read_key(settings.jwt_private_key),
+                                          public_key=read_key(settings.jwt_public_key))
+
+
+class TokenCache:
+    """
+    Remembers the claims of recently verified tokens, so a token used for many requests is verified once.
+        Entries are keyed by the SHA-256 digest of the token, so the cache holds no usable credentials,
+        and expire with the token. The cache is bounded and evicts the least recently used token.
+    """
+
+    def __init__(self, maxsize: int = settings.token_cache_size):
+        self.maxsize = maxsize
+        self.entries: OrderedDict[bytes, tuple[dict, float]] = OrderedDict()
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        """
+        The get function returns the claims of a cached token that has not expired.
+
+        :param self: Represent the instance of the class
+        :param token: str: The encoded token
+        :return: The claims or None
+        """
+        key = self.key(token)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        claims, expires_at = entry
+        if expires_at <= time.time():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return claims
+
+    def set(self, token: str, claims: dict) -> None:
+        """
+        The set function caches the claims of a verified token until its exp claim.
+            Tokens without an expiry are not cached.
+
+        :param self: Represent the instance of the class
+        :param token: str: The encoded token
+        :param claims: dict: The verified claims
+        :return: None
+        """
+        if self.maxsize <= 0 or not isinstance(claims.get("exp"), (int, float)):
+            return
+        key = self.key(token)
+        self.entries[key] = (claims, claims["exp"])
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
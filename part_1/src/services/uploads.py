@@ -0,0 +1,132 @@
+from typing import AsyncIterator
+
+from fastapi import HTTPException, Request, status
+from multipart.multipart import MultipartParser, parse_options_header
+
+MULTIPART_OVERHEAD = 16 * 1024
+
+
+class MultipartFile:
+    """
+    One file field of a multipart/form-data request, read while the body arrives.
+        UploadFile is only available after Starlette has spooled the whole body, so limits checked while reading it
+        cannot stop a large upload. This parser reads request.stream() on demand instead: the body is consumed
+        only as far as the caller reads the field, and a caller that raises stops the transfer.
+        It offers the content_type and read of UploadFile, so it can be passed where an UploadFile is read.
+    """
+
+    def __init__(self, stream: AsyncIterator[bytes], boundary: bytes, field: str):
+        self.field = field
+        self.content_type: str | None = None
+        self.filename: str | None = None
+        self._stream = stream
+        self._chunks: list[bytes] = []
+        self._headers: dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._in_field = False
+        self._found = False
+        self._field_done = False
+        self._body_done = False
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+
+    async def open(self) -> None:
+        """
+        The open function reads the body up to the headers of the field.
+
+        :param self: Represent the instance of the class
+        :return: None
+        """
+        while not self._found and not self._body_done:
+            await self._feed()
+        if not self._found:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                detail=f"Missing file field {self.field!r}")
+
+    async def read(self, size: int = -1) -> bytes:
+        """
+        The read function returns the next bytes of the field, reading more of the body only when needed.
+
+        :param self: Represent the instance of the class
+        :param size: int: The largest number of bytes to return, -1 for all that is buffered
+        :return: The bytes, or b"" at the end of the field
+        """
+        while not self._chunks and not self._field_done and not self._body_done:
+            await self._feed()
+        data = b"".join(self._chunks)
+        if 0 <= size < len(data):
+            data, rest = data[:size], data[size:]
+            self._chunks = [rest]
+        else:
+            self._chunks = []
+        return data
+
+    async def _feed(self) -> None:
+        try:
+            chunk = await anext(self._stream)
+        except StopAsyncIteration:
+            self._body_done = True
+            return
+        self._parser.write(chunk)
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_field:
+            self._chunks.append(bytes(data[start:end]))
+
+    def _on_part_end(self) -> None:
+        if self._in_field:
+            self._in_field = False
+            self._field_done = True
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if self._found or options.get(b"name", b"").decode() != self.field:
+            return
+        self._found = self._in_field = True
+        self.filename = options[b"filename"].decode() if b"filename" in options else None
+        self.content_type = self._headers.get(b"content-type", b"").decode() or None
+
+
+async def open_upload(request: Request, field: str, max_bytes: int) -> MultipartFile:
+    """
+    The open_upload function starts reading a file field of a multipart/form-data request.
+        A request whose Content-Length shows that the file cannot fit in max_bytes is rejected with HTTP 413
+        before any of its body is read. The caller enforces max_bytes on the bytes it reads, for requests
+        without a Content-Length or with a misleading one.
+
+    :param request: Request: The incoming request
+    :param field: str: The name of the file field
+    :param max_bytes: int: The largest accepted file
+    :return: The field, ready to be read
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                            detail="Expected a multipart/form-data upload")
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Upload is too large")
+    upload = MultipartFile(request.stream(), options[b"boundary"], field)
+    await upload.open()
+    return upload
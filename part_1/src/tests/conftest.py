@@ -0,0 +1,161 @@
+"""
+Fixtures of the route tests.
+
+Every test runs inside a transaction on one connection to the test database that is rolled back afterwards,
+so tests never see each other's rows and need no cleanup. The application's sessions are bound to that
+connection and commit to SAVEPOINTs only. By default the database is SQLite in memory, created once per process;
+set TEST_DATABASE_URL to an async PostgreSQL url of a migrated template database to run against PostgreSQL,
+every pytest-xdist worker then works on its own copy of the template.
+
+The test engine gets the same listeners as the application's engines, so assert_max_queries and the metrics
+count the statements of the routes under test.
+
+Redis is replaced by a fresh fakeredis server per test, shared by the rate limiter and the caches.
+Run the suite in parallel with pytest -n auto.
+"""
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "test-secret-key-for-the-route-tests")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("BIRTHDAY_DIGEST_ENABLED", "false")
+
+import pytest
+import pytest_asyncio
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from main import app
+from src.database.db import AsyncSessionLocal, _observe
+from src.database.models import Base, User
+from src.services.auth import auth_service
+from src.services.cache import contact_cache, user_cache
+from src.services.rate_limit import rate_limiter
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "sqlite+aiosqlite://")
+
+
+async def create_worker_database(url):
+    """
+    The create_worker_database function copies the template database for the current pytest-xdist worker.
+
+    :param url: URL: The url of the template database
+    :return: The url of the copy
+    """
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    database = f"{url.database}_{worker}"
+    admin = create_async_engine(url.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    async with admin.connect() as conn:
+        await conn.execute(text(f'DROP DATABASE IF EXISTS "{database}"'))
+        await conn.execute(text(f'CREATE DATABASE "{database}" TEMPLATE "{url.database}"'))
+    await admin.dispose()
+    return url.set(database=database)
+
+
+async def drop_worker_database(url) -> None:
+    admin = create_async_engine(url.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    async with admin.connect() as conn:
+        await conn.execute(text(f'DROP DATABASE IF EXISTS "{url.database}"'))
+    await admin.dispose()
+
+
+@pytest_asyncio.fixture(scope="session")
+async def engine():
+    url = make_url(TEST_DATABASE_URL)
+    if url.get_backend_name() == "sqlite":
+        test_engine = create_async_engine(url, poolclass=StaticPool)
+
+        @event.listens_for(test_engine.sync_engine, "connect")
+        def connect(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(test_engine.sync_engine, "begin")
+        def begin(conn):
+            conn.exec_driver_sql("BEGIN")
+    else:
+        url = await create_worker_database(url)
+        test_engine = create_async_engine(url)
+    _observe(test_engine.sync_engine)
+    async with test_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield test_engine
+    await test_engine.dispose()
+    if url.get_backend_name() != "sqlite":
+        await drop_worker_database(url)
+
+
+@pytest_asyncio.fixture()
+async def connection(engine):
+    """
+    Binds the application's sessions to a connection whose transaction is rolled back after the test.
+    """
+    kw = dict(AsyncSessionLocal.kw)
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        AsyncSessionLocal.configure(bind=conn, join_transaction_mode="create_savepoint")
+        try:
+            yield conn
+        finally:
+            AsyncSessionLocal.kw = kw
+            await transaction.rollback()
+
+
+@pytest_asyncio.fixture()
+async def session(connection):
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+@pytest_asyncio.fixture()
+async def redis():
+    """
+    Attaches a fresh fakeredis server to the rate limiter and the caches.
+    """
+    client = FakeRedis(server=FakeServer(), decode_responses=True)
+    rate_limiter.counters.clear()
+    rate_limiter.init(client)
+    user_cache.init(client)
+    contact_cache.init(client)
+    yield client
+    await rate_limiter.close()
+    rate_limiter.redis = None
+    rate_limiter.counters.clear()
+    user_cache.init(None)
+    contact_cache.init(None)
+    user_cache.clear()
+    auth_service.token_cache.clear()
+    await client.aclose()
+
+
+@pytest_asyncio.fixture()
+async def client(connection, redis):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as test_client:
+        yield test_client
+
+
+@pytest.fixture()
+def user():
+    return {"username": "deadpool", "email": "deadpool@example.com", "password": "123456789"}
+
+
+@pytest_asyncio.fixture()
+async def confirmed_user(session, user):
+    new_user = User(username=user["username"], email=user["email"], confirmed=True,
+                    password=await auth_service.get_password_hash(user["password"]))
+    session.add(new_user)
+    await session.commit()
+    return new_user
+
+
+@pytest_asyncio.fixture()
+async def token(client, confirmed_user, user):
+    response = await client.post("/api/auth/login", data={"username": user["email"], "password": user["password"]})
+    return response.json()["access_token"]
@@ -0,0 +1,59 @@
+from datetime import date
+
+import pytest
+import pytest_asyncio
+
+from src.database.models import Contact
+from src.repository.contacts import get_birthday_per_week
+
+BIRTHDAYS = {
+    "Dec 20": date(1990, 12, 20),
+    "Dec 29": date(1985, 12, 29),
+    "Dec 30": date(1992, 12, 30),
+    "Jan 3": date(2001, 1, 3),
+    "Jan 10": date(1979, 1, 10),
+    "Feb 27": date(1995, 2, 27),
+    "Feb 28": date(1993, 2, 28),
+    "Feb 29": date(1996, 2, 29),
+    "Mar 1": date(1988, 3, 1),
+    "Mar 2": date(1999, 3, 2),
+    "Mar 3": date(1987, 3, 3),
+}
+
+
+@pytest_asyncio.fixture()
+async def birthdays(session, confirmed_user):
+    for name, birthday in BIRTHDAYS.items():
+        session.add(Contact(first_name=name, last_name="Birthday", email=f"{name.replace(' ', '')}@example.com",
+                            phone_number="5551234567", birthday=birthday, user_id=confirmed_user.id))
+    await session.commit()
+    return confirmed_user
+
+
+async def upcoming(session, user, today: date, days: int) -> list:
+    return [contact.first_name for contact in await get_birthday_per_week(days, user, session, today)]
+
+
+@pytest.mark.parametrize("today, days, expected", [
+    (date(2023, 12, 29), 7, ["Dec 29", "Dec 30", "Jan 3"]),
+    (date(2023, 12, 31), 3, ["Jan 3"]),
+    (date(2023, 2, 27), 2, ["Feb 27", "Feb 28", "Feb 29", "Mar 1"]),
+    (date(2023, 2, 28), 2, ["Feb 28", "Feb 29", "Mar 1", "Mar 2"]),
+    (date(2024, 2, 28), 2, ["Feb 28", "Feb 29", "Mar 1"]),
+    (date(2023, 3, 1), 1, ["Mar 1", "Mar 2"]),
+    (date(2023, 12, 30), 0, ["Dec 30"]),
+    (date(2023, 2, 28), 0, ["Feb 28"]),
+])
+async def test_birthday_window(session, birthdays, today, days, expected):
+    assert await upcoming(session, birthdays, today, days) == expected
+
+
+async def test_birthday_window_of_a_year_matches_everyone(session, birthdays):
+    names = await upcoming(session, birthdays, date(2023, 12, 29), 365)
+    assert names[:3] == ["Dec 29", "Dec 30", "Jan 3"]
+    assert names[-1] == "Dec 20"
+    assert sorted(names) == sorted(BIRTHDAYS)
+
+
+async def test_birthday_window_negative_days(session, birthdays):
+    assert await upcoming(session, birthdays, date(2023, 12, 29), -1) == []
@@ -6,17 +6,18 @@ import unittest
 from datetime import date
 from unittest.mock import MagicMock
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import User, Contact
 from src.schemas import ContactBase, ContactResponse
-from src.repository.contacts import get_contacts, get_contact, create_contact, update_contact, remove_contact, search_contacts, get_birthday_per_week
+from src.repository.contacts import get_contacts, get_contact, create_contact, create_contacts, update_contact, remove_contact, search_contacts, get_birthday_per_week
 
 
 
 class TestAsync(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
-        self.session = MagicMock(spec=Session)
+        self.session = MagicMock(spec=AsyncSession)
+        self.session.execute.return_value = MagicMock()
         self.user = User(id=1)
         self.body = ContactBase(
             id=1,
@@ -31,21 +32,21 @@ class TestAsync(unittest.IsolatedAsyncioTestCase):
 
     async def test_get_contacts(self):
         expected_contacts = [Contact(), Contact(), Contact(), Contact()]
-        self.session.query().filter().offset().limit().all.return_value = expected_contacts
+        self.session.execute.return_value.scalars.return_value.all.return_value = expected_contacts
         result = await get_contacts(skip=0, limit=3, db=self.session, user=self.user)
         self.assertEqual(result, expected_contacts)
 
 
     async def test_get_contact(self):
         expected_contacts = Contact()
-        self.session.query().filter().first.return_value = expected_contacts
+        self.session.execute.return_value.scalar_one_or_none.return_value = expected_contacts
         result = await get_contact(self.user.id, self.user, self.session)
         self.assertEqual(result, expected_contacts)
 
 
     async def test_get_contact_if_not_found(self):
         expected_contacts = None
-        self.session.query().filter().first.return_value = expected_contacts
+        self.session.execute.return_value.scalar_one_or_none.return_value = expected_contacts
         result = await get_contact(self.user.id, self.user, self.session)
         self.assertEqual(result, expected_contacts)
 
@@ -60,6 +61,16 @@ class TestAsync(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result.additional_data, self.body.additional_data)
 
 
+    async def test_create_contacts(self):
+        result = await create_contacts([self.body, self.body], self.user, self.session)
+        self.assertEqual(result, 2)
+        self.session.execute.assert_awaited_once()
+        rows = self.session.execute.call_args.args[1]
+        self.assertEqual(rows[0]["users_id"], self.user.id)
+        self.assertEqual(rows[0]["birthday_md"], 1005)
+        self.session.commit.assert_awaited_once()
+
+
     async def test_update_contact(self):
         body = ContactResponse(
             id=1,
@@ -70,27 +81,49 @@ class TestAsync(unittest.IsolatedAsyncioTestCase):
             birthday = date(year=1991, month=8, day=24),
             additional_data = "I'am changed previous contact with id=2",
         )
-        self.session.query().filter().first.return_value = self.body
+        self.session.execute.return_value.scalar_one_or_none.return_value = Contact()
         result = await update_contact(body.id, body, self.user, self.session)
-        self.assertEqual(result.first_name, self.body.first_name)
-        self.assertEqual(result.last_name, self.body.last_name)
-        self.assertEqual(result.email, self.body.email)
-        self.assertEqual(result.phone_number, self.body.phone_number)
-        self.assertEqual(result.birthday, self.body.birthday)
-        self.assertEqual(result.additional_data, self.body.additional_data)
+        self.assertEqual(result.first_name, body.first_name)
+        self.assertEqual(result.last_name, body.last_name)
+        self.assertEqual(result.email, body.email)
+        self.assertEqual(result.phone_number, body.phone_number)
+        self.assertEqual(result.birthday, body.birthday)
+        self.assertEqual(result.additional_data, body.additional_data)
 
 
     async def test_remove_contact(self):
         expected_contacts = Contact()
-        self.session.query().filter().first.return_value = expected_contacts
+        self.session.execute.return_value.scalar_one_or_none.return_value = expected_contacts
         result = await remove_contact(self.user.id, self.user, self.session)
         self.assertEqual(result, expected_contacts)
 
     async def test_search_contacts(self):
         expected_contacts = []
-        self.session.query().filter().all.return_value = expected_contacts
+        self.session.execute.return_value.scalars.return_value.all.return_value = expected_contacts
         result = await search_contacts(query="test@test.com", user=self.user, db=self.session)
         self.assertEqual(result, expected_contacts)
+        self.session.execute.assert_awaited_once()
+
+
+    async def test_get_birthday_per_week(self):
+        expected_contacts = [Contact()]
+        self.session.execute.return_value.scalars.return_value.all.return_value = expected_contacts
+        result = await get_birthday_per_week(days=7, user=self.user, db=self.session)
+        self.assertEqual(result, expected_contacts)
+        self.session.execute.assert_awaited_once()
+
+
+    async def test_get_birthday_per_week_negative_days(self):
+        result = await get_birthday_per_week(days=-1, user=self.user, db=self.session)
+        self.assertEqual(result, [])
+        self.session.execute.assert_not_awaited()
+
+
+    def test_birthday_md_follows_birthday(self):
+        contact = Contact(birthday=date(year=2000, month=2, day=29))
+        self.assertEqual(contact.birthday_md, 229)
+        contact.birthday = date(year=1999, month=10, day=5)
+        self.assertEqual(contact.birthday_md, 1005)
 
 
 if __name__ == '__main__':
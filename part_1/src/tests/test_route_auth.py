@@ -1,13 +1,23 @@
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock
 
-from src.database.models import User
+import pytest_asyncio
+from sqlalchemy import select
 
+from src.database.models import OutboxEmail, User
 
 
-def test_signup(client, user, monkeypatch):
-    mock_send_email = MagicMock()
+@pytest_asyncio.fixture()
+async def registered_user(client, user, monkeypatch):
+    monkeypatch.setattr("src.routes.auth.send_email", AsyncMock())
+    response = await client.post("/api/auth/signup", json=user)
+    assert response.status_code == 201, response.text
+    return response.json()["user"]
+
+
+async def test_signup(client, user, monkeypatch):
+    mock_send_email = AsyncMock()
     monkeypatch.setattr("src.routes.auth.send_email", mock_send_email)
-    response = client.post(
+    response = await client.post(
         "/api/auth/signup",
         json=user,
     )
@@ -15,10 +25,18 @@ def test_signup(client, user, monkeypatch):
     data = response.json()
     assert data["user"]["email"] == user.get("email")
     assert "id" in data["user"]
+    mock_send_email.assert_awaited_once()
 
 
-def test_repeat_signup(client, user):
-    response = client.post(
+async def test_signup_queues_the_confirmation_email(client, user, session):
+    response = await client.post("/api/auth/signup", json=user)
+    assert response.status_code == 201, response.text
+    emails = (await session.execute(select(OutboxEmail))).scalars().all()
+    assert [(email.recipient, email.template) for email in emails] == [(user["email"], "confirmation")]
+
+
+async def test_repeat_signup(client, user, registered_user):
+    response = await client.post(
         "/api/auth/signup",
         json=user,
     )
@@ -27,8 +45,8 @@ def test_repeat_signup(client, user):
     assert data["detail"] == "Account already exists"
 
 
-def test_login_user_not_confirmed(client, user):
-    response = client.post(
+async def test_login_user_not_confirmed(client, user, registered_user):
+    response = await client.post(
         "/api/auth/login",
         data={"username": user.get('email'), "password": user.get('password')},
     )
@@ -37,11 +55,11 @@ def test_login_user_not_confirmed(client, user):
     assert data["detail"] == "Email not confirmed"
 
 
-def test_login_user(client, session, user):
-    current_user: User = session.query(User).filter(User.email == user.get('email')).first()
+async def test_login_user(client, session, user, registered_user):
+    current_user: User = (await session.execute(select(User).filter(User.email == user.get('email')))).scalar_one()
     current_user.confirmed = True
-    session.commit()
-    response = client.post(
+    await session.commit()
+    response = await client.post(
         "/api/auth/login",
         data={"username": user.get('email'), "password": user.get('password')},
     )
@@ -50,8 +68,8 @@ def test_login_user(client, session, user):
     assert data["token_type"] == "bearer"
 
 
-def test_login_wrong_password(client, user):
-    response = client.post(
+async def test_login_wrong_password(client, user, confirmed_user):
+    response = await client.post(
         "/api/auth/login",
         data={"username": user.get('email'), "password": 'password'},
     )
@@ -60,8 +78,8 @@ def test_login_wrong_password(client, user):
     assert data["detail"] == "Invalid password"
 
 
-def test_login_wrong_email(client, user):
-    response = client.post(
+async def test_login_wrong_email(client, user, confirmed_user):
+    response = await client.post(
         "/api/auth/login",
         data={"username": 'email', "password": user.get('password')},
     )
@@ -70,8 +88,21 @@ def test_login_wrong_email(client, user):
     assert data["detail"] == "Invalid email"
 
 
-def test_request_email(client, user, monkeypatch):
-    mock_send_email = MagicMock()
+async def test_request_email(client, user, registered_user, monkeypatch):
+    mock_send_email = AsyncMock()
     monkeypatch.setattr("src.routes.auth.send_email", mock_send_email)
-    response = client.post("/api/auth/request_email", json=user)
-    assert response.status_code == 200, response.text
\ No newline at end of file
+    response = await client.post("/api/auth/request_email", json=user)
+    assert response.status_code == 200, response.text
+    mock_send_email.assert_awaited_once()
+
+
+async def test_refresh_token_rotates(client, user, confirmed_user):
+    response = await client.post(
+        "/api/auth/login",
+        data={"username": user.get('email'), "password": user.get('password')},
+    )
+    refresh_token = response.json()["refresh_token"]
+    response = await client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {refresh_token}"})
+    assert response.status_code == 200, response.text
+    response = await client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {refresh_token}"})
+    assert response.status_code == 401, response.text
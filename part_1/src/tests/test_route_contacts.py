@@ -1,128 +1,158 @@
-from unittest.mock import MagicMock, patch
+from datetime import date, timedelta
 
 import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
 
-from src.database.models import User
-from src.services.auth import auth_service
+from main import app
+from src.services.query_profiler import QUERY_COUNT_HEADER, QueryProfilerMiddleware, assert_max_queries
 
 
 @pytest.fixture()
-def token(client, user, session, monkeypatch):
-    mock_send_email = MagicMock()
-    monkeypatch.setattr("src.routes.auth.send_email", mock_send_email)
-    client.post("/api/auth/signup", json=user)
-    current_user: User = session.query(User).filter(User.email == user.get('email')).first()
-    current_user.confirmed = True
-    session.commit()
-    response = client.post(
-        "/api/auth/login",
-        data={"username": user.get('email'), "password": user.get('password')},
-    )
+def contact():
+    return {
+        "first_name": "Wade",
+        "last_name": "Wilson",
+        "email": "wade@example.com",
+        "phone_number": "5551234567",
+        "birthday": "1991-02-12",
+        "additional_data": "Merc with a mouth",
+    }
+
+
+@pytest.fixture()
+def headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest_asyncio.fixture()
+async def created_contact(client, headers, contact):
+    response = await client.post("/api/contacts/", json=contact, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+async def test_create_new_contact(client, headers, contact):
+    response = await client.post("/api/contacts/", json=contact, headers=headers)
+    assert response.status_code == 201, response.text
+    data = response.json()
+    assert data["first_name"] == "Wade"
+    assert "id" in data
+
+
+async def test_create_contact_unauthorized(client, contact):
+    response = await client.post("/api/contacts/", json=contact)
+    assert response.status_code == 401, response.text
+
+
+async def test_get_contact(client, headers, created_contact):
+    response = await client.get(f"/api/contacts/{created_contact['id']}", headers=headers)
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["email"] == "wade@example.com"
+    assert data["id"] == created_contact["id"]
+
+
+async def test_get_contact_not_found(client, headers):
+    response = await client.get("/api/contacts/999", headers=headers)
+    assert response.status_code == 404, response.text
+    data = response.json()
+    assert data["detail"] == "Contact not found"
+
+
+async def test_get_contacts(client, headers, created_contact):
+    response = await client.get("/api/contacts/all", headers=headers)
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert isinstance(data, list)
+    assert [item["id"] for item in data] == [created_contact["id"]]
+
+
+async def test_get_contacts_is_cached(client, headers, created_contact):
+    response = await client.get("/api/contacts/all", headers=headers)
+    with assert_max_queries(0):
+        cached = await client.get("/api/contacts/all", headers=headers)
+        not_modified = await client.get("/api/contacts/all",
+                                        headers={**headers, "If-None-Match": response.headers["ETag"]})
+    assert cached.json() == response.json()
+    assert not_modified.status_code == 304
+
+
+async def test_update_contact(client, headers, contact, created_contact):
+    response = await client.put(f"/api/contacts/{created_contact['id']}", json={**contact, "first_name": "Deadpool"},
+                                headers=headers)
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["first_name"] == "Deadpool"
+    response = await client.get(f"/api/contacts/{created_contact['id']}", headers=headers)
+    assert response.json()["first_name"] == "Deadpool"
+
+
+async def test_update_contact_not_found(client, headers, contact):
+    response = await client.put("/api/contacts/999", json=contact, headers=headers)
+    assert response.status_code == 404, response.text
     data = response.json()
-    return data["access_token"]
-
-
-
-def test_create_new_contact(client, token):
-    with patch.object(auth_service, 'r') as r_mock:
-        r_mock.get.return_value = None
-        response = client.post(
-            "/api/tags",
-            json={"name": "test_tag"},
-            headers={"Authorization": f"Bearer {token}"}
-        )
-        assert response.status_code == 201, response.text
-        data = response.json()
-        assert data["name"] == "test_tag"
-        assert "id" in data
-
-
-def test_get_tag(client, token):
-    with patch.object(auth_service, 'r') as r_mock:
-        r_mock.get.return_value = None
-        response = client.get(
-            "/api/tags/1",
-            headers={"Authorization": f"Bearer {token}"}
-        )
-        assert response.status_code == 200, response.text
-        data = response.json()
-        assert data["name"] == "test_tag"
-        assert "id" in data
-
-
-def test_get_tag_not_found(client, token):
-    with patch.object(auth_service, 'r') as r_mock:
-        r_mock.get.return_value = None
-        response = client.get(
-            "/api/tags/2",
-             headers={"Authorization": f"Bearer {token}"}
-        )
-        assert response.status_code == 404, response.text
-        data = response.json()
-        assert data["detail"] == "Tag not found"
-
-
-def test_get_tags(client, token):
-   with patch.object(auth_service, 'r') as r_mock:
-        r_mock.get.return_value = None
-        response = client.get(
-          "/api/tags",
-        headers={"Authorization": f"Bearer {token}"}
-      )
-        assert response.status_code == 200, response.text
-        data = response.json()
-        assert isinstance(data, list)
-        assert data[0]["name"] == "test_tag"
-        assert "id" in data[0]
-
-
-def test_update_tag(client, token):
-    with patch.object(auth_service, 'r') as r_mock:
-        r_mock.get.return_value = None
-        response = client.put(
-            "/api/tags/1",
-            json={"name": "new_test_tag"},
-            headers={"Authorization": f"Bearer {token}"}
-        )
-        assert response.status_code == 200, response.text
-        data = response.json()
-        assert data["name"] == "new_test_tag"
-        assert "id" in data
-
-
-def test_update_tag_not_found(client, token):
-   with patch.object(auth_service, 'r') as r_mock:
-        r_mock.get.return_value = None
-        response = client.put(
-            "/api/tags/2",
-            json={"name": "new_test_tag"},
-            headers={"Authorization": f"Bearer {token}"}
-        )
-        assert response.status_code == 404, response.text
-        data = response.json()
-        assert data["detail"] == "Tag not found"
-
-
-def test_delete_tag(client, token):
-    with patch.object(auth_service, 'r') as r_mock:
-        r_mock.get.return_value = None
-        response = client.delete(
-            "/api/tags/1",
-            headers={"Authorization": f"Bearer {token}"}
-        )
-        assert response.status_code == 200, response.text
-        data = response.json()
-        assert data["name"] == "new_test_tag"
-        assert "id" in data
-
-
-def test_repeat_delete_tag(client, token):
-    with patch.object(auth_service, 'r') as r_mock:
-        r_mock.get.return_value = None
-        response = client.delete(
-            "/api/tags/1",
-            headers={"Authorization": f"Bearer {token}"}
-        )
-        assert response.status_code == 404, response.text
-        data = response.json()
-        assert data["detail"] == "Tag not found"
\ No newline at end of file
+    assert data["detail"] == "Contact not found"
+
+
+async def test_delete_contact(client, headers, created_contact):
+    response = await client.delete(f"/api/contacts/remove/{created_contact['id']}", headers=headers)
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["id"] == created_contact["id"]
+
+
+async def test_repeat_delete_contact(client, headers, created_contact):
+    await client.delete(f"/api/contacts/remove/{created_contact['id']}", headers=headers)
+    response = await client.delete(f"/api/contacts/remove/{created_contact['id']}", headers=headers)
+    assert response.status_code == 404, response.text
+    data = response.json()
+    assert data["detail"] == "Contact not found"
+
+
+async def test_find_contacts(client, headers, created_contact):
+    response = await client.get("/api/contacts/find/wils", headers=headers)
+    assert response.status_code == 200, response.text
+    assert [item["id"] for item in response.json()] == [created_contact["id"]]
+    response = await client.get("/api/contacts/find/logan", headers=headers)
+    assert response.json() == []
+
+
+async def test_birthday_contacts(client, headers, contact):
+    soon = date.today() + timedelta(days=3)
+    later = date.today() + timedelta(days=30)
+    for first_name, birthday in (("Soon", soon), ("Later", later)):
+        body = {**contact, "first_name": first_name, "birthday": birthday.replace(year=birthday.year - 28).isoformat()}
+        await client.post("/api/contacts/", json=body, headers=headers)
+    response = await client.get("/api/contacts/birthday/7", headers=headers)
+    assert response.status_code == 200, response.text
+    assert [item["first_name"] for item in response.json()] == ["Soon"]
+
+
+async def test_contact_query_budget(client, headers, created_contact):
+    with assert_max_queries(1):
+        response = await client.get(f"/api/contacts/{created_contact['id']}", headers=headers)
+    assert response.status_code == 200, response.text
+
+
+async def test_list_contacts_query_budget(client, headers, created_contact):
+    with assert_max_queries(1) as profile:
+        response = await client.get("/api/contacts/all", headers=headers)
+    assert response.status_code == 200, response.text
+    assert profile.count == 1
+    assert [statement.split()[0] for statement in profile.statements] == ["SELECT"]
+
+
+async def test_query_count_header(client, headers, created_contact):
+    async with AsyncClient(transport=ASGITransport(app=QueryProfilerMiddleware(app)),
+                           base_url="http://test") as profiled:
+        response = await profiled.get(f"/api/contacts/{created_contact['id']}", headers=headers)
+        cached = await profiled.get(f"/api/contacts/{created_contact['id']}", headers=headers)
+    assert response.headers[QUERY_COUNT_HEADER] == "1"
+    assert cached.headers[QUERY_COUNT_HEADER] == "0"
+
+
+async def test_rate_limit(client, headers):
+    statuses = [(await client.get("/api/contacts/999", headers=headers)).status_code for _ in range(11)]
+    assert statuses[:10] == [404] * 10
+    assert statuses[10] == 429
@@ -0,0 +1,186 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import io
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+from fastapi import HTTPException, UploadFile
+from fakeredis import aioredis
+from PIL import Image
+from starlette.datastructures import Headers
+
+from src.database.models import User
+from src.services.avatar_jobs import AvatarJobQueue, avatar_key
+from src.services.storage import LocalStorage, StorageBackend
+
+
+def make_png(width: int = 300, height: int = 200) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+PNG = make_png()
+
+
+def make_upload(content: bytes, content_type: str = "image/png") -> UploadFile:
+    return UploadFile(io.BytesIO(content), filename="avatar.png", headers=Headers({"content-type": content_type}))
+
+
+class TestAvatarJobs(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.user = User(id=1, username="deadpool", email="deadpool@example.com")
+        self.media = tempfile.TemporaryDirectory()
+        self.storage = LocalStorage(root=self.media.name, base_url="/media")
+        self.jobs = AvatarJobQueue(workers=1, max_bytes=64 * 1024)
+
+
+    def tearDown(self):
+        self.media.cleanup()
+
+
+    async def test_submit_queues_job(self):
+        job = await self.jobs.submit(self.user, make_upload(PNG))
+        self.assertEqual(job.status, "queued")
+        self.assertEqual(Path(job.path).read_bytes(), PNG)
+        self.assertEqual(self.jobs.queue.qsize(), 1)
+        os.unlink(job.path)
+
+
+    async def test_submit_rejects_large_upload(self):
+        with self.assertRaises(HTTPException) as ctx:
+            await self.jobs.submit(self.user, make_upload(PNG + b"x" * 64 * 1024))
+        self.assertEqual(ctx.exception.status_code, 413)
+
+
+    async def test_submit_rejects_non_image(self):
+        with self.assertRaises(HTTPException) as ctx:
+            await self.jobs.submit(self.user, make_upload(b"text", "text/plain"))
+        self.assertEqual(ctx.exception.status_code, 415)
+
+
+    async def test_submit_rejects_unreadable_image(self):
+        with self.assertRaises(HTTPException) as ctx:
+            await self.jobs.submit(self.user, make_upload(b"not an image"))
+        self.assertEqual(ctx.exception.status_code, 415)
+
+
+    async def test_submit_rejects_too_many_pixels(self):
+        with patch("src.services.images.settings.avatar_max_pixels", 1000), \
+                self.assertRaises(HTTPException) as ctx:
+            await self.jobs.submit(self.user, make_upload(PNG))
+        self.assertEqual(ctx.exception.status_code, 413)
+
+
+    async def test_process_stores_and_updates_user(self):
+        job = await self.jobs.submit(self.user, make_upload(PNG))
+        with patch("src.services.images.get_storage", return_value=self.storage), \
+                patch("src.services.avatar_jobs.AsyncSessionLocal"), \
+                patch("src.repository.users.update_avatar", new_callable=AsyncMock) as update_avatar:
+            await self.jobs.process(job)
+        self.assertEqual(job.status, "done")
+        self.assertEqual(job.avatar, f"/media/avatars/1/250.webp?v={job.job_id}")
+        self.assertEqual(set(job.variants), {"64", "128", "250"})
+        with Image.open(Path(self.media.name) / "avatars" / "1" / "64.webp") as im:
+            self.assertEqual(im.size, (64, 64))
+        self.assertEqual(update_avatar.await_args.args[:2], (self.user.email, job.avatar))
+        self.assertFalse(os.path.exists(job.path))
+
+
+    async def test_new_upload_replaces_stored_variants(self):
+        with patch("src.services.images.get_storage", return_value=self.storage), \
+                patch("src.services.avatar_jobs.AsyncSessionLocal"), \
+                patch("src.repository.users.update_avatar", new_callable=AsyncMock):
+            first = await self.jobs.submit(self.user, make_upload(PNG))
+            await self.jobs.process(first)
+            second = await self.jobs.submit(self.user, make_upload(PNG))
+            await self.jobs.process(second)
+        stored = sorted(path.name for path in Path(self.media.name).rglob("*") if path.is_file())
+        self.assertEqual(stored, ["128.webp", "250.webp", "64.webp"])
+        self.assertNotEqual(first.avatar, second.avatar)
+
+
+    async def test_process_records_failure(self):
+        job = await self.jobs.submit(self.user, make_upload(PNG))
+        storage = AsyncMock()
+        storage.save.side_effect = RuntimeError("upload failed")
+        with patch("src.services.images.get_storage", return_value=storage):
+            await self.jobs.process(job)
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.detail, "upload failed")
+        self.assertFalse(os.path.exists(job.path))
+
+
+    async def test_process_tolerates_missing_upload(self):
+        job = await self.jobs.submit(self.user, make_upload(PNG))
+        os.unlink(job.path)
+        await self.jobs.process(job)
+        self.assertEqual(job.status, "failed")
+
+
+    async def test_worker_survives_failed_job(self):
+        first = await self.jobs.submit(self.user, make_upload(PNG))
+        second = await self.jobs.submit(self.user, make_upload(PNG))
+        with patch.object(self.jobs, "process", new_callable=AsyncMock, side_effect=[RuntimeError("boom"), None]):
+            self.jobs.init(None)
+            await self.jobs.queue.put(first)
+            await self.jobs.queue.put(second)
+            await asyncio.wait_for(self.jobs.queue.join(), 5)
+            self.assertEqual(self.jobs.process.await_count, 2)
+        await self.jobs.close()
+        self.assertEqual(first.status, "failed")
+        self.assertEqual(first.detail, "boom")
+        os.unlink(first.path)
+        os.unlink(second.path)
+
+
+    async def test_status_shared_through_redis(self):
+        redis = aioredis.FakeRedis(decode_responses=True)
+        self.jobs.redis = redis
+        job = await self.jobs.submit(self.user, make_upload(PNG))
+        job.variants = {"64": f"/media/avatars/1/64.webp?v={job.job_id}"}
+        await self.jobs._save(job)
+        other = AvatarJobQueue()
+        other.redis = redis
+        shared = await other.get(job.job_id)
+        self.assertEqual(shared.status, "queued")
+        self.assertEqual(shared.email, self.user.email)
+        self.assertEqual(shared.user_id, self.user.id)
+        self.assertIsNone(shared.avatar)
+        self.assertEqual(shared.variants, job.variants)
+        os.unlink(job.path)
+
+
+
+    async def test_key_ignores_username(self):
+        self.user.username = "../../../tmp"
+        job = await self.jobs.submit(self.user, make_upload(PNG))
+        self.assertEqual(avatar_key(job), "avatars/1")
+        os.unlink(job.path)
+
+
+    async def test_local_storage_rejects_keys_outside_root(self):
+        source = Path(self.media.name) / "source"
+        source.write_bytes(PNG)
+        with self.assertRaises(ValueError):
+            await self.storage.save("../outside/64", source, "image/png")
+        self.assertFalse((Path(self.media.name).parent / "outside").exists())
+
+
+
+    def test_incomplete_storage_cannot_be_created(self):
+        class NoSave(StorageBackend):
+            pass
+
+        with self.assertRaises(TypeError):
+            NoSave()
+
+
+if __name__ == '__main__':
+    unittest.main()
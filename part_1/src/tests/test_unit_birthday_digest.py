@@ -0,0 +1,88 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.database.models import Base, BirthdayDigestWatermark, Contact, OutboxEmail, User
+from src.services.birthday_digest import BirthdayDigest
+
+DAY = date(2024, 12, 29)
+
+
+def contact(user: User, first_name: str, birthday: date) -> Contact:
+    return Contact(first_name=first_name, last_name="Lee", email=f"{first_name}@example.com",
+                   phone_number="5551234567", birthday=birthday, user=user)
+
+
+class TestBirthdayDigest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        users = [User(username=f"user{i}", email=f"user{i}@example.com", password="x", confirmed=i != 2)
+                 for i in range(4)]
+        async with self.sessions() as db:
+            db.add_all(users)
+            db.add_all([
+                contact(users[0], "Ann", date(1990, 1, 2)),
+                contact(users[0], "Bob", date(1985, 12, 30)),
+                contact(users[0], "Cid", date(1985, 6, 1)),
+                contact(users[1], "Dan", date(2000, 12, 31)),
+                contact(users[2], "Eve", date(2000, 12, 31)),
+                contact(users[3], "Fay", date(2000, 3, 3)),
+            ])
+            await db.commit()
+        self.patch = patch("src.services.birthday_digest.AsyncSessionLocal", self.sessions)
+        self.patch.start()
+        self.digest = BirthdayDigest(days=7, batch_size=1)
+
+
+    async def asyncTearDown(self):
+        self.patch.stop()
+        await self.engine.dispose()
+
+
+    async def outbox(self) -> list[OutboxEmail]:
+        async with self.sessions() as db:
+            return (await db.execute(select(OutboxEmail).order_by(OutboxEmail.id))).scalars().all()
+
+
+    async def test_queues_one_digest_per_user(self):
+        self.assertEqual(await self.digest.run(DAY), 2)
+        emails = await self.outbox()
+        self.assertEqual([email.recipient for email in emails], ["user0@example.com", "user1@example.com"])
+        self.assertEqual(emails[0].template, "birthday_digest")
+        self.assertEqual([c["first_name"] for c in emails[0].context["contacts"]], ["Bob", "Ann"])
+        self.assertEqual(emails[0].context["contacts"][1]["birthday"], "1990-01-02")
+
+
+    async def test_never_sends_twice_a_day(self):
+        await self.digest.run(DAY)
+        self.assertEqual(await self.digest.run(DAY), 0)
+        self.assertEqual(len(await self.outbox()), 2)
+        async with self.sessions() as db:
+            sent_on = (await db.execute(select(BirthdayDigestWatermark.sent_on))).scalars().all()
+        self.assertEqual(sent_on, [DAY, DAY])
+
+
+    async def test_next_day_sends_again(self):
+        await self.digest.run(DAY)
+        self.assertEqual(await self.digest.run(date(2024, 12, 30)), 2)
+
+
+    async def test_skips_days_already_sent(self):
+        await self.digest.run(date(2024, 12, 30))
+        self.assertEqual(await self.digest.run(DAY), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from fastapi import HTTPException
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import User
+from src.services.bulk_import import import_contacts, iter_rows
+
+
+class FakeRequest:
+
+    def __init__(self, content_type: str, chunks: list):
+        self.headers = {"content-type": content_type}
+        self.chunks = chunks
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def body(self):
+        return b"".join(self.chunks)
+
+
+async def collect(rows):
+    return [row async for row in rows]
+
+
+CONTACT = {"first_name": "Dow", "last_name": "John", "email": "example@test.com", "phone_number": "5551234567",
+           "birthday": "1999-10-05"}
+
+
+class TestBulkImport(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.session = MagicMock(spec=AsyncSession)
+        self.user = User(id=1)
+
+
+    async def test_csv_rows_are_streamed(self):
+        request = FakeRequest("text/csv; charset=utf-8", [
+            b"first_name,last_name,email,phone_number,birthday\nDow,\"Jo",
+            b"hn, \"\"Jr\"\"\",example@test.com,5551234567,1999-10-05\nonly,two\n",
+        ])
+        rows = await collect(iter_rows(request))
+        self.assertEqual(rows[0], (1, {**CONTACT, "last_name": 'John, "Jr"'}, None))
+        self.assertEqual(rows[1][0], 2)
+        self.assertIsNotNone(rows[1][2])
+
+
+    async def test_ndjson_rows(self):
+        request = FakeRequest("application/x-ndjson", [b'{"a": 1}\n\n{bad', b'\n'])
+        rows = await collect(iter_rows(request))
+        self.assertEqual(rows[0], (1, {"a": 1}, None))
+        self.assertEqual(rows[1][0], 2)
+        self.assertIsNotNone(rows[1][2])
+
+
+    async def test_only_newline_ends_a_row(self):
+        text = "line\u2028separator\x85\x0b\x0c\x1c"
+        request = FakeRequest("application/x-ndjson", [json.dumps({"a": text}, ensure_ascii=False).encode()[:9],
+                                                       json.dumps({"a": text}, ensure_ascii=False).encode()[9:] + b"\r",
+                                                       b"\n" + json.dumps({"b": 2}).encode()])
+        rows = await collect(iter_rows(request))
+        self.assertEqual(rows, [(1, {"a": text}, None), (2, {"b": 2}, None)])
+        request = FakeRequest("text/csv", ["first_name,last_name,email,phone_number,birthday\r\n"
+                                           f"Dow,{text},example@test.com,5551234567,1999-10-05\r\n".encode()])
+        rows = await collect(iter_rows(request))
+        self.assertEqual(rows, [(1, {**CONTACT, "last_name": text}, None)])
+
+
+    async def test_unsupported_content_type(self):
+        with self.assertRaises(HTTPException) as err:
+            iter_rows(FakeRequest("text/plain", []))
+        self.assertEqual(err.exception.status_code, 415)
+
+
+    async def test_import_reports_invalid_rows(self):
+        request = FakeRequest("application/json", [json.dumps([CONTACT, {"first_name": "Dow"}, 5]).encode()])
+        with patch("src.repository.contacts.create_contacts", return_value=1) as create_contacts:
+            report = await import_contacts(iter_rows(request), self.user, self.session)
+        create_contacts.assert_awaited_once()
+        self.assertEqual(report.created, 1)
+        self.assertEqual(report.failed, 2)
+        self.assertEqual([error.row for error in report.errors], [2, 3])
+
+
+    async def test_import_inserts_in_batches(self):
+        async def rows():
+            for number in range(1, 6):
+                yield number, CONTACT, None
+
+        with patch("src.repository.contacts.create_contacts", side_effect=lambda bodies, user, db: len(bodies)) as create_contacts:
+            report = await import_contacts(rows(), self.user, self.session, batch_size=2)
+        self.assertEqual(create_contacts.await_count, 3)
+        self.assertEqual(report.created, 5)
+
+
+    async def test_failed_batch_is_reported(self):
+        async def rows():
+            yield 1, CONTACT, None
+
+        with patch("src.repository.contacts.create_contacts", side_effect=OperationalError("INSERT", {}, Exception())):
+            report = await import_contacts(rows(), self.user, self.session)
+        self.session.rollback.assert_awaited_once()
+        self.assertEqual(report.failed, 1)
+        self.assertEqual(report.errors[0].row, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import socket
+import unittest
+from email import message_from_bytes
+from unittest.mock import patch
+
+from aiosmtpd.controller import Controller
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.conf.config import settings
+from src.database.models import Base, OutboxEmail
+from src.repository.outbox import enqueue_email
+from src.services.email import EmailOutbox, SMTPPool
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Handler:
+
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+class TestEmailOutbox(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.handler = Handler()
+        self.port = free_port()
+        self.controller = Controller(self.handler, hostname="127.0.0.1", port=self.port)
+        self.controller.start()
+        self.patches = [
+            patch("src.services.email.AsyncSessionLocal", self.sessions),
+            patch.multiple(settings, mail_server="127.0.0.1", mail_port=self.port, mail_ssl_tls=False,
+                           mail_use_credentials=False),
+        ]
+        for p in self.patches:
+            p.start()
+        self.outbox = EmailOutbox(pool=SMTPPool(size=2), batch_size=10, max_attempts=2, retry_base=60)
+
+
+    async def asyncTearDown(self):
+        await self.outbox.close()
+        patch.stopall()
+        self.controller.stop()
+        await self.engine.dispose()
+
+
+    async def enqueue(self, count: int) -> None:
+        async with self.sessions() as db:
+            for i in range(count):
+                await enqueue_email(f"user{i}@example.com", "Confirm your email", "confirmation",
+                                    {"host": "http://localhost/", "username": f"user{i}", "token": "token"}, db)
+
+
+    async def statuses(self) -> list[tuple[str, int]]:
+        async with self.sessions() as db:
+            rows = await db.execute(select(OutboxEmail.status, OutboxEmail.attempts).order_by(OutboxEmail.id))
+            return [tuple(row) for row in rows]
+
+
+    async def test_batch_reuses_connections(self):
+        await self.enqueue(6)
+        self.assertEqual(await self.outbox.deliver(), 6)
+        self.assertEqual(len(self.handler.messages), 6)
+        self.assertLessEqual(self.handler.connections, 2)
+        self.assertEqual(await self.statuses(), [("sent", 1)] * 6)
+        message = message_from_bytes(self.handler.messages[0].content)
+        self.assertEqual(message.get_content_type(), "multipart/alternative")
+        parts = {part.get_content_type(): part.get_payload(decode=True).decode() for part in message.get_payload()}
+        self.assertEqual(set(parts), {"text/plain", "text/html"})
+        self.assertIn("api/auth/confirmed_email/token", parts["text/plain"])
+
+
+    async def test_sent_messages_are_not_claimed_again(self):
+        await self.enqueue(1)
+        await self.outbox.deliver()
+        self.assertEqual(await self.outbox.deliver(), 0)
+        self.assertEqual(len(self.handler.messages), 1)
+
+
+    async def test_failure_is_retried_later_then_given_up(self):
+        await self.enqueue(1)
+        patch.object(settings, "mail_port", free_port()).start()
+        self.assertEqual(await self.outbox.deliver(), 1)
+        self.assertEqual(await self.statuses(), [("pending", 1)])
+        self.assertEqual(await self.outbox.deliver(), 0)
+        async with self.sessions() as db:
+            email = (await db.execute(select(OutboxEmail))).scalar_one()
+            email.next_attempt_at = email.created_at
+            await db.commit()
+        await self.outbox.deliver()
+        self.assertEqual(await self.statuses(), [("failed", 2)])
+
+
+    def test_backoff(self):
+        self.assertEqual(self.outbox.backoff(1), 60)
+        self.assertEqual(self.outbox.backoff(3), 240)
+        self.assertEqual(self.outbox.backoff(20), settings.mail_retry_max)
+
+
+if __name__ == '__main__':
+    unittest.main()
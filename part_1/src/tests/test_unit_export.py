@@ -0,0 +1,52 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from src.database.models import User
+from src.services.export import EXPORT_FIELDS, export_contacts
+
+
+def make_row(contact_id: int) -> tuple:
+    return contact_id, "Dow", "John, Jr", "example@test.com", "5551234567", date(1999, 10, 5), None
+
+
+async def stream(user, db, batch_size):
+    yield [make_row(1), make_row(2)]
+    yield [make_row(3)]
+
+
+class TestExport(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.user = User(id=1)
+
+
+    async def export(self, export_format: str) -> list:
+        with patch("src.services.export.AsyncSessionLocal"), \
+                patch("src.repository.contacts.stream_contacts", stream):
+            return [chunk async for chunk in export_contacts(self.user, export_format)]
+
+
+    async def test_ndjson_chunk_per_batch(self):
+        chunks = await self.export("ndjson")
+        self.assertEqual(len(chunks), 2)
+        first = json.loads(chunks[0].splitlines()[0])
+        self.assertEqual(first["id"], 1)
+        self.assertEqual(first["birthday"], "1999-10-05")
+
+
+    async def test_csv_starts_with_header(self):
+        chunks = await self.export("csv")
+        lines = "".join(chunks).splitlines()
+        self.assertEqual(lines[0], ",".join(EXPORT_FIELDS))
+        self.assertEqual(lines[1], '1,Dow,"John, Jr",example@test.com,5551234567,1999-10-05,')
+        self.assertEqual(len(lines), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
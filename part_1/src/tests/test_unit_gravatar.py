@@ -0,0 +1,42 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from src.services.gravatar import enrich_avatar, gravatar_url
+
+
+class TestGravatar(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        gravatar_url.cache_clear()
+
+
+    async def test_enrich_sets_default_avatar(self):
+        with patch("src.services.gravatar.AsyncSessionLocal"), \
+                patch("src.repository.users.set_default_avatar", new_callable=AsyncMock) as set_default_avatar:
+            await enrich_avatar("test@test.com")
+        email, url, _ = set_default_avatar.await_args.args
+        self.assertEqual(email, "test@test.com")
+        self.assertTrue(url.startswith("https://www.gravatar.com/avatar/"))
+
+
+    async def test_enrich_skips_failed_lookup(self):
+        with patch("src.services.gravatar.Gravatar", side_effect=RuntimeError("down")), \
+                patch("src.repository.users.set_default_avatar", new_callable=AsyncMock) as set_default_avatar:
+            await enrich_avatar("test@test.com")
+        set_default_avatar.assert_not_awaited()
+
+
+    def test_url_is_cached(self):
+        with patch("src.services.gravatar.Gravatar") as gravatar:
+            gravatar.return_value.get_image.return_value = "http://localhost.jpeg"
+            gravatar_url("test@test.com")
+            gravatar_url("test@test.com")
+        gravatar.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
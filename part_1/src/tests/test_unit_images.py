@@ -0,0 +1,82 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import io
+import tempfile
+import unittest
+
+from fastapi import HTTPException
+from PIL import Image
+
+from src.services.images import HeaderProbe, render_variants
+
+
+def make_image(path: str, size: tuple[int, int], fmt: str = "JPEG", mode: str = "RGB") -> None:
+    Image.new(mode, size, "blue").save(path, format=fmt)
+
+
+class TestHeaderProbe(unittest.TestCase):
+
+    def test_reads_size_from_first_chunk(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (640, 480)).save(buffer, format="JPEG")
+        probe = HeaderProbe(max_pixels=640 * 480)
+        probe.feed(buffer.getvalue()[:1024])
+        self.assertEqual(probe.size, (640, 480))
+        probe.close()
+
+
+    def test_rejects_too_many_pixels(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (640, 480)).save(buffer, format="PNG")
+        probe = HeaderProbe(max_pixels=1000)
+        with self.assertRaises(HTTPException) as ctx:
+            probe.feed(buffer.getvalue()[:64])
+        self.assertEqual(ctx.exception.status_code, 413)
+
+
+    def test_rejects_missing_header(self):
+        probe = HeaderProbe()
+        probe.feed(b"plain text")
+        with self.assertRaises(HTTPException) as ctx:
+            probe.close()
+        self.assertEqual(ctx.exception.status_code, 415)
+
+
+class TestRenderVariants(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "upload")
+
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+
+    def test_square_variants(self):
+        make_image(self.path, (1200, 800))
+        variants = render_variants(self.path, (64, 128, 250), "webp", 80, 10_000_000)
+        self.assertEqual([size for size, _ in variants], [250, 128, 64])
+        for size, path in variants:
+            with Image.open(path) as im:
+                self.assertEqual(im.format, "WEBP")
+                self.assertEqual(im.size, (size, size))
+
+
+    def test_jpeg_drops_alpha(self):
+        make_image(self.path, (300, 300), fmt="PNG", mode="RGBA")
+        [(_, path)] = render_variants(self.path, (64,), "jpeg", 80, 10_000_000)
+        with Image.open(path) as im:
+            self.assertEqual((im.format, im.mode), ("JPEG", "RGB"))
+
+
+    def test_rejects_too_many_pixels(self):
+        make_image(self.path, (400, 400))
+        with self.assertRaises(ValueError):
+            render_variants(self.path, (64,), "webp", 80, 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+
+import fakeredis.aioredis
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.services import instrumentation
+from src.services.metrics import HistogramFamily, format_labels
+
+
+def sample(text: str, name: str) -> float | None:
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+class TestInstrumentation(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        for family in (instrumentation.request_duration, instrumentation.request_dependency_duration,
+                       instrumentation.dependency_duration):
+            family.children.clear()
+        self.app = FastAPI()
+        self.app.add_middleware(instrumentation.MetricsMiddleware)
+
+        @self.app.get("/items/{item_id}")
+        async def read_item(item_id: int):
+            with instrumentation.track("bcrypt"):
+                pass
+            return {"id": item_id}
+
+        @self.app.get("/boom")
+        async def boom():
+            raise RuntimeError("boom")
+
+        self.client = AsyncClient(transport=ASGITransport(app=self.app, raise_app_exceptions=False),
+                                  base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+
+    async def test_requests_are_labelled_by_route_template(self):
+        await self.client.get("/items/1")
+        await self.client.get("/items/2")
+        await self.client.get("/missing")
+        children = instrumentation.request_duration.children
+        self.assertEqual(children[("GET", "/items/{item_id}", "200")].snapshot()["count"], 2)
+        self.assertEqual(children[("GET", instrumentation.UNMATCHED_ROUTE, "404")].snapshot()["count"], 1)
+
+
+    async def test_dependency_time_is_attributed_to_the_route(self):
+        await self.client.get("/items/1")
+        child = instrumentation.request_dependency_duration.children[("GET", "/items/{item_id}", "bcrypt")]
+        self.assertEqual(child.snapshot()["count"], 1)
+        self.assertEqual(instrumentation.dependency_duration.labels("bcrypt").snapshot()["count"], 1)
+
+
+    async def test_unhandled_errors_are_recorded_as_500(self):
+        await self.client.get("/boom")
+        self.assertIn(("GET", "/boom", "500"), instrumentation.request_duration.children)
+        self.assertEqual(instrumentation.requests_in_flight.value, 0)
+
+
+    async def test_track_outside_a_request_only_records_the_call(self):
+        with instrumentation.track("email"):
+            pass
+        self.assertEqual(instrumentation.dependency_duration.labels("email").snapshot()["count"], 1)
+        self.assertEqual(instrumentation.request_dependency_duration.children, {})
+
+
+    async def test_engine_statements_are_timed(self):
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        instrumentation.instrument_engine(engine.sync_engine)
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            with self.assertRaises(Exception):
+                await connection.execute(text("SELECT * FROM missing"))
+        await engine.dispose()
+        self.assertEqual(instrumentation.dependency_duration.labels("db").snapshot()["count"], 2)
+
+
+    async def test_redis_commands_and_pipelines_are_timed(self):
+        client = instrumentation.instrument_redis(fakeredis.aioredis.FakeRedis(decode_responses=True))
+        await client.set("key", "value")
+        self.assertEqual(await client.get("key"), "value")
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.incr("counter")
+            pipe.incr("counter")
+            self.assertEqual(await pipe.execute(), [1, 2])
+        self.assertEqual(instrumentation.dependency_duration.labels("redis").snapshot()["count"], 3)
+
+
+    async def test_render_metrics(self):
+        await self.client.get("/items/1")
+        body = instrumentation.render_metrics()
+        self.assertIn("# TYPE http_request_duration_seconds histogram", body)
+        labels = '{method="GET",route="/items/{item_id}",status="200"}'
+        self.assertEqual(sample(body, "http_request_duration_seconds_count" + labels), 1)
+        self.assertEqual(sample(body, 'http_request_duration_seconds_bucket{method="GET",route="/items/{item_id}",'
+                                      'status="200",le="+Inf"}'), 1)
+        self.assertEqual(sample(body, "http_requests_in_flight"), 0)
+
+
+class TestExposition(unittest.TestCase):
+
+    def test_label_values_are_escaped(self):
+        self.assertEqual(format_labels({"path": 'a"b\\c\n'}), '{path="a\\"b\\\\c\\n"}')
+        self.assertEqual(format_labels({}), "")
+
+
+    def test_families_create_one_histogram_per_label_set(self):
+        family = HistogramFamily("test_seconds", "Test.", ("name",), buckets=(1.0,))
+        family.labels("a").observe(0.5)
+        family.labels("a").observe(2.0)
+        family.labels("b").observe(0.5)
+        lines = family.render()
+        self.assertIn('test_seconds_bucket{name="a",le="1.0"} 1', lines)
+        self.assertIn('test_seconds_bucket{name="a",le="+Inf"} 2', lines)
+        self.assertIn('test_seconds_count{name="b"} 1', lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
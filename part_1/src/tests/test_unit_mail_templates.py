@@ -0,0 +1,60 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+
+from jinja2 import UndefinedError
+
+from src.services.mail_templates import MESSAGE_TYPES, TemplateRegistry
+
+
+class TestTemplateRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = TemplateRegistry()
+        self.registry.load()
+
+
+    def test_loads_every_message_type(self):
+        self.assertEqual(set(self.registry.compiled), set(MESSAGE_TYPES))
+
+
+    def test_confirmation(self):
+        rendered = self.registry.render("confirmation", {"host": "http://localhost/", "username": "<b>deadpool</b>",
+                                                         "token": "token"})
+        self.assertEqual(rendered.subject, "Confirm your email")
+        self.assertIn("http://localhost/api/auth/confirmed_email/token", rendered.html)
+        self.assertIn("&lt;b&gt;deadpool&lt;/b&gt;", rendered.html)
+        self.assertIn("Hi <b>deadpool</b>,", rendered.text)
+
+
+    def test_password_reset(self):
+        rendered = self.registry.render("password_reset", {"username": "deadpool",
+                                                           "reset_url": "http://localhost/reset/token"})
+        self.assertIn('href="http://localhost/reset/token"', rendered.html)
+        self.assertIn("http://localhost/reset/token", rendered.text)
+
+
+    def test_birthday_digest(self):
+        contact = {"first_name": "Dow", "last_name": "John", "email": "example@test.com",
+                   "phone_number": "5551234567", "birthday": "1999-10-05"}
+        rendered = self.registry.render("birthday_digest", {"username": "deadpool", "days": 7,
+                                                            "contacts": [contact, contact]})
+        self.assertEqual(rendered.html.count("<li>"), 2)
+        self.assertEqual(rendered.text.count("- 1999-10-05: Dow John"), 2)
+
+
+    def test_missing_variable(self):
+        with self.assertRaises(UndefinedError):
+            self.registry.render("confirmation", {"username": "deadpool"})
+
+
+    def test_templates_read_once(self):
+        self.registry.html_env.loader = None
+        self.registry.text_env.loader = None
+        self.registry.render("password_reset", {"username": "deadpool", "reset_url": "http://localhost/"})
+
+
+if __name__ == '__main__':
+    unittest.main()
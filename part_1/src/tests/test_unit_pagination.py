@@ -0,0 +1,26 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+
+from fastapi import HTTPException
+
+from src.services.pagination import decode_cursor, encode_cursor
+
+
+class TestPagination(unittest.TestCase):
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(42)), 42)
+
+
+    def test_invalid_cursor(self):
+        for cursor in ("zzz", encode_cursor(1).swapcase(), "djI6MQ"):
+            with self.assertRaises(HTTPException) as err:
+                decode_cursor(cursor)
+            self.assertEqual(err.exception.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
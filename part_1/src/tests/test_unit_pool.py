@@ -0,0 +1,51 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from src.database.pool import InstrumentedQueuePool, get_pool_stats
+from src.services.metrics import Histogram
+
+
+class TestPool(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://", poolclass=InstrumentedQueuePool, pool_size=2, max_overflow=1)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+
+    def test_checkouts_are_counted(self):
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            stats = get_pool_stats(self.engine.pool)
+            self.assertEqual(stats["checked_out"], 1)
+        stats = get_pool_stats(self.engine.pool)
+        self.assertEqual(stats["checked_out"], 0)
+        self.assertEqual(stats["checkouts"], 1)
+        self.assertEqual(stats["wait_time_seconds"]["count"], 1)
+
+
+    def test_pool_settings_are_reported(self):
+        stats = get_pool_stats(self.engine.pool)
+        self.assertEqual(stats["pool"], "InstrumentedQueuePool")
+        self.assertEqual(stats["size"], 2)
+        self.assertEqual(stats["max_overflow"], 1)
+
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot["buckets"], {"0.1": 1, "1.0": 2, "+Inf": 3})
+        self.assertEqual(snapshot["count"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
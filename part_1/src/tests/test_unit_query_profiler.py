@@ -0,0 +1,119 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+from datetime import date
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.database.models import Base, User
+from src.repository.contacts import create_contacts, get_contact, search_contacts
+from src.schemas import ContactBase
+from src.services.query_profiler import (QUERY_COUNT_HEADER, QueryBudgetExceeded, QueryProfilerMiddleware,
+                                         assert_max_queries, parameter_shape, profile_engine, profile_queries)
+
+
+class TestQueryProfiler(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        profile_engine(self.engine.sync_engine)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.db = async_sessionmaker(self.engine, expire_on_commit=False)()
+        self.user = User(username="deadpool", email="deadpool@example.com", password="x", confirmed=True)
+        self.db.add(self.user)
+        await self.db.commit()
+        await create_contacts([ContactBase(first_name=f"Ann{i}", last_name="Lee", email=f"ann{i}@example.com",
+                                           phone_number="5551234567", birthday=date(1990, 1, 1 + i))
+                               for i in range(6)], self.user, self.db)
+
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        await self.engine.dispose()
+
+
+    async def test_statements_are_counted(self):
+        with profile_queries() as profile:
+            await search_contacts("ann", self.user, self.db)
+        self.assertEqual(profile.count, 1)
+        self.assertEqual(profile.n_plus_one(), [])
+
+
+    async def test_nothing_is_recorded_outside_a_profile(self):
+        with profile_queries() as profile:
+            pass
+        await search_contacts("ann", self.user, self.db)
+        self.assertEqual(profile.count, 0)
+
+
+    async def test_query_budget(self):
+        with assert_max_queries(1):
+            await search_contacts("ann", self.user, self.db)
+        with self.assertRaises(QueryBudgetExceeded) as cm:
+            with assert_max_queries(1):
+                await search_contacts("ann", self.user, self.db)
+                await search_contacts("lee", self.user, self.db)
+        self.assertIn("2 queries run, budget is 1", str(cm.exception))
+        self.assertIn("2x SELECT", str(cm.exception))
+
+
+    async def test_n_plus_one_is_flagged(self):
+        with profile_queries() as profile:
+            for contact_id in range(1, 7):
+                await get_contact(contact_id, self.user, self.db)
+        [(statement, count)] = profile.n_plus_one()
+        self.assertEqual(count, 6)
+        self.assertTrue(statement.startswith("SELECT"))
+
+
+    async def test_slow_queries_are_logged_without_values(self):
+        with self.assertLogs("src.services.query_profiler", level="WARNING") as logs:
+            with profile_queries(slow_threshold=0) as profile:
+                await search_contacts("secret-term", self.user, self.db)
+        self.assertEqual(len(profile.slow), 1)
+        self.assertIn("slow query", logs.output[0])
+        self.assertNotIn("secret-term", logs.output[0])
+
+
+    async def test_failed_statements_are_not_recorded(self):
+        with profile_queries() as profile:
+            with self.assertRaises(Exception):
+                await self.db.execute(text("SELECT * FROM missing"))
+            await self.db.rollback()
+            await self.db.execute(text("SELECT 1"))
+        self.assertEqual(profile.count, 1)
+
+
+    async def test_middleware_reports_the_count(self):
+        app = FastAPI()
+        app.add_middleware(QueryProfilerMiddleware)
+
+        @app.get("/search")
+        async def search():
+            contacts = await search_contacts("ann", self.user, self.db)
+            return {"count": len(contacts)}
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/search")
+        self.assertEqual(response.json(), {"count": 6})
+        self.assertEqual(response.headers[QUERY_COUNT_HEADER], "1")
+
+
+class TestParameterShape(unittest.TestCase):
+
+    def test_shapes(self):
+        self.assertEqual(parameter_shape((1, "a", None)), ("int", "str", "NoneType"))
+        self.assertEqual(parameter_shape({"email": "a@example.com"}), {"email": "str"})
+        self.assertEqual(parameter_shape([(1, "a"), (2, "b")], executemany=True),
+                         {"rows": 2, "shape": ("int", "str")})
+
+
+if __name__ == '__main__':
+    unittest.main()
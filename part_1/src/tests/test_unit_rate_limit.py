@@ -0,0 +1,78 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from redis.exceptions import RedisError
+
+from src.services.rate_limit import SlidingWindowLimiter
+
+
+class TestSlidingWindowLimiter(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.limiter = SlidingWindowLimiter(sync_interval=60)
+        self.pipe = MagicMock()
+        self.redis = MagicMock()
+        self.redis.pipeline.return_value.__aenter__.return_value = self.pipe
+
+
+    def test_allows_up_to_the_limit(self):
+        results = [self.limiter.hit("key", times=3, seconds=60, now=600) for _ in range(4)]
+        self.assertEqual(results[:3], [0, 0, 0])
+        self.assertEqual(results[3], 60)
+
+
+    def test_previous_window_slides_out(self):
+        for _ in range(4):
+            self.limiter.hit("key", times=4, seconds=60, now=630)
+        self.assertTrue(self.limiter.hit("key", times=4, seconds=60, now=665))
+        self.assertEqual(self.limiter.hit("key", times=4, seconds=60, now=710), 0)
+
+
+    async def test_sync_pushes_hits_in_one_pipeline(self):
+        self.limiter.redis = self.redis
+        self.limiter.hit("a", times=10, seconds=60)
+        self.limiter.hit("a", times=10, seconds=60)
+        self.limiter.hit("b", times=10, seconds=60)
+        self.pipe.execute = AsyncMock(return_value=[7, True, "3", 1, True, None])
+        await self.limiter.sync()
+        self.pipe.execute.assert_awaited_once()
+        self.assertEqual(self.pipe.incrby.call_args_list[0].args[1], 2)
+        self.assertEqual((self.limiter.counters["a"].current, self.limiter.counters["a"].previous), (7, 3))
+        self.assertEqual(self.limiter.counters["a"].unsynced, 0)
+
+
+    async def test_degraded_mode_keeps_local_counts(self):
+        self.limiter.redis = self.redis
+        self.pipe.execute = AsyncMock(side_effect=RedisError("down"))
+        self.limiter.hit("a", times=2, seconds=60)
+        await self.limiter.sync()
+        self.assertTrue(self.limiter.degraded)
+        self.assertEqual(self.limiter.hit("a", times=2, seconds=60), 0)
+        self.assertNotEqual(self.limiter.hit("a", times=2, seconds=60), 0)
+
+
+    async def test_idle_counters_are_pruned(self):
+        self.limiter.hit("a", times=2, seconds=60, now=600)
+        with patch("src.services.rate_limit.time.time", return_value=900):
+            await self.limiter.sync()
+            await self.limiter.sync()
+        self.assertNotIn("a", self.limiter.counters)
+
+
+    async def test_sync_pushes_hits_before_the_window_rolls(self):
+        self.limiter.redis = self.redis
+        for _ in range(2):
+            self.limiter.hit("a", times=10, seconds=60, now=650)
+        self.pipe.execute = AsyncMock(return_value=[5, True, "1"])
+        await self.limiter.sync(now=665)
+        self.pipe.incrby.assert_called_once_with("rl:a:10", 2)
+        counter = self.limiter.counters["a"]
+        self.assertEqual((counter.window, counter.current, counter.previous, counter.unsynced), (11, 0, 5, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
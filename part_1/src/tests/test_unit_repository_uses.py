@@ -5,16 +5,18 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 import unittest
 from unittest.mock import MagicMock
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import User
 from src.schemas import UserModel
-from src.repository.users import get_user_by_email, create_user, update_token, confirmed_email, update_avatar
+from src.repository.users import get_user_by_email, create_user, confirmed_email, update_avatar, \
+    set_default_avatar
 
 class TestUsers(unittest.IsolatedAsyncioTestCase):
 
     def setUp(self):
-        self.session = MagicMock(spec=Session)
+        self.session = MagicMock(spec=AsyncSession)
+        self.session.execute.return_value = MagicMock()
         self.user = User(id=1)
         self.body = UserModel(
             username = "TestUser",
@@ -24,13 +26,13 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
 
 
     async def test_get_authuser_by_email_found(self):
-        self.session.query().filter().first.return_value = self.user
+        self.session.execute.return_value.scalar_one_or_none.return_value = self.user
         result = await get_user_by_email(email=self.user.email, db=self.session)
         self.assertEqual(result, self.user)
 
 
     async def test_get_authuser_by_email_not_found(self):
-        self.session.query().filter().first.return_value = None
+        self.session.execute.return_value.scalar_one_or_none.return_value = None
         result = await get_user_by_email(email=self.user.email, db=self.session)
         self.assertIsNone(result)
 
@@ -40,24 +42,30 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result.username, self.body.username)
         self.assertEqual(result.email, self.body.email)
         self.assertEqual(result.password, self.body.password)
+        self.assertIsNone(result.avatar)
 
 
-    async def test_update_token(self):
-        self.session.query().filter().first.return_value = self.user
-        token = "token"
-        await update_token(user=self.user, token=token, db=self.session)
-        self.assertTrue(self.user.refresh_token)
-        self.assertEqual(self.user.refresh_token, token)
+    async def test_set_default_avatar(self):
+        self.session.execute.return_value.rowcount = 1
+        result = await set_default_avatar(email=self.body.email, url="http://localhost.jpeg", db=self.session)
+        self.assertTrue(result)
+        self.session.commit.assert_awaited()
+
+
+    async def test_set_default_avatar_keeps_existing(self):
+        self.session.execute.return_value.rowcount = 0
+        result = await set_default_avatar(email=self.body.email, url="http://localhost.jpeg", db=self.session)
+        self.assertFalse(result)
 
 
     async def test_confirmed_email(self):
-        self.session.query().filter().first.return_value = self.user
+        self.session.execute.return_value.scalar_one_or_none.return_value = self.user
         await confirmed_email(email=self.user.email, db=self.session)
         self.assertTrue(self.user.confirmed)
 
 
     async def test_update_avatar(self):
-        self.session.query().filter().first.return_value = self.user
+        self.session.execute.return_value.scalar_one_or_none.return_value = self.user
         url = "http://localhost.jpeg"
         result = await update_avatar(email=self.user.email, url=url, db=self.session)
         self.assertEqual(result.avatar, url)
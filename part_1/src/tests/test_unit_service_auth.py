@@ -0,0 +1,82 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from src.services.auth import Auth
+from src.services.tokens import JoseBackend
+
+
+class TestPasswordHashing(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.auth = Auth()
+        self.auth.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=4)
+
+
+    async def test_hash_and_verify(self):
+        hashed = await self.auth.get_password_hash("123456789")
+        self.assertTrue(await self.auth.verify_password("123456789", hashed))
+        self.assertFalse(await self.auth.verify_password("password", hashed))
+        self.assertEqual(self.auth.pwd_pending, 0)
+
+
+    async def test_saturated_pool_fails_fast(self):
+        with patch.object(Auth, "pwd_max_pending", 0):
+            with self.assertRaises(HTTPException) as err:
+                await self.auth.get_password_hash("123456789")
+        self.assertEqual(err.exception.status_code, 503)
+
+
+class TestTokens(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.auth = Auth()
+        self.auth.jwt_backend = JoseBackend("HS256", secret_key="secret")
+
+
+    async def test_refresh_token_round_trip(self):
+        token = await self.auth.create_refresh_token({"sub": "deadpool@example.com"})
+        self.assertEqual(await self.auth.decode_refresh_token(token), "deadpool@example.com")
+
+
+    async def test_verified_token_is_cached(self):
+        token = await self.auth.create_access_token({"sub": "deadpool@example.com"})
+        with patch.object(self.auth.jwt_backend, "decode", wraps=self.auth.jwt_backend.decode) as decode:
+            first = self.auth.decode_token(token)
+            second = self.auth.decode_token(token)
+        self.assertEqual(first, second)
+        decode.assert_called_once_with(token)
+
+
+    async def test_cached_token_expires(self):
+        token = await self.auth.create_access_token({"sub": "deadpool@example.com"}, expires_delta=60)
+        self.auth.decode_token(token)
+        with patch("src.services.tokens.time.time", return_value=time.time() + 120), \
+                self.assertRaises(HTTPException) as err:
+            await self.auth.decode_refresh_token(token)
+        self.assertEqual(err.exception.status_code, 401)
+
+
+    async def test_access_token_is_not_a_refresh_token(self):
+        token = await self.auth.create_access_token({"sub": "deadpool@example.com"})
+        with self.assertRaises(HTTPException) as err:
+            await self.auth.decode_refresh_token(token)
+        self.assertEqual(err.exception.detail, "Invalid scope for token")
+
+
+    async def test_bad_signature(self):
+        token = JoseBackend("HS256", secret_key="other").encode({"sub": "deadpool@example.com", "exp": time.time() + 60})
+        with self.assertRaises(HTTPException) as err:
+            await self.auth.get_email_from_token(token)
+        self.assertEqual(err.exception.status_code, 422)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+from datetime import timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.database.models import Base, RefreshSession, User
+from src.database.clock import utcnow
+from src.repository.sessions import create_session, get_sessions, revoke_session, rotate_session
+
+
+class TestRefreshSessions(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.db = async_sessionmaker(self.engine, expire_on_commit=False)()
+        self.user = User(username="deadpool", email="deadpool@example.com", password="x", confirmed=True)
+        self.other = User(username="wolverine", email="wolverine@example.com", password="x", confirmed=True)
+        self.db.add_all([self.user, self.other])
+        await self.db.commit()
+        self.expires_at = utcnow() + timedelta(days=7)
+
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        await self.engine.dispose()
+
+
+    async def test_sessions_per_device(self):
+        await create_session("phone", self.user, "Phone", "t1", self.expires_at, self.db)
+        await create_session("laptop", self.user, "Laptop", "t2", self.expires_at, self.db)
+        await rotate_session("phone", "t1", "t3", self.expires_at, self.db)
+        sessions = await get_sessions(self.user, self.db)
+        self.assertEqual([session.id for session in sessions], ["phone", "laptop"])
+
+
+    async def test_rotate_once(self):
+        await create_session("phone", self.user, None, "t1", self.expires_at, self.db)
+        self.assertTrue(await rotate_session("phone", "t1", "t2", self.expires_at, self.db))
+        self.assertFalse(await rotate_session("phone", "t1", "t3", self.expires_at, self.db))
+        self.assertTrue(await rotate_session("phone", "t2", "t3", self.expires_at, self.db))
+
+
+    async def test_revoked_session_cannot_rotate(self):
+        await create_session("phone", self.user, None, "t1", self.expires_at, self.db)
+        self.assertTrue(await revoke_session("phone", self.db))
+        self.assertFalse(await rotate_session("phone", "t1", "t2", self.expires_at, self.db))
+        self.assertEqual(await get_sessions(self.user, self.db), [])
+
+
+    async def test_revoke_checks_owner(self):
+        await create_session("phone", self.user, None, "t1", self.expires_at, self.db)
+        self.assertFalse(await revoke_session("phone", self.db, user=self.other))
+        self.assertTrue(await revoke_session("phone", self.db, user=self.user))
+
+
+    async def test_expired_session(self):
+        await create_session("old", self.user, None, "t1", utcnow() - timedelta(seconds=1), self.db)
+        self.assertFalse(await rotate_session("old", "t1", "t2", self.expires_at, self.db))
+        await create_session("new", self.user, None, "t3", self.expires_at, self.db)
+        ids = (await self.db.execute(select(RefreshSession.id))).scalars().all()
+        self.assertEqual(ids, ["new"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import subprocess
+import unittest
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.services.readiness import Dependency, Readiness, watch_engine
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+COLD_START_BUDGET_MS = os.environ.get("COLD_START_BUDGET_MS")
+LAZY_MODULES = ("cloudinary", "aiosmtplib", "passlib.context")
+
+IMPORT_MAIN = f"""
+import json, sys, time
+started = time.perf_counter()
+import main
+elapsed = (time.perf_counter() - started) * 1000
+import gc
+from concurrent.futures import ThreadPoolExecutor
+from src.database import db
+print(json.dumps({{"ms": elapsed, "engines": len(db.get_created_engines()),
+                  "executors": sum(isinstance(obj, ThreadPoolExecutor) for obj in gc.get_objects()),
+                  "loaded": [name for name in {LAZY_MODULES!r} if name in sys.modules]}}))
+"""
+
+SCRAPE_METRICS = """
+import asyncio, json
+from src.database import db
+from src.routes.internal import read_db_pool
+from src.routes.metrics import read_metrics
+asyncio.run(read_metrics())
+asyncio.run(read_db_pool())
+print(json.dumps(sorted(db.get_created_engines())))
+"""
+
+
+def import_env() -> dict:
+    env = {**os.environ, "SQLALCHEMY_DATABASE_URL": "sqlite://", "PYTHONDONTWRITEBYTECODE": "1"}
+    env.setdefault("SECRET_KEY", "test-secret-key-for-the-startup-tests")
+    env.setdefault("ALGORITHM", "HS256")
+    return env
+
+
+def import_main() -> dict:
+    result = subprocess.run([sys.executable, "-c", IMPORT_MAIN], cwd=ROOT, env=import_env(), capture_output=True,
+                            text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+class TestColdStart(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.runs = [import_main() for _ in range(3)]
+
+    def test_clients_are_not_created_on_import(self):
+        for run in self.runs:
+            self.assertEqual(run["loaded"], [])
+            self.assertEqual(run["engines"], 0)
+            self.assertEqual(run["executors"], 0)
+
+
+    @unittest.skipUnless(COLD_START_BUDGET_MS, "set COLD_START_BUDGET_MS to check the import time, on an idle machine")
+    def test_import_within_budget(self):
+        budget = float(COLD_START_BUDGET_MS)
+        fastest = min(run["ms"] for run in self.runs)
+        self.assertLess(fastest, budget, f"importing main took {fastest:.0f} ms, over the budget of {budget:.0f} ms; "
+                                         f"run scripts/profile_imports.py to see where the time goes")
+
+
+    def test_metrics_do_not_create_engines(self):
+        result = subprocess.run([sys.executable, "-c", SCRAPE_METRICS], cwd=ROOT, env=import_env(),
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(json.loads(result.stdout.splitlines()[-1]), [])
+
+
+class TestReadiness(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.readiness = Readiness([Dependency("db", required=True), Dependency("redis")])
+
+    def test_starts_idle_and_ready(self):
+        status = self.readiness.status()
+        self.assertTrue(status["ready"])
+        self.assertEqual(status["dependencies"]["db"]["state"], "idle")
+
+
+    def test_optional_failure_keeps_ready(self):
+        self.readiness["redis"].failed(ConnectionError("refused"))
+        status = self.readiness.status()
+        self.assertTrue(status["ready"])
+        self.assertEqual(status["dependencies"]["redis"], {"state": "failed", "required": False, "error": "refused",
+                                                           "changed_at": self.readiness["redis"].changed_at})
+
+
+    def test_required_failure_and_recovery(self):
+        self.readiness["db"].failed(TimeoutError())
+        self.assertFalse(self.readiness.ready)
+        self.assertEqual(self.readiness["db"].error, "TimeoutError")
+        self.readiness["db"].ready()
+        self.assertTrue(self.readiness.ready)
+        self.assertIsNone(self.readiness["db"].error)
+
+
+    async def test_watch_engine(self):
+        from src.services.readiness import readiness
+        db = readiness["db"]
+        state = (db.state, db.error, db.changed_at)
+        try:
+            engine = create_async_engine("sqlite+aiosqlite:///" + os.path.join(ROOT, "missing", "dir", "db.sqlite"))
+            watch_engine(engine.sync_engine)
+            with self.assertRaises(OperationalError):
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            self.assertEqual(db.state, "failed")
+            await engine.dispose()
+
+            engine = create_async_engine("sqlite+aiosqlite://")
+            watch_engine(engine.sync_engine)
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+            self.assertEqual(db.state, "ready")
+            await engine.dispose()
+        finally:
+            db.state, db.error, db.changed_at = state
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+import unittest
+from unittest.mock import patch
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+from src.services.tokens import JoseBackend, JWTBackend, PyJWTBackend, TokenCache, TokenError
+
+
+def ed25519_keys() -> tuple[str, str]:
+    key = Ed25519PrivateKey.generate()
+    private = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                serialization.NoEncryption()).decode()
+    public = key.public_key().public_bytes(serialization.Encoding.PEM,
+                                           serialization.PublicFormat.SubjectPublicKeyInfo).decode()
+    return private, public
+
+
+class TestTokenCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = TokenCache(maxsize=2)
+        self.exp = time.time() + 60
+
+
+    def test_get_miss(self):
+        self.assertIsNone(self.cache.get("token"))
+
+
+    def test_set_then_get(self):
+        self.cache.set("token", {"sub": "deadpool", "exp": self.exp})
+        self.assertEqual(self.cache.get("token")["sub"], "deadpool")
+        self.assertNotIn(b"token", b"".join(self.cache.entries))
+
+
+    def test_expired_entry_is_dropped(self):
+        self.cache.set("token", {"sub": "deadpool", "exp": self.exp})
+        with patch("src.services.tokens.time.time", return_value=self.exp + 1):
+            self.assertIsNone(self.cache.get("token"))
+        self.assertEqual(len(self.cache.entries), 0)
+
+
+    def test_token_without_expiry_is_not_cached(self):
+        self.cache.set("token", {"sub": "deadpool"})
+        self.assertIsNone(self.cache.get("token"))
+
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set("a", {"exp": self.exp})
+        self.cache.set("b", {"exp": self.exp})
+        self.cache.get("a")
+        self.cache.set("c", {"exp": self.exp})
+        self.assertIsNotNone(self.cache.get("a"))
+        self.assertIsNone(self.cache.get("b"))
+
+
+class TestBackends(unittest.TestCase):
+
+    def test_eddsa_round_trip(self):
+        private, public = ed25519_keys()
+        backend = PyJWTBackend("EdDSA", private_key=private, public_key=public)
+        token = backend.encode({"sub": "deadpool", "exp": int(time.time()) + 60})
+        self.assertEqual(backend.decode(token)["sub"], "deadpool")
+
+
+    def test_eddsa_wrong_key(self):
+        private, _ = ed25519_keys()
+        _, public = ed25519_keys()
+        backend = PyJWTBackend("EdDSA", private_key=private, public_key=public)
+        with self.assertRaises(TokenError):
+            backend.decode(backend.encode({"sub": "deadpool"}))
+
+
+    def test_backends_read_each_other(self):
+        claims = {"sub": "deadpool", "exp": int(time.time()) + 60}
+        jose, pyjwt = JoseBackend("HS256", secret_key="secret"), PyJWTBackend("HS256", secret_key="secret")
+        self.assertEqual(pyjwt.decode(jose.encode(claims)), claims)
+        self.assertEqual(jose.decode(pyjwt.encode(claims)), claims)
+
+
+    def test_expired(self):
+        backend = JoseBackend("HS256", secret_key="secret")
+        with self.assertRaises(TokenError):
+            backend.decode(backend.encode({"sub": "deadpool", "exp": int(time.time()) - 60}))
+
+
+    def test_incomplete_backend_cannot_be_created(self):
+        class EncodeOnly(JWTBackend):
+            def encode(self, claims: dict) -> str:
+                return ""
+
+        with self.assertRaises(TypeError):
+            EncodeOnly("HS256", secret_key="secret")
+
+
+if __name__ == '__main__':
+    unittest.main()
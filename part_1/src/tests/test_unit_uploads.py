@@ -0,0 +1,97 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import io
+import unittest
+
+from fastapi import HTTPException, Request
+from PIL import Image
+
+from src.database.models import User
+from src.services.avatar_jobs import AvatarJobQueue
+from src.services.uploads import open_upload
+
+BOUNDARY = "avatar-boundary"
+
+
+def make_body(content: bytes, content_type: str = "image/png", field: str = "file") -> bytes:
+    return (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\nhello\r\n"
+            f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"avatar.png\"\r\n"
+            f"Content-Type: {content_type}\r\n\r\n").encode() + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+class StreamedRequest:
+    """
+    A request whose body arrives in chunks, counting how many of them the application received.
+    """
+
+    def __init__(self, body: bytes, chunk_size: int = 1024, content_length: bool = True):
+        self.chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+        self.received = 0
+        headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+        if content_length:
+            headers.append((b"content-length", str(len(body)).encode()))
+        self.request = Request({"type": "http", "method": "PATCH", "path": "/", "headers": headers}, self.receive)
+
+    async def receive(self) -> dict:
+        self.received += 1
+        more = self.received < len(self.chunks)
+        return {"type": "http.request", "body": self.chunks[self.received - 1], "more_body": more}
+
+
+class TestUploads(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (300, 200), "red").save(buffer, format="PNG")
+        self.png = buffer.getvalue()
+        self.user = User(id=1, username="deadpool", email="deadpool@example.com")
+
+
+    async def test_reads_file_field(self):
+        streamed = StreamedRequest(make_body(self.png), chunk_size=7)
+        upload = await open_upload(streamed.request, "file", 64 * 1024)
+        self.assertEqual(upload.content_type, "image/png")
+        self.assertEqual(upload.filename, "avatar.png")
+        content = b""
+        while chunk := await upload.read(100):
+            content += chunk
+        self.assertEqual(content, self.png)
+
+
+    async def test_missing_field(self):
+        streamed = StreamedRequest(make_body(self.png, field="image"))
+        with self.assertRaises(HTTPException) as ctx:
+            await open_upload(streamed.request, "file", 64 * 1024)
+        self.assertEqual(ctx.exception.status_code, 422)
+
+
+    async def test_rejects_content_length_before_reading(self):
+        streamed = StreamedRequest(make_body(b"x" * 200 * 1024))
+        with self.assertRaises(HTTPException) as ctx:
+            await open_upload(streamed.request, "file", 64 * 1024)
+        self.assertEqual(ctx.exception.status_code, 413)
+        self.assertEqual(streamed.received, 0)
+
+
+    async def test_stops_reading_oversized_upload(self):
+        streamed = StreamedRequest(make_body(self.png + b"x" * 200 * 1024), content_length=False)
+        jobs = AvatarJobQueue(workers=1, max_bytes=64 * 1024)
+        upload = await open_upload(streamed.request, "file", jobs.max_bytes)
+        with self.assertRaises(HTTPException) as ctx:
+            await jobs.submit(self.user, upload)
+        self.assertEqual(ctx.exception.status_code, 413)
+        self.assertLess(streamed.received, len(streamed.chunks) / 2)
+
+
+    async def test_rejects_non_multipart(self):
+        streamed = StreamedRequest(self.png)
+        streamed.request.scope["headers"] = [(b"content-type", b"image/png")]
+        with self.assertRaises(HTTPException) as ctx:
+            await open_upload(streamed.request, "file", 64 * 1024)
+        self.assertEqual(ctx.exception.status_code, 415)
+
+
+if __name__ == '__main__':
+    unittest.main()
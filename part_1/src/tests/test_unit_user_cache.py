@@ -0,0 +1,159 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import User
+from src.repository.contacts import remove_contact
+from src.repository.users import update_avatar
+from src.services.cache import ContactCache, UserCache, user_cache
+
+
+class TestUserCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.cache = UserCache(maxsize=2, ttl=30)
+        self.user = User(id=1, username="deadpool", email="deadpool@example.com", password="secret",
+                         avatar=None, confirmed=True)
+
+
+    async def test_get_miss(self):
+        self.assertIsNone(await self.cache.get(self.user.email))
+
+
+    async def test_set_then_get(self):
+        await self.cache.set(self.user)
+        result = await self.cache.get(self.user.email)
+        self.assertEqual(result.id, self.user.id)
+        self.assertEqual(result.email, self.user.email)
+        self.assertIsNone(result.password)
+
+
+    async def test_invalidate(self):
+        await self.cache.set(self.user)
+        await self.cache.invalidate(self.user.email)
+        self.assertIsNone(await self.cache.get(self.user.email))
+
+
+    async def test_expired_entry_is_a_miss(self):
+        self.cache.ttl = -1
+        await self.cache.set(self.user)
+        self.assertIsNone(await self.cache.get(self.user.email))
+
+
+    async def test_least_recently_used_is_evicted(self):
+        for i in range(3):
+            await self.cache.set(User(id=i, username=f"user{i}", email=f"user{i}@example.com"))
+        self.assertIsNone(await self.cache.get("user0@example.com"))
+        self.assertIsNotNone(await self.cache.get("user2@example.com"))
+
+
+    async def test_redis_tier(self):
+        redis = AsyncMock()
+        redis.get.return_value = json.dumps({"id": 1, "username": "deadpool", "email": self.user.email,
+                                             "avatar": None, "confirmed": True})
+        self.cache.init(redis)
+        result = await self.cache.get(self.user.email)
+        self.assertEqual(result.id, 1)
+        redis.get.assert_awaited_once_with(f"user:{self.user.email}")
+
+
+    async def test_redis_errors_fall_back_to_database(self):
+        redis = AsyncMock()
+        redis.get.side_effect = RedisError("down")
+        self.cache.init(redis)
+        self.assertIsNone(await self.cache.get(self.user.email))
+
+
+    async def test_update_avatar_invalidates(self):
+        session = MagicMock(spec=AsyncSession)
+        session.execute.return_value = MagicMock()
+        session.execute.return_value.scalar_one_or_none.return_value = self.user
+        with patch.object(user_cache, "invalidate") as invalidate:
+            await update_avatar(email=self.user.email, url="http://localhost.jpeg", db=session)
+        invalidate.assert_awaited_once_with(self.user.email)
+
+
+
+class FakeRequest:
+
+    def __init__(self, headers: dict | None = None):
+        self.headers = headers or {}
+        self.url = MagicMock(path="/api/contacts/all")
+        self.query_params = MagicMock(multi_items=lambda: [("limit", "10")])
+
+
+class TestContactCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.cache = ContactCache(ttl=60)
+        self.redis = AsyncMock()
+        self.user = User(id=1)
+        self.load = AsyncMock(return_value=(b"[]", {"X-Next-Cursor": "abc"}))
+
+
+    async def test_without_redis_always_loads(self):
+        response = await self.cache.respond(FakeRequest(), self.user, self.load)
+        self.load.assert_awaited_once()
+        self.assertEqual(response.body, b"[]")
+        self.assertNotIn("etag", response.headers)
+
+
+    async def test_miss_loads_and_stores(self):
+        self.cache.init(self.redis)
+        self.redis.get.side_effect = ["3", None]
+        response = await self.cache.respond(FakeRequest(), self.user, self.load)
+        self.load.assert_awaited_once()
+        self.redis.set.assert_awaited_once()
+        self.assertTrue(self.redis.set.call_args.args[0].startswith("contacts:1:3:"))
+        self.assertEqual(response.headers["x-next-cursor"], "abc")
+        self.assertIn("etag", response.headers)
+
+
+    async def test_hit_skips_load(self):
+        self.cache.init(self.redis)
+        self.redis.get.side_effect = ["3", json.dumps({"body": "[1]", "headers": {}})]
+        response = await self.cache.respond(FakeRequest(), self.user, self.load)
+        self.load.assert_not_awaited()
+        self.assertEqual(response.body, b"[1]")
+
+
+    async def test_matching_etag_returns_304(self):
+        self.cache.init(self.redis)
+        self.redis.get.return_value = "3"
+        etag = self.cache.etag(self.user.id, 3, self.cache.request_key(FakeRequest()))
+        response = await self.cache.respond(FakeRequest({"if-none-match": f"W/{etag}"}), self.user, self.load)
+        self.assertEqual(response.status_code, 304)
+        self.load.assert_not_awaited()
+        self.assertEqual(self.redis.get.await_count, 1)
+
+
+    async def test_vary_changes_key_and_etag(self):
+        self.cache.init(self.redis)
+        self.redis.get.side_effect = ["3", None]
+        etag = self.cache.etag(self.user.id, 3, self.cache.request_key(FakeRequest(), "2024-12-31"))
+        response = await self.cache.respond(FakeRequest({"if-none-match": etag}), self.user, self.load,
+                                            vary="2025-01-01")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["etag"], etag)
+        self.assertNotEqual(self.cache.request_key(FakeRequest(), "2024-12-31"),
+                            self.cache.request_key(FakeRequest(), "2025-01-01"))
+
+
+    async def test_remove_contact_bumps_version(self):
+        session = MagicMock(spec=AsyncSession)
+        session.execute.return_value = MagicMock()
+        with patch("src.repository.contacts.contact_cache") as cache:
+            cache.bump = AsyncMock()
+            await remove_contact(1, self.user, session)
+        cache.bump.assert_awaited_once_with(self.user.id)
+
+
+if __name__ == '__main__':
+    unittest.main()